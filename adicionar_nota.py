@@ -1,36 +1,19 @@
-import sqlite3
-from backend import atribuir_nota
+import repositorio
+from backend import atribuir_nota, DISCIPLINAS
 
 def listar_alunos():
     """Lista todos os alunos cadastrados"""
-    try:
-        conn = sqlite3.connect('sistema_nota.db')
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, nome, matricula FROM alunos ORDER BY nome')
-        alunos = cursor.fetchall()
-        conn.close()
-        
+    alunos = repositorio.listar_alunos()
+    if alunos:
         print("\n=== ALUNOS CADASTRADOS ===")
         for aluno in alunos:
             print(f"ID: {aluno[0]} | Nome: {aluno[1]} | Matrícula: {aluno[2]}")
         print()
-        return alunos
-    except Exception as e:
-        print(f"Erro ao listar alunos: {e}")
-        return []
+    return alunos
 
 def listar_disciplinas():
     """Lista as disciplinas disponíveis"""
-    disciplinas = [
-        "Matemática",
-        "Português", 
-        "História",
-        "Geografia",
-        "Ciências",
-        "Inglês",
-        "Artes",
-        "Educação Física"
-    ]
+    disciplinas = DISCIPLINAS
     print("\n=== DISCIPLINAS DISPONÍVEIS ===")
     for i, disciplina in enumerate(disciplinas, 1):
         print(f"{i}. {disciplina}")
@@ -120,16 +103,7 @@ def ver_notas_aluno():
             print("❌ ID de aluno inválido.")
             return
         
-        conn = sqlite3.connect('sistema_nota.db')
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT disciplina, nota 
-            FROM notas 
-            WHERE aluno_id = ? 
-            ORDER BY disciplina
-        """, (aluno_id,))
-        notas = cursor.fetchall()
-        conn.close()
+        notas = repositorio.notas_do_aluno(aluno_id)
         
         print(f"\n📊 NOTAS DO ALUNO: {aluno_encontrado[1]} ({aluno_encontrado[2]})")
         print("=" * 50)
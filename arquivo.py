@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Arquivo histórico por ano letivo
+Os alunos de um ano (com as notas) saem do banco ativo para um arquivo SQLite
+do ano, em arquivo/<banco>_<ano>.db ao lado do banco. As consultas históricas
+anexam (ATTACH) esses arquivos sob demanda; o banco ativo fica só com o ano
+corrente e os índices cabem no cache de páginas.
+Uso: python arquivo.py [banco] [matrícula, CPF ou nome]
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+import metricas
+import repositorio
+from backend import TAMANHO_LOTE_REMOCAO, criterio_alunos
+from conexao import PRAGMAS, banco_atual, conectar
+from escritor import gravar_funcao
+from rastreamento import abrir_conexao, sem_contagem_instrucoes
+
+# Pasta dos arquivos, relativa à pasta do banco ativo
+PASTA_ARQUIVO = 'arquivo'
+
+# Anexos por conexão (o SQLite aceita 10 por padrão)
+MAXIMO_ANEXOS = 8
+
+# Tentativas de um lote cujas notas mudaram entre a cópia e a remoção
+TENTATIVAS_LOTE = 3
+
+# Índices dos arquivos: os mesmos caminhos de consulta do banco ativo
+INDICES_ARQUIVO = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_arquivo_alunos_id ON alunos (id)",
+    "CREATE INDEX IF NOT EXISTS idx_arquivo_alunos_cpf ON alunos (cpf)",
+    "CREATE INDEX IF NOT EXISTS idx_arquivo_alunos_matricula ON alunos (matricula)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_arquivo_notas_id ON notas (id)",
+    "CREATE INDEX IF NOT EXISTS idx_arquivo_notas_aluno ON notas (aluno_id)",
+)
+
+# Tabelas arquivadas e a coluna que as liga ao lote de alunos
+TABELAS_ARQUIVADAS = (('alunos', 'id'), ('notas', 'aluno_id'))
+
+
+def caminho_arquivo(ano, caminho=None):
+    """Arquivo do ano letivo para o banco informado"""
+    caminho = os.path.abspath(caminho or banco_atual())
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    return os.path.join(os.path.dirname(caminho), PASTA_ARQUIVO, f"{base}_{int(ano)}.db")
+
+
+def anos_arquivados(caminho=None):
+    """Anos letivos com arquivo para o banco informado, em ordem"""
+    modelo = caminho_arquivo(0, caminho)
+    prefixo = modelo[:-len('0.db')]
+    anos = []
+    for arquivo in glob.glob(glob.escape(prefixo) + '*.db'):
+        ano = arquivo[len(prefixo):-len('.db')]
+        if ano.isdigit():
+            anos.append(int(ano))
+    return sorted(anos)
+
+
+def _colunas(conexao, tabela, esquema='main'):
+    return [linha[1] for linha in conexao.execute(f"PRAGMA {esquema}.table_info({tabela})")]
+
+
+def _preparar_arquivo(conexao):
+    """Tabelas e índices do arquivo com as colunas atuais do banco ativo (anexado como ativo)"""
+    for tabela in ('alunos', 'notas'):
+        # Sem as restrições do banco ativo: funcionario não é arquivado
+        conexao.execute(
+            f"CREATE TABLE IF NOT EXISTS {tabela} AS SELECT * FROM ativo.{tabela} WHERE 0")
+        existentes = set(_colunas(conexao, tabela))
+        for coluna in _colunas(conexao, tabela, 'ativo'):
+            if coluna not in existentes:
+                conexao.execute(f'ALTER TABLE {tabela} ADD COLUMN "{coluna}"')
+    for sql in INDICES_ARQUIVO:
+        conexao.execute(sql)
+
+
+def _assinatura_lote(conexao, lista, esquema='main'):
+    """
+    (notas, SHA-256 do conteúdo de todas as linhas de alunos e notas do lote):
+    qualquer linha que entre, saia ou mude em qualquer coluna muda o resumo.
+    """
+    resumo = hashlib.sha256()
+    notas = 0
+    for tabela, chave in TABELAS_ARQUIVADAS:
+        colunas = ', '.join(f'"{coluna}"' for coluna in _colunas(conexao, tabela, esquema))
+        linhas = 0
+        for linha in conexao.execute(
+                f"SELECT {colunas} FROM {esquema}.{tabela} "
+                f"WHERE {chave} IN (SELECT value FROM json_each(?)) ORDER BY id",
+                (lista,)):
+            resumo.update(repr(linha).encode('utf-8'))
+            linhas += 1
+        resumo.update(f"|{tabela}:{linhas}|".encode('utf-8'))
+        notas = linhas
+    return notas, resumo.hexdigest()
+
+
+def _copiar_lote(conexao, ids):
+    """Copia alunos e notas do lote para o arquivo; retorna a assinatura do que foi copiado"""
+    lista = json.dumps(ids)
+    # BEGIN adiado: só o arquivo recebe a trava de escrita (IMMEDIATE travaria
+    # também o banco ativo anexado e o escritor esperaria a cópia inteira)
+    conexao.execute("BEGIN")
+    try:
+        for tabela, chave in TABELAS_ARQUIVADAS:
+            colunas = ', '.join(f'"{coluna}"' for coluna in _colunas(conexao, tabela, 'ativo'))
+            # Arquivar de novo o mesmo aluno substitui a cópia anterior
+            conexao.execute(
+                f"DELETE FROM {tabela} WHERE {chave} IN (SELECT value FROM json_each(?))",
+                (lista,))
+            conexao.execute(
+                f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM ativo.{tabela} "
+                f"WHERE {chave} IN (SELECT value FROM json_each(?))", (lista,))
+        # Na mesma transação da cópia: o mesmo instantâneo do banco ativo
+        assinatura = _assinatura_lote(conexao, lista, 'ativo')
+        conexao.execute("COMMIT")
+    except Exception:
+        conexao.execute("ROLLBACK")
+        raise
+    return assinatura
+
+
+def _remover_arquivados(conexao, ids, assinatura):
+    """
+    Remove o lote do banco ativo se alunos e notas ainda são os copiados (roda
+    no escritor). Retorna (alunos, notas) removidos, ou None se algo mudou.
+    """
+    lista = json.dumps(ids)
+    if _assinatura_lote(conexao, lista) != assinatura:
+        return None
+    with sem_contagem_instrucoes(conexao):
+        alunos = conexao.execute(
+            "DELETE FROM alunos WHERE id IN (SELECT value FROM json_each(?))", (lista,)).rowcount
+    return alunos, assinatura[0]
+
+
+def arquivar_alunos(ano, ids=(), matriculas=(), cpfs=(), filtro=None, caminho=None,
+                    tamanho_lote=TAMANHO_LOTE_REMOCAO, ao_progredir=None):
+    """
+    Move os alunos escolhidos (como em backend.excluir_alunos_em_lote) e as
+    notas deles para o arquivo do ano. Cada lote é copiado para o arquivo e só
+    então removido do banco ativo; se alunos ou notas mudarem no meio, o lote é
+    copiado de novo. Retorna (alunos_arquivados, notas_arquivadas).
+    """
+    condicao, parametros = criterio_alunos(ids, matriculas, cpfs, filtro)
+    conexao = conectar(caminho)
+    if not conexao:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+    try:
+        alvo = [linha[0] for linha in conexao.execute(
+            f"SELECT id FROM alunos WHERE {condicao} ORDER BY id", parametros)]
+    finally:
+        conexao.close()
+    if not alvo:
+        return 0, 0
+
+    destino = caminho_arquivo(ano, caminho)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    arquivo = abrir_conexao(destino, isolation_level=None)
+    alunos = notas = 0
+    try:
+        arquivo.execute(f"PRAGMA busy_timeout = {PRAGMAS['busy_timeout']}")
+        # O banco ativo só é lido por esta conexão; a remoção vai pelo escritor
+        arquivo.execute("ATTACH DATABASE ? AS ativo", (os.path.abspath(caminho or banco_atual()),))
+        _preparar_arquivo(arquivo)
+
+        for inicio in range(0, len(alvo), tamanho_lote):
+            lote = alvo[inicio:inicio + tamanho_lote]
+            for _ in range(TENTATIVAS_LOTE):
+                assinatura = _copiar_lote(arquivo, lote)
+                removidos = gravar_funcao(_remover_arquivados, lote, assinatura,
+                                          caminho=caminho)
+                if removidos is not None:
+                    break
+            else:
+                raise RuntimeError(
+                    f"Os alunos {lote[0]}..{lote[-1]} mudaram durante o arquivamento; "
+                    f"tente novamente.")
+            alunos += removidos[0]
+            notas += removidos[1]
+            if ao_progredir:
+                ao_progredir(alunos, len(alvo))
+    except Exception:
+        metricas.FALHAS.incrementar(operacao='arquivar_alunos')
+        raise
+    finally:
+        arquivo.close()
+        if alunos:
+            metricas.ALUNOS_ARQUIVADOS.incrementar(alunos)
+            repositorio.invalidar_alunos(caminho)
+            repositorio.invalidar_notas(caminho=caminho)
+    return alunos, notas
+
+
+@contextmanager
+def anexar_arquivos(conexao, anos, caminho=None):
+    """
+    Anexa os arquivos dos anos à conexão (fora de transação) como ano_<ano>;
+    devolve [(ano, esquema)] e desanexa na saída.
+    """
+    if len(anos) > MAXIMO_ANEXOS:
+        raise ValueError(f"No máximo {MAXIMO_ANEXOS} anos por vez.")
+    anexados = []
+    try:
+        for ano in anos:
+            destino = caminho_arquivo(ano, caminho)
+            if not os.path.exists(destino):
+                # ATTACH criaria um arquivo vazio
+                raise FileNotFoundError(f"Ano {ano} não arquivado ({destino}).")
+            esquema = f"ano_{int(ano)}"
+            conexao.execute(f"ATTACH DATABASE ? AS {esquema}", (destino,))
+            anexados.append((ano, esquema))
+        yield anexados
+    finally:
+        for _, esquema in anexados:
+            conexao.execute(f"DETACH DATABASE {esquema}")
+
+
+def _historico(sql_por_esquema, parametros, anos, caminho):
+    """Executa a consulta em cada arquivo (grupos de MAXIMO_ANEXOS anexos); linhas com o ano"""
+    anos = anos_arquivados(caminho) if anos is None else list(anos)
+    conexao = conectar(caminho)
+    if not conexao:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+    linhas = []
+    try:
+        for inicio in range(0, len(anos), MAXIMO_ANEXOS):
+            with anexar_arquivos(conexao, anos[inicio:inicio + MAXIMO_ANEXOS], caminho) as anexados:
+                sql = " UNION ALL ".join(sql_por_esquema(ano, esquema) for ano, esquema in anexados)
+                linhas.extend(conexao.execute(sql, parametros * len(anexados)).fetchall())
+    finally:
+        conexao.close()
+    return linhas
+
+
+def buscar_arquivados(termo, anos=None, caminho=None, limite=50):
+    """Alunos arquivados por matrícula, CPF ou parte do nome: [(ano, id, nome, matricula, cpf)]"""
+    termo = termo.strip()
+    digitos = re.sub(r'\D', '', termo)
+    if len(digitos) == 11 and not re.search(r'[A-Za-z]', termo):
+        condicao, parametro = "cpf = ?", digitos
+    elif re.fullmatch(r'[A-Za-z]*\d+', termo):
+        condicao, parametro = "matricula = ?", termo
+    else:
+        condicao, parametro = "nome LIKE ?", f"%{termo}%"
+    linhas = _historico(
+        lambda ano, esquema: f"SELECT {int(ano)}, id, nome, matricula, cpf "
+                             f"FROM {esquema}.alunos WHERE {condicao}",
+        (parametro,), anos, caminho)
+    return sorted(linhas, key=lambda linha: (-linha[0], linha[2]))[:limite]
+
+
+def notas_arquivadas(ano, aluno_id, caminho=None):
+    """Notas de um aluno no arquivo do ano: [(disciplina, nota)]"""
+    return [(disciplina, nota) for _, disciplina, nota in _historico(
+        lambda ano, esquema: f"SELECT {int(ano)}, disciplina, nota FROM {esquema}.notas "
+                             f"WHERE aluno_id = ? ORDER BY disciplina",
+        (aluno_id,), [ano], caminho)]
+
+
+def resumo_arquivos(caminho=None):
+    """[(ano, alunos, notas, tamanho em bytes)] dos arquivos do banco"""
+    resumo = []
+    for ano in anos_arquivados(caminho):
+        destino = caminho_arquivo(ano, caminho)
+        conexao = abrir_conexao(destino)
+        try:
+            alunos = conexao.execute("SELECT COUNT(*) FROM alunos").fetchone()[0]
+            notas = conexao.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+        finally:
+            conexao.close()
+        resumo.append((ano, alunos, notas, os.path.getsize(destino)))
+    return resumo
+
+
+def compactar(caminho=None):
+    """
+    Devolve ao sistema o espaço liberado pelo arquivamento (VACUUM) e atualiza
+    as estatísticas do planejador. Retorna (tamanho antes, tamanho depois) em bytes.
+    """
+    caminho = caminho or banco_atual()
+    conexao = abrir_conexao(caminho, isolation_level=None)
+    try:
+        conexao.execute(f"PRAGMA busy_timeout = {PRAGMAS['busy_timeout']}")
+        conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        antes = os.path.getsize(caminho)
+        conexao.execute("VACUUM")
+        conexao.execute("PRAGMA optimize")
+        conexao.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conexao.close()
+    return antes, os.path.getsize(caminho)
+
+
+def _megabytes(tamanho):
+    return f"{tamanho / 1024 / 1024:.1f} MB"
+
+
+def main():
+    argumentos = sys.argv[1:]
+    caminho = argumentos[0] if argumentos and argumentos[0].endswith('.db') else None
+    termo = ' '.join(argumentos[1:] if caminho else argumentos)
+
+    resumo = resumo_arquivos(caminho)
+    if not resumo:
+        print("📦 Nenhum ano letivo arquivado.")
+        return
+    print(f"{'Ano':<6} {'Alunos':>8} {'Notas':>9} {'Tamanho':>10}")
+    for ano, alunos, notas, tamanho in resumo:
+        print(f"{ano:<6} {alunos:>8} {notas:>9} {_megabytes(tamanho):>10}")
+
+    if termo:
+        print()
+        for ano, aluno_id, nome, matricula, cpf in buscar_arquivados(termo, caminho=caminho):
+            notas = ', '.join(f"{disciplina}: {nota:.1f}"
+                              for disciplina, nota in notas_arquivadas(ano, aluno_id, caminho))
+            print(f"{ano} | {nome} | {matricula} | {cpf} | {notas or 'sem notas'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,450 @@
+import json
+import re
+import sqlite3
+
+import boletim
+import busca
+import metricas
+import pivot
+import replica
+import repositorio
 from conexao import conectar
+from escritor import gravar_funcao
+from rastreamento import sem_contagem_instrucoes
+
+# Disciplinas oferecidas pela escola
+DISCIPLINAS = pivot.DISCIPLINAS
+
+# Grava a nota em um único comando (depende do índice único aluno_id/disciplina)
+SQL_ATRIBUIR_NOTA = """
+    INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (aluno_id, disciplina)
+    DO UPDATE SET nota = excluded.nota, funcionario_id = excluded.funcionario_id
+"""
+
+# Quantidade de notas gravadas por transação nas operações em lote
+TAMANHO_LOTE = 5000
+
+# Alunos removidos por transação na remoção em lote (as notas vão em cascata)
+TAMANHO_LOTE_REMOCAO = 500
+
+# Alunos por página na consulta paginada
+TAMANHO_PAGINA = 100
+
+# Motor do pivot de notas: 'sql' (SELECT gerado) ou 'python' (uma passada ordenada)
+MOTOR_PIVOT = 'sql'
+
+# Função para listar as disciplinas exibidas no boletim
+def listar_disciplinas():
+    """Disciplinas padrão seguidas das demais que já possuem notas"""
+    conexao = conectar()
+    if not conexao:
+        return list(DISCIPLINAS)
+
+    try:
+        return list(pivot.listar_disciplinas(conexao, DISCIPLINAS))
+    except Exception as e:
+        print("Erro ao listar disciplinas:", e)
+        return list(DISCIPLINAS)
+    finally:
+        conexao.close()
+
+
+def filtro_faixa_matricula(faixa_matricula, coluna='matricula'):
+    """Condição (ou '') e parâmetros da faixa (de, até) de matrículas; pontas None ficam abertas"""
+    condicoes = []
+    parametros = []
+    de, ate = faixa_matricula or (None, None)
+    if de:
+        condicoes.append(f"{coluna} >= ?")
+        parametros.append(de)
+    if ate:
+        condicoes.append(f"{coluna} <= ?")
+        parametros.append(ate)
+    return ' AND '.join(condicoes), parametros
+
+
+def ler_boletim_alunos(conexao, nome='', after=None, limit=None, matricula=None,
+                       faixa_matricula=None):
+    """
+    Gera o boletim (uma coluna por disciplina) dos alunos cujo nome contém `nome`,
+    ordenados por (nome, id). Lê a tabela boletim materializada quando ela
+    cobre todas as disciplinas; senão agrega as notas na hora.
+    faixa_matricula = (de, até), inclusiva em ordem de texto; None deixa a ponta aberta.
+    """
+    disciplinas = pivot.listar_disciplinas(conexao, DISCIPLINAS)
+    materializado = boletim.boletim_disponivel(conexao, disciplinas)
+    tabela = 'boletim' if materializado else 'alunos'
+
+    filtros = []
+    parametros = []
+    if nome:
+        # Índice FTS5 (trigram) quando disponível, LIKE para termos curtos
+        filtro, parametros_nome = busca.filtro_nome(conexao, nome)
+        filtros.append(filtro)
+        parametros.extend(parametros_nome)
+    if matricula:
+        # Índice único de alunos.matricula (o boletim não indexa a matrícula)
+        filtros.append("id = (SELECT id FROM alunos WHERE matricula = ?)")
+        parametros.append(matricula)
+    faixa, parametros_faixa = filtro_faixa_matricula(faixa_matricula, 'a.matricula')
+    if faixa:
+        # Conferida aluno a aluno na ordem (nome, id): nada é ordenado em memória
+        filtros.append(f"EXISTS (SELECT 1 FROM alunos a WHERE a.id = {tabela}.id AND {faixa})")
+        parametros.extend(parametros_faixa)
+    if after:
+        # Usa o índice de nome para saltar direto para a página
+        filtros.append("(nome, id) > (?, ?)")
+        parametros.extend(after)
+    filtro = f" WHERE {' AND '.join(filtros)}" if filtros else ""
+    filtro += " ORDER BY nome, id"
+    if limit:
+        filtro += " LIMIT ?"
+        parametros.append(limit)
+
+    if materializado:
+        return boletim.ler_boletim(conexao, disciplinas, filtro, parametros)
+    motor = pivot.MOTORES[MOTOR_PIVOT]
+    sql_alunos = f"SELECT id, nome, matricula FROM alunos{filtro}"
+    return motor(conexao, disciplinas, sql_alunos, parametros)
+
+
+def _consultar_pivot(nome='', after=None, limit=None, relatorio=None):
+    """
+    Boletim dos alunos (lista) lido com uma conexão do pool; com `relatorio`,
+    da réplica de relatórios quando ele está roteado para ela
+    """
+    conexao = replica.conectar_relatorio(relatorio) if relatorio else conectar()
+    if not conexao:
+        print("Erro: Não foi possível conectar ao banco de dados.")
+        return []
+
+    try:
+        return list(ler_boletim_alunos(conexao, nome, after, limit))
+
+    except Exception as e:
+        print("Erro ao consultar alunos:", e)
+        return []
+
+    finally:
+        conexao.close()
+
 
 # Função para consultar alunos com suas notas e disciplinas
 def consultar_alunos(nome):
+    return _consultar_pivot(nome, relatorio='boletim')
+
+
+# Função para consultar uma página de alunos (paginação por chave (nome, id))
+def consultar_pagina_alunos(nome='', after=None, limit=TAMANHO_PAGINA):
+    """
+    Retorna até `limit` alunos com notas, ordenados por (nome, id) e
+    posteriores à chave `after` = (nome, id) do último aluno da página anterior.
+    """
+    return _consultar_pivot(nome, after, limit)
+
+
+# Função geradora: percorre todos os alunos página por página
+def consultar_alunos_paginado(nome='', after=None, limit=TAMANHO_PAGINA):
+    """Gera os alunos com notas sob demanda, buscando uma página por vez"""
+    while True:
+        pagina = consultar_pagina_alunos(nome, after, limit)
+        yield from pagina
+        if len(pagina) < limit:
+            return
+        after = (pagina[-1]['nome'], pagina[-1]['id'])
+
+
+# Função para contar os alunos cadastrados
+def contar_alunos():
+    """Total de alunos (contador mantido por gatilho; COUNT(*) se não existir)"""
+    conexao = conectar()
+    if not conexao:
+        print("Erro: Não foi possível conectar ao banco de dados.")
+        return 0
+
+    try:
+        try:
+            linha = conexao.execute(
+                "SELECT valor FROM contadores WHERE nome = 'alunos'").fetchone()
+        except sqlite3.OperationalError:
+            linha = None
+        if linha is None:
+            linha = conexao.execute("SELECT COUNT(*) FROM alunos").fetchone()
+        return linha[0]
+
+    except Exception as e:
+        print("Erro ao contar alunos:", e)
+        return 0
+
+    finally:
+        conexao.close()
+
+
+# Função para buscar uma janela da lista de alunos (listas virtuais)
+def consultar_janela_alunos(offset=0, limit=TAMANHO_PAGINA, after=None):
+    """
+    Retorna até `limit` alunos (id, nome, cpf, matricula, endereco) ordenados por (nome, id).
+    Com `after` = (nome, id) salta pela chave; senão pula `offset` linhas
+    percorrendo só o índice de nome e busca as colunas apenas da janela.
+    """
     conexao = conectar()
     if not conexao:
         print("Erro: Não foi possível conectar ao banco de dados.")
         return []
-    
-    cursor = conexao.cursor()
 
     try:
-        cursor.execute("""
-            SELECT a.id, a.nome, a.matricula,
-                MAX(CASE WHEN n.disciplina = 'Matemática' THEN n.nota END) AS matematica,
-                MAX(CASE WHEN n.disciplina = 'Português' THEN n.nota END) AS portugues,
-                MAX(CASE WHEN n.disciplina = 'História' THEN n.nota END) AS historia,
-                MAX(CASE WHEN n.disciplina = 'Geografia' THEN n.nota END) AS geografia,
-                MAX(CASE WHEN n.disciplina = 'Ciências' THEN n.nota END) AS ciencias,
-                MAX(CASE WHEN n.disciplina = 'Inglês' THEN n.nota END) AS ingles,
-                MAX(CASE WHEN n.disciplina = 'Artes' THEN n.nota END) AS artes,
-                MAX(CASE WHEN n.disciplina = 'Educação Física' THEN n.nota END) AS educacao_fisica
-            FROM alunos a
-            LEFT JOIN notas n ON a.id = n.aluno_id
-            WHERE a.nome LIKE ? OR ? = ''
-            GROUP BY a.id, a.nome, a.matricula
-            ORDER BY a.nome
-        """, (f"%{nome}%", nome))
-
-        # Buscar os resultados e converter para dicionários
-        colunas = [desc[0] for desc in cursor.description]
-        resultados = []
-        for row in cursor.fetchall():
-            resultados.append(dict(zip(colunas, row)))
-        
-        return resultados
+        if after:
+            janela = "SELECT id FROM alunos WHERE (nome, id) > (?, ?) ORDER BY nome, id LIMIT ?"
+            parametros = (*after, limit)
+        else:
+            janela = "SELECT id FROM alunos ORDER BY nome, id LIMIT ? OFFSET ?"
+            parametros = (limit, offset)
+        cursor = conexao.execute(f"""
+            SELECT a.id, a.nome, a.cpf, a.matricula, a.endereco
+            FROM ({janela}) j
+            JOIN alunos a ON a.id = j.id
+            ORDER BY a.nome, a.id
+        """, parametros)
+        return cursor.fetchall()
 
     except Exception as e:
         print("Erro ao consultar alunos:", e)
         return []
 
     finally:
-        cursor.close()
         conexao.close()
 
 
 # Função para atribuir (ou atualizar) uma nota a um aluno
+def _gravar_notas(conexao, linhas, sql):
+    """Garante a coluna de cada disciplina no boletim e grava as notas (roda no escritor)"""
+    boletim.incluir_disciplinas(conexao, {linha[1] for linha in linhas})
+    return conexao.executemany(sql, linhas).rowcount
+
+
+def gravar_notas(linhas, sql=SQL_ATRIBUIR_NOTA, caminho=None):
+    """
+    Grava notas (aluno_id, disciplina, nota, funcionario_id) pelo escritor.
+    Disciplina nova ganha coluna no boletim na mesma transação, então as
+    leituras continuam no boletim materializado.
+    """
+    return gravar_funcao(_gravar_notas, linhas, sql, caminho=caminho)
+
+
 def atribuir_nota(aluno_id, disciplina, nota, funcionario_id):
+    try:
+        # Insere a nota ou atualiza a existente no mesmo comando, pelo escritor
+        # único (o commit é feito junto com o de outras gravações simultâneas)
+        with metricas.DURACAO_GRAVACAO_NOTA.cronometrar():
+            gravar_notas([(aluno_id, disciplina, nota, funcionario_id)])
+        metricas.NOTAS_GRAVADAS.incrementar(modo='individual')
+        repositorio.invalidar_notas(aluno_id)
+        return True
+
+    except Exception as e:
+        metricas.FALHAS.incrementar(operacao='gravar_nota')
+        print("Erro ao atribuir nota:", e)
+        return False
+
+
+def _apagar_aluno(conexao, aluno_id):
+    """Remove o aluno; as notas saem em cascata (roda no escritor). Retorna (alunos, notas)"""
+    notas = conexao.execute("SELECT COUNT(*) FROM notas WHERE aluno_id = ?", (aluno_id,)).fetchone()[0]
+    alunos = conexao.execute("DELETE FROM alunos WHERE id = ?", (aluno_id,)).rowcount
+    return alunos, notas if alunos else 0
+
+
+# Função para remover um aluno e todas as suas notas
+def excluir_aluno(aluno_id, caminho=None):
+    """Remove aluno e notas em uma transação; retorna (alunos_removidos, notas_removidas)"""
+    try:
+        with metricas.DURACAO_REMOCAO.cronometrar():
+            removidos = gravar_funcao(_apagar_aluno, aluno_id, caminho=caminho)
+    except Exception:
+        metricas.FALHAS.incrementar(operacao='remover_aluno')
+        raise
+    metricas.ALUNOS_REMOVIDOS.incrementar(removidos[0])
+    repositorio.invalidar_aluno(aluno_id, caminho)
+    return removidos
+
+
+def _variantes_cpf(cpfs):
+    """
+    Formas em que cada CPF pode estar gravado: como foi digitado, só dígitos e
+    com pontuação (000.000.000-00). Comparar com a coluna sem tratá-la
+    mantém o índice UNIQUE de alunos.cpf.
+    """
+    variantes = []
+    for cpf in cpfs:
+        cpf = str(cpf).strip()
+        digitos = re.sub(r'\D', '', cpf)
+        variantes.append(cpf)
+        variantes.append(digitos)
+        if len(digitos) == 11:
+            variantes.append(f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}")
+    return list(dict.fromkeys(variantes))
+
+
+def criterio_alunos(ids=(), matriculas=(), cpfs=(), filtro=None):
+    """
+    Condição SQL sobre alunos e parâmetros. As listas vão como um único
+    parâmetro JSON (json_each), sem limite de variáveis por instrução.
+    filtro = (condição sobre as colunas de alunos, parâmetros).
+    """
+    cpfs = _variantes_cpf(cpfs)
+    condicoes = []
+    parametros = []
+    for coluna, valores in (('id', [int(i) for i in ids]), ('matricula', list(matriculas)),
+                            ('cpf', cpfs)):
+        if valores:
+            condicoes.append(f"{coluna} IN (SELECT value FROM json_each(?))")
+            parametros.append(json.dumps(valores))
+    if filtro:
+        condicao, valores = filtro
+        condicoes.append(f"({condicao})")
+        parametros.extend(valores)
+    if not condicoes:
+        raise ValueError("Informe ids, matrículas, CPFs ou um filtro.")
+    return ' OR '.join(condicoes), parametros
+
+
+def previa_remocao(ids=(), matriculas=(), cpfs=(), filtro=None, caminho=None, amostra=10):
+    """Alunos e notas que a remoção em lote apagaria: (alunos, notas, [(id, nome, matricula)...])"""
+    condicao, parametros = criterio_alunos(ids, matriculas, cpfs, filtro)
+    conexao = conectar(caminho)
+    if not conexao:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+    try:
+        alunos, notas = conexao.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(
+                (SELECT COUNT(*) FROM notas n WHERE n.aluno_id = a.id)), 0)
+            FROM alunos a WHERE {condicao}
+        """, parametros).fetchone()
+        exemplos = conexao.execute(
+            f"SELECT id, nome, matricula FROM alunos WHERE {condicao} ORDER BY id LIMIT ?",
+            (*parametros, amostra)).fetchall()
+        return alunos, notas, exemplos
+    finally:
+        conexao.close()
+
+
+def _apagar_alunos(conexao, ids):
+    """Remove um lote de alunos em uma instrução; notas em cascata (roda no escritor)"""
+    lista = json.dumps(ids)
+    notas = conexao.execute(
+        "SELECT COUNT(*) FROM notas WHERE aluno_id IN (SELECT value FROM json_each(?))",
+        (lista,)).fetchone()[0]
+    # Cada nota removida dispara os gatilhos de boletim e estatísticas
+    with sem_contagem_instrucoes(conexao):
+        alunos = conexao.execute(
+            "DELETE FROM alunos WHERE id IN (SELECT value FROM json_each(?))", (lista,)).rowcount
+    return alunos, notas
+
+
+def excluir_alunos_em_lote(ids=(), matriculas=(), cpfs=(), filtro=None, caminho=None,
+                           tamanho_lote=TAMANHO_LOTE_REMOCAO, ao_progredir=None):
+    """
+    Remove os alunos escolhidos por id, matrícula, CPF e/ou filtro, com as
+    notas em cascata, em transações de até tamanho_lote alunos (gravações de
+    outros usuários entram entre os lotes). ao_progredir(removidos, total) é
+    chamado após cada lote. Retorna (alunos_removidos, notas_removidas).
+    """
+    condicao, parametros = criterio_alunos(ids, matriculas, cpfs, filtro)
+    conexao = conectar(caminho)
+    if not conexao:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+    try:
+        alvo = [linha[0] for linha in conexao.execute(
+            f"SELECT id FROM alunos WHERE {condicao} ORDER BY id", parametros)]
+    finally:
+        conexao.close()
+
+    alunos = notas = 0
+    try:
+        for inicio in range(0, len(alvo), tamanho_lote):
+            removidos = gravar_funcao(_apagar_alunos, alvo[inicio:inicio + tamanho_lote],
+                                      caminho=caminho)
+            alunos += removidos[0]
+            notas += removidos[1]
+            if ao_progredir:
+                ao_progredir(alunos, len(alvo))
+    except Exception:
+        metricas.FALHAS.incrementar(operacao='remover_alunos_lote')
+        raise
+    finally:
+        if alunos:
+            metricas.ALUNOS_REMOVIDOS.incrementar(alunos)
+            repositorio.invalidar_alunos(caminho)
+            repositorio.invalidar_notas(caminho=caminho)
+    return alunos, notas
+
+
+def _gravar_lote_notas(lote):
+    """Grava um lote de notas em uma única transação"""
+    gravar_notas(lote)
+    metricas.NOTAS_GRAVADAS.incrementar(len(lote), modo='lote')
+    repositorio.invalidar_notas()
+    return len(lote)
+
+
+# Função para atribuir várias notas de uma vez (importações de planilhas)
+def atribuir_notas_em_lote(notas, funcionario_id=1, tamanho_lote=TAMANHO_LOTE, ao_rejeitar=None):
+    """
+    Valida e grava notas (aluno_id, disciplina, nota) em transações por lote.
+    Linhas inválidas são repassadas a ao_rejeitar(indice, linha, motivo).
+    Retorna a tupla (gravadas, rejeitadas). Um erro de gravação interrompe a
+    importação com RuntimeError; os lotes anteriores continuam gravados.
+    """
     conexao = conectar()
     if not conexao:
-        print("Erro: Não foi possível conectar ao banco de dados.")
-        return
-    
-    cursor = conexao.cursor()
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+
+    gravadas = 0
+    rejeitadas = 0
+    disciplinas = set(DISCIPLINAS)
 
     try:
-        # Verifica se já existe nota para essa disciplina
-        cursor.execute("""
-            SELECT id FROM notas
-            WHERE aluno_id = ? AND disciplina = ?
-        """, (aluno_id, disciplina))
-        resultado = cursor.fetchone()
-
-        if resultado:
-            # Atualiza a nota existente
-            cursor.execute("""
-                UPDATE notas SET nota = ?, funcionario_id = ?
-                WHERE id = ?
-            """, (nota, funcionario_id, resultado[0]))
-        else:
-            # Insere nova nota
-            cursor.execute("""
-                INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id)
-                VALUES (?, ?, ?, ?)
-            """, (aluno_id, disciplina, nota, funcionario_id))
+        alunos_existentes = {linha[0] for linha in conexao.execute("SELECT id FROM alunos")}
 
-        conexao.commit()
+        lote = []
+        for indice, (aluno_id, disciplina, nota) in enumerate(notas):
+            motivo = None
+            try:
+                nota = float(nota)
+            except (TypeError, ValueError):
+                motivo = "nota não numérica"
+
+            if motivo is None:
+                if not (0 <= nota <= 10):
+                    motivo = "nota fora do intervalo 0 a 10"
+                elif disciplina not in disciplinas:
+                    motivo = "disciplina desconhecida"
+                elif aluno_id not in alunos_existentes:
+                    motivo = "aluno não encontrado"
+
+            if motivo:
+                rejeitadas += 1
+                if ao_rejeitar:
+                    ao_rejeitar(indice, (aluno_id, disciplina, nota), motivo)
+                continue
+
+            lote.append((aluno_id, disciplina, nota, funcionario_id))
+            if len(lote) >= tamanho_lote:
+                gravadas += _gravar_lote_notas(lote)
+                lote = []
+
+        if lote:
+            gravadas += _gravar_lote_notas(lote)
 
     except Exception as e:
-        print("Erro ao atribuir nota:", e)
-        conexao.rollback()
+        # Lotes anteriores já foram confirmados; o lote atual e o resto da entrada não
+        metricas.FALHAS.incrementar(operacao='atribuir_notas_lote')
+        raise RuntimeError(f"Importação interrompida após {gravadas} nota(s) gravada(s) e "
+                           f"{rejeitadas} rejeitada(s): {e}") from e
 
     finally:
-        cursor.close()
         conexao.close()
+
+    return gravadas, rejeitadas
@@ -0,0 +1,658 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do sistema de notas
+Uso: python benchmark.py [upsert|pivot|busca|servidor|escrita|cpf|suite] [quantidade...]
+     python benchmark.py suite [alunos...] [--json resultados.json]
+     python benchmark.py comparar antes.json depois.json
+"""
+
+import builtins
+import contextlib
+import http.client
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from backend import SQL_ATRIBUIR_NOTA, DISCIPLINAS
+from boletim import ler_boletim
+from busca import busca_disponivel, expressao_fts, filtro_nome
+from conexao import obter_pool
+from escritor import EscritorBD
+from migracoes import aplicar_migracoes
+from pivot import MOTORES, listar_disciplinas
+
+
+# Partes de nomes para gerar alunos com nomes plausíveis
+PRENOMES = ["Ana", "Arthur", "Beatriz", "Bruno", "Carla", "Daniel", "Eduardo", "Fernanda",
+            "Gabriel", "Helena", "Igor", "Julia", "Leandro", "Mariana", "Nicolas", "Paula",
+            "Rafael", "Sofia", "Thiago", "Vitoria"]
+SOBRENOMES = ["Almeida", "Barbosa", "Cardoso", "Coelho", "Correia", "Costa", "Dias",
+              "Ferreira", "Gomes", "Lima", "Machado", "Manuel", "Martins", "Oliveira",
+              "Pereira", "Ribeiro", "Rocha", "Santos", "Silva", "Souza"]
+
+
+def criar_banco_teste(caminho, total_notas, migrar=True, semente=42, total_alunos=None):
+    """
+    Cria um banco temporário com alunos e notas sintéticos.
+    Sem `total_alunos`, cria alunos suficientes para todas as disciplinas.
+    """
+    aleatorio = random.Random(semente)
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript("""
+        CREATE TABLE funcionario (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            cpf TEXT UNIQUE NOT NULL,
+            senha TEXT NOT NULL
+        );
+        CREATE TABLE alunos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            cpf TEXT UNIQUE NOT NULL,
+            endereco TEXT NOT NULL,
+            matricula TEXT UNIQUE
+        );
+        CREATE TABLE notas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            aluno_id INTEGER NOT NULL,
+            disciplina TEXT NOT NULL,
+            nota REAL NOT NULL,
+            funcionario_id INTEGER NOT NULL,
+            FOREIGN KEY (aluno_id) REFERENCES alunos(id),
+            FOREIGN KEY (funcionario_id) REFERENCES funcionario(id)
+        );
+        INSERT INTO funcionario (nome, cpf, senha)
+        VALUES ('Administrador', '12345678900', 'admin123');
+    """)
+
+    alunos_com_notas = max(1, total_notas // len(DISCIPLINAS))
+    total_alunos = total_alunos or alunos_com_notas
+    conexao.executemany(
+        "INSERT INTO alunos (id, nome, cpf, endereco, matricula) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"{aleatorio.choice(PRENOMES)} {aleatorio.choice(SOBRENOMES)} "
+             f"{aleatorio.choice(SOBRENOMES)}",
+          f"{i:011d}", "Rua Teste", f"MAT{i:04d}") for i in range(1, total_alunos + 1)))
+    conexao.executemany(
+        "INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id) VALUES (?, ?, ?, 1)",
+        ((aluno_id, disciplina, round(aleatorio.uniform(0, 10), 1))
+         for aluno_id in range(1, min(total_alunos, alunos_com_notas) + 1)
+         for disciplina in DISCIPLINAS))
+    conexao.commit()
+    if migrar:
+        aplicar_migracoes(conexao)
+    return conexao, total_alunos
+
+
+def resumo(tempos):
+    """Resumo de latências em milissegundos"""
+    ordenados = sorted(tempos)
+    return {
+        'media_ms': statistics.fmean(ordenados) * 1000,
+        'p50_ms': ordenados[len(ordenados) // 2] * 1000,
+        'p95_ms': ordenados[int(len(ordenados) * 0.95)] * 1000,
+        'p99_ms': ordenados[int(len(ordenados) * 0.99)] * 1000,
+    }
+
+
+def _gravar_nota_antigo(conexao, aluno_id, disciplina, nota):
+    """Caminho anterior: SELECT seguido de UPDATE ou INSERT"""
+    cursor = conexao.execute(
+        "SELECT id FROM notas WHERE aluno_id = ? AND disciplina = ?", (aluno_id, disciplina))
+    resultado = cursor.fetchone()
+    if resultado:
+        conexao.execute("UPDATE notas SET nota = ?, funcionario_id = ? WHERE id = ?",
+                        (nota, 1, resultado[0]))
+    else:
+        conexao.execute(
+            "INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id) VALUES (?, ?, ?, ?)",
+            (aluno_id, disciplina, nota, 1))
+    conexao.commit()
+
+
+def _gravar_nota_upsert(conexao, aluno_id, disciplina, nota):
+    """Caminho atual: um único INSERT ... ON CONFLICT DO UPDATE"""
+    conexao.execute(SQL_ATRIBUIR_NOTA, (aluno_id, disciplina, nota, 1))
+    conexao.commit()
+
+
+def benchmark_upsert(total_notas=100_000, operacoes=300):
+    """Compara a latência de gravação de nota: SELECT+UPDATE/INSERT x UPSERT"""
+    print(f"\n⏱️  GRAVAÇÃO DE NOTAS ({total_notas} notas, {operacoes} gravações)")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as pasta:
+        for rotulo, migrar, gravar in (
+                ("SELECT + UPDATE/INSERT (sem índice)", False, _gravar_nota_antigo),
+                ("UPSERT com índice único", True, _gravar_nota_upsert)):
+            caminho = os.path.join(pasta, f"bench_{int(migrar)}.db")
+            conexao, total_alunos = criar_banco_teste(caminho, total_notas, migrar=migrar)
+            conexao.execute("PRAGMA synchronous = OFF")
+            aleatorio = random.Random(7)
+            tempos = []
+            for _ in range(operacoes):
+                aluno_id = aleatorio.randint(1, total_alunos)
+                disciplina = aleatorio.choice(DISCIPLINAS)
+                inicio = time.perf_counter()
+                gravar(conexao, aluno_id, disciplina, round(aleatorio.uniform(0, 10), 1))
+                tempos.append(time.perf_counter() - inicio)
+            conexao.close()
+            r = resumo(tempos)
+            print(f"{rotulo:<38} média {r['media_ms']:.3f} ms | "
+                  f"p50 {r['p50_ms']:.3f} ms | p95 {r['p95_ms']:.3f} ms")
+
+
+# Consulta pivot original, com as oito disciplinas fixas
+SQL_PIVOT_FIXO = """
+    SELECT a.id, a.nome, a.matricula,
+        MAX(CASE WHEN n.disciplina = 'Matemática' THEN n.nota END) AS matematica,
+        MAX(CASE WHEN n.disciplina = 'Português' THEN n.nota END) AS portugues,
+        MAX(CASE WHEN n.disciplina = 'História' THEN n.nota END) AS historia,
+        MAX(CASE WHEN n.disciplina = 'Geografia' THEN n.nota END) AS geografia,
+        MAX(CASE WHEN n.disciplina = 'Ciências' THEN n.nota END) AS ciencias,
+        MAX(CASE WHEN n.disciplina = 'Inglês' THEN n.nota END) AS ingles,
+        MAX(CASE WHEN n.disciplina = 'Artes' THEN n.nota END) AS artes,
+        MAX(CASE WHEN n.disciplina = 'Educação Física' THEN n.nota END) AS educacao_fisica
+    FROM alunos a
+    LEFT JOIN notas n ON a.id = n.aluno_id
+    WHERE a.nome LIKE ? OR ? = ''
+    GROUP BY a.id, a.nome, a.matricula
+    ORDER BY a.nome
+"""
+
+
+def benchmark_pivot(total_notas=None, repeticoes=3):
+    """Compara o pivot fixo com os motores dinâmicos e o boletim materializado"""
+    for tamanho in ([total_notas] if total_notas else [10_000, 100_000, 1_000_000]):
+        print(f"\n⏱️  PIVOT DO BOLETIM ({tamanho} notas, melhor de {repeticoes})")
+        print("=" * 60)
+        with tempfile.TemporaryDirectory() as pasta:
+            conexao, _ = criar_banco_teste(os.path.join(pasta, "bench.db"), tamanho)
+            sql_alunos = "SELECT id, nome, matricula FROM alunos"
+
+            def fixo():
+                cursor = conexao.execute(SQL_PIVOT_FIXO, ("%%", ""))
+                colunas = [desc[0] for desc in cursor.description]
+                return [dict(zip(colunas, linha)) for linha in cursor]
+
+            def dinamico(motor):
+                disciplinas = listar_disciplinas(conexao, DISCIPLINAS)
+                return list(MOTORES[motor](conexao, disciplinas, sql_alunos))
+
+            def materializado():
+                disciplinas = listar_disciplinas(conexao, DISCIPLINAS)
+                return list(ler_boletim(conexao, disciplinas, " ORDER BY nome, id"))
+
+            for rotulo, funcao in (("CASE fixo (8 disciplinas)", fixo),
+                                   ("SQL gerado (cache)", lambda: dinamico('sql')),
+                                   ("Python (uma passada)", lambda: dinamico('python')),
+                                   ("Boletim materializado", materializado)):
+                tempos = []
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    linhas = funcao()
+                    tempos.append(time.perf_counter() - inicio)
+                print(f"{rotulo:<28} {min(tempos) * 1000:9.1f} ms  ({len(linhas)} alunos)")
+            conexao.close()
+
+
+def benchmark_busca(total_alunos=500_000, repeticoes=5):
+    """Compara a busca por nome com LIKE '%termo%' e com o índice FTS5 trigram"""
+    print(f"\n⏱️  BUSCA DE ALUNOS POR NOME ({total_alunos} alunos, melhor de {repeticoes})")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as pasta:
+        conexao, _ = criar_banco_teste(os.path.join(pasta, "bench.db"), 0,
+                                       total_alunos=total_alunos)
+        if not busca_disponivel(conexao):
+            print("❌ SQLite sem FTS5: nada a comparar.")
+            conexao.close()
+            return
+
+        def medir(sql, parametros):
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                linhas = conexao.execute(sql, parametros).fetchall()
+                tempos.append(time.perf_counter() - inicio)
+            return min(tempos) * 1000, len(linhas)
+
+        for termo in ("Silva", "Coelho Manuel", "Vitoria Rocha Dias", "oelh"):
+            like_ms, encontrados = medir(
+                "SELECT id FROM alunos WHERE nome LIKE ? ORDER BY nome, id", (f"%{termo}%",))
+            fts_ms, encontrados_fts = medir(f"""
+                SELECT id FROM alunos WHERE {filtro_nome(conexao, termo)[0]} ORDER BY nome, id
+            """, filtro_nome(conexao, termo)[1])
+            rank_ms, _ = medir("""
+                SELECT rowid FROM alunos_busca WHERE alunos_busca MATCH ? ORDER BY rank LIMIT 50
+            """, (expressao_fts(termo, 'nome'),))
+            assert encontrados == encontrados_fts
+            print(f"'{termo}' ({encontrados} alunos): LIKE {like_ms:8.1f} ms | "
+                  f"FTS5 {fts_ms:8.1f} ms | FTS5 top 50 por relevância {rank_ms:8.1f} ms")
+        conexao.close()
+
+
+def _gerar_cpf(aleatorio):
+    """CPF com dígitos verificadores corretos, às vezes formatado ou corrompido"""
+    digitos = [aleatorio.randint(0, 9) for _ in range(9)]
+    for pesos in (range(10, 1, -1), range(11, 1, -1)):
+        resto = sum(d * p for d, p in zip(digitos, pesos)) % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    cpf = ''.join(map(str, digitos))
+    sorteio = aleatorio.random()
+    if sorteio < 0.3:
+        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+    if sorteio < 0.4:
+        return cpf[:10] + str((digitos[10] + 1) % 10)
+    if sorteio < 0.45:
+        return cpf[:aleatorio.randint(0, 10)]
+    return cpf
+
+
+def benchmark_cpf(quantidade=1_000_000, repeticoes=3):
+    """Validação de CPFs: função individual (laço Python) x validar_cpfs (NumPy)"""
+    from sistema_escolar_completo import validar_cpf
+    from validacao_cpf import validar_cpfs
+
+    print(f"\n⏱️  VALIDAÇÃO DE CPFs ({quantidade} CPFs, melhor de {repeticoes})")
+    print("=" * 60)
+    aleatorio = random.Random(11)
+    cpfs = [_gerar_cpf(aleatorio) for _ in range(quantidade)]
+
+    resultados = {}
+    for rotulo, funcao in (("validar_cpf (um por vez)", lambda: [validar_cpf(c) for c in cpfs]),
+                           ("validar_cpfs (NumPy)", lambda: validar_cpfs(cpfs)[0])):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultados[rotulo] = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        print(f"{rotulo:<28} {min(tempos) * 1000:9.1f} ms  "
+              f"({quantidade / min(tempos):,.0f} CPFs/s)")
+    escalar, vetorial = resultados.values()
+    assert list(vetorial) == escalar, "resultados divergentes"
+    print(f"✅ Mesmo resultado ({sum(escalar)} válidos)")
+
+
+def _gravar_concorrente(gravar, threads, gravacoes, total_alunos):
+    """`threads` professores gravando `gravacoes` notas cada; retorna (duração, latências, erros)"""
+    tempos = []
+    erros = []
+    trava = threading.Lock()
+
+    def professor(semente):
+        aleatorio = random.Random(semente)
+        locais = []
+        for _ in range(gravacoes):
+            parametros = (aleatorio.randint(1, total_alunos), aleatorio.choice(DISCIPLINAS),
+                          round(aleatorio.uniform(0, 10), 1), 1)
+            inicio = time.perf_counter()
+            try:
+                gravar(parametros)
+                locais.append(time.perf_counter() - inicio)
+            except sqlite3.Error as e:
+                with trava:
+                    erros.append(str(e))
+        with trava:
+            tempos.extend(locais)
+
+    lista = [threading.Thread(target=professor, args=(i,)) for i in range(threads)]
+    inicio = time.perf_counter()
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    return time.perf_counter() - inicio, tempos, erros
+
+
+def benchmark_escrita(total_notas=100_000, threads=16, gravacoes=100):
+    """Gravações simultâneas: commit individual por conexão x escritor único com commit em grupo"""
+    print(f"\n⏱️  GRAVAÇÕES SIMULTÂNEAS ({total_notas} notas, {threads} threads x {gravacoes} notas)")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        conexao, total_alunos = criar_banco_teste(caminho, total_notas)
+        conexao.close()
+
+        locais = threading.local()
+
+        def commit_individual(parametros):
+            # Caminho anterior: cada gravação com a sua conexão e o seu commit
+            if not hasattr(locais, 'conexao'):
+                locais.conexao = sqlite3.connect(caminho, timeout=5)
+            locais.conexao.execute(SQL_ATRIBUIR_NOTA, parametros)
+            locais.conexao.commit()
+
+        escritor = EscritorBD(caminho)
+        for rotulo, gravar in (("Commit individual (rollback journal)", commit_individual),
+                               ("Escritor único, commit em grupo (WAL)",
+                                lambda parametros: escritor.executar(SQL_ATRIBUIR_NOTA, parametros))):
+            duracao, tempos, erros = _gravar_concorrente(gravar, threads, gravacoes, total_alunos)
+            r = resumo(tempos) if tempos else {'p50_ms': 0.0, 'p95_ms': 0.0}
+            print(f"{rotulo:<38} {len(tempos) / duracao:8.0f} notas/s | p50 {r['p50_ms']:.2f} ms | "
+                  f"p95 {r['p95_ms']:.2f} ms | {len(erros)} erro(s)"
+                  + (f" ({erros[0]})" if erros else ""))
+        estatisticas = escritor.estatisticas()
+        print(f"Escritor: {estatisticas['lotes']} transações, "
+              f"{estatisticas['tamanho_medio_lote']:.1f} comandos por lote "
+              f"(maior {estatisticas['maior_lote']})")
+        escritor.encerrar()
+
+
+def _carga(porta, caminhos, clientes, duracao):
+    """
+    `clientes` threads com conexões HTTP persistentes pedem caminhos sorteados
+    durante `duracao` segundos. Retorna (latências, erros).
+    """
+    tempos = []
+    erros = []
+    trava = threading.Lock()
+    fim = time.perf_counter() + duracao
+
+    def cliente(semente):
+        aleatorio = random.Random(semente)
+        cliente_http = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+        locais = []
+        try:
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                cliente_http.request('GET', aleatorio.choice(caminhos))
+                resposta = cliente_http.getresponse()
+                corpo = resposta.read()
+                locais.append(time.perf_counter() - inicio)
+                if resposta.status != 200:
+                    erros.append(resposta.status)
+                else:
+                    json.loads(corpo)
+        finally:
+            cliente_http.close()
+            with trava:
+                tempos.extend(locais)
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return tempos, erros
+
+
+def benchmark_servidor(total_notas=100_000, clientes=8, duracao=3.0):
+    """Requisições por segundo do serviço HTTP/JSON contra um arquivo SQLite local"""
+    from servidor import criar_servidor
+
+    print(f"\n⏱️  SERVIÇO HTTP ({total_notas} notas, {clientes} clientes, {duracao:.0f} s por rota)")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        conexao, total_alunos = criar_banco_teste(caminho, total_notas)
+        conexao.close()
+
+        servidor = criar_servidor(0, caminho, registrar_acessos=False)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        aleatorio = random.Random(3)
+        cenarios = (
+            ("Boletim por matrícula", [f"/boletim/MAT{aleatorio.randint(1, total_alunos):04d}"
+                                       for _ in range(1000)]),
+            ("Busca (top 20)", [f"/alunos?busca={termo}&limite=20"
+                                for termo in ("Silva", "Coelho", "Rocha%20Dias", "Vitoria")]),
+            ("Pivot, página de 100", ["/pivot?limite=100", "/pivot?nome=Silva&limite=100"]),
+            ("Estatísticas", ["/estatisticas"]),
+        )
+        try:
+            for rotulo, caminhos in cenarios:
+                tempos, erros = _carga(servidor.server_port, caminhos, clientes, duracao)
+                r = resumo(tempos)
+                print(f"{rotulo:<24} {len(tempos) / duracao:8.0f} req/s | "
+                      f"p50 {r['p50_ms']:.2f} ms | p95 {r['p95_ms']:.2f} ms"
+                      + (f" | {len(erros)} erro(s)" if erros else ""))
+
+            inicio = time.perf_counter()
+            cliente_http = http.client.HTTPConnection('127.0.0.1', servidor.server_port)
+            cliente_http.request('GET', '/pivot')
+            alunos = len(json.loads(cliente_http.getresponse().read()))
+            cliente_http.close()
+            print(f"{'Pivot completo (stream)':<24} {(time.perf_counter() - inicio) * 1000:8.1f} ms "
+                  f"({alunos} alunos)")
+            print(f"Pool: {obter_pool(caminho).estatisticas()['abertas']} conexões abertas")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+            obter_pool(caminho).fechar()
+
+
+# Tamanhos da suíte (alunos, cada um com uma nota por disciplina)
+TAMANHOS_SUITE = (1_000, 100_000, 1_000_000)
+
+# Execuções "quentes" por operação (limitadas também pelo tempo)
+ITERACOES_SUITE = 200
+TEMPO_MAXIMO_OPERACAO = 10.0
+
+# Regressão destacada na comparação (p50 ou p95 maior que isto)
+LIMITE_REGRESSAO = 1.10
+
+# Termos seletivos para a consulta por nome (dezenas de alunos mesmo com 1M)
+TERMOS_SUITE = ("Vitoria Rocha Dias", "Arthur Lima Souza", "Coelho Manuel Costa",
+                "Helena Gomes Silva")
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _esfriar():
+    """Conexões novas e caches do sistema vazios (o cache de disco do SO permanece)"""
+    import escritor
+    import repositorio
+    from conexao import fechar_pools
+
+    escritor.encerrar_escritores()
+    fechar_pools()
+    repositorio.obter_repositorio().limpar()
+
+
+def _operacoes_suite(total_alunos):
+    """(nome, função(i)) na ordem de execução: leituras antes das gravações"""
+    import backend
+    import cadastro
+    import main as menu
+    import remover_aluno
+
+    aleatorio = random.Random(5)
+
+    def consultar(i):
+        return backend.consultar_alunos(TERMOS_SUITE[i % len(TERMOS_SUITE)])
+
+    def atribuir(i):
+        return backend.atribuir_nota(aleatorio.randint(1, total_alunos),
+                                     aleatorio.choice(DISCIPLINAS),
+                                     round(aleatorio.uniform(0, 10), 1), 1)
+
+    def cadastrar(i):
+        # CPFs com 9 inicial não colidem com os do gerador (zeros à esquerda)
+        return cadastro.cadastrar_aluno(f"Aluno Suite {i}", f"9{i:010d}", "Rua Teste")
+
+    def remover(i):
+        # Percorre os ids de trás para frente: cada execução remove um aluno com notas
+        return remover_aluno.remover_aluno_por_id(total_alunos - i)
+
+    return (
+        ('consultar_alunos', consultar),
+        ('estatisticas', lambda i: menu.estatisticas()),
+        ('atribuir_nota', atribuir),
+        ('cadastrar_aluno', cadastrar),
+        ('remover_aluno_por_id', remover),
+    )
+
+
+def _medir_operacao(funcao, contador):
+    """Uma execução fria, execuções quentes (latências) e o pico de memória de uma execução"""
+    _esfriar()
+    inicio = time.perf_counter()
+    funcao(next(contador))
+    frio = time.perf_counter() - inicio
+
+    tempos = []
+    limite = time.perf_counter() + TEMPO_MAXIMO_OPERACAO
+    while len(tempos) < ITERACOES_SUITE and time.perf_counter() < limite:
+        inicio = time.perf_counter()
+        funcao(next(contador))
+        tempos.append(time.perf_counter() - inicio)
+
+    # O tracemalloc deixa a execução mais lenta: medido à parte
+    tracemalloc.start()
+    try:
+        funcao(next(contador))
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'frio_ms': frio * 1000, **resumo(tempos), 'iteracoes': len(tempos),
+            'pico_memoria_kb': pico / 1024}
+
+
+def benchmark_suite(tamanhos=TAMANHOS_SUITE, caminho_json=None):
+    """
+    Mede as operações principais do sistema (consulta, estatísticas, nota,
+    cadastro, remoção) em bancos sintéticos determinísticos de cada tamanho.
+    Grava os resultados em JSON para comparar commits.
+    """
+    from conexao import CAMINHO_BANCO
+
+    if isinstance(tamanhos, int):
+        tamanhos = (tamanhos,)
+    commit = _commit_atual()
+    caminho_json = os.path.abspath(caminho_json or f"benchmark_suite_{commit or 'local'}.json")
+    resultado = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'iteracoes': ITERACOES_SUITE,
+        'tamanhos': {},
+    }
+
+    diretorio_original = os.getcwd()
+    entrada_original = builtins.input
+    for total_alunos in tamanhos:
+        print(f"\n⏱️  SUÍTE ({total_alunos} alunos, {total_alunos * len(DISCIPLINAS)} notas)")
+        print("=" * 60)
+        with tempfile.TemporaryDirectory() as pasta:
+            # Os módulos abrem o banco padrão relativo ao diretório atual
+            os.chdir(pasta)
+            builtins.input = lambda *args: 's'  # confirmações da remoção
+            try:
+                inicio = time.perf_counter()
+                conexao, _ = criar_banco_teste(CAMINHO_BANCO, total_alunos * len(DISCIPLINAS),
+                                               total_alunos=total_alunos)
+                conexao.close()
+                geracao = time.perf_counter() - inicio
+                print(f"{'Geração dos dados':<24} {geracao:9.1f} s")
+
+                medidas = {}
+                for nome, funcao in _operacoes_suite(total_alunos):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        medidas[nome] = m = _medir_operacao(funcao, itertools.count())
+                    print(f"{nome:<24} frio {m['frio_ms']:9.2f} ms | p50 {m['p50_ms']:8.2f} | "
+                          f"p95 {m['p95_ms']:8.2f} | p99 {m['p99_ms']:8.2f} ms | "
+                          f"pico {m['pico_memoria_kb']:9.0f} KB")
+                resultado['tamanhos'][str(total_alunos)] = {
+                    'geracao_s': geracao, 'operacoes': medidas}
+            finally:
+                _esfriar()
+                builtins.input = entrada_original
+                os.chdir(diretorio_original)
+
+    with open(caminho_json, 'w', encoding='utf-8') as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados gravados em {caminho_json}")
+    return resultado
+
+
+def comparar_resultados(caminho_antes, caminho_depois):
+    """Compara dois JSON da suíte: razão depois/antes de p50 e p95 por operação"""
+    with open(caminho_antes, encoding='utf-8') as arquivo:
+        antes = json.load(arquivo)
+    with open(caminho_depois, encoding='utf-8') as arquivo:
+        depois = json.load(arquivo)
+
+    print(f"\n📊 {antes.get('commit') or caminho_antes} → {depois.get('commit') or caminho_depois}")
+    regressoes = 0
+    for tamanho, dados in depois['tamanhos'].items():
+        anteriores = antes['tamanhos'].get(tamanho)
+        if not anteriores:
+            continue
+        print(f"\n{tamanho} alunos")
+        for nome, medida in dados['operacoes'].items():
+            anterior = anteriores['operacoes'].get(nome)
+            if not anterior:
+                continue
+            razoes = [medida[chave] / anterior[chave] if anterior[chave] else 1.0
+                      for chave in ('p50_ms', 'p95_ms')]
+            pior = max(razoes) > LIMITE_REGRESSAO
+            regressoes += pior
+            print(f"{'⚠️ ' if pior else '  '}{nome:<24} p50 {anterior['p50_ms']:8.2f} → "
+                  f"{medida['p50_ms']:8.2f} ms (x{razoes[0]:.2f}) | p95 x{razoes[1]:.2f}")
+    print(f"\n{regressoes} operação(ões) mais lenta(s) que x{LIMITE_REGRESSAO:.2f}")
+    return regressoes
+
+
+BENCHMARKS = {
+    'upsert': benchmark_upsert,
+    'pivot': benchmark_pivot,
+    'busca': benchmark_busca,
+    'servidor': benchmark_servidor,
+    'escrita': benchmark_escrita,
+    'cpf': benchmark_cpf,
+    'suite': benchmark_suite,
+}
+
+
+def main():
+    argumentos = sys.argv[1:]
+    if argumentos[:1] == ['comparar']:
+        if len(argumentos) != 3:
+            print("Uso: python benchmark.py comparar antes.json depois.json")
+            sys.exit(1)
+        sys.exit(1 if comparar_resultados(argumentos[1], argumentos[2]) else 0)
+
+    caminho_json = None
+    if '--json' in argumentos:
+        posicao = argumentos.index('--json')
+        caminho_json = argumentos[posicao + 1]
+        del argumentos[posicao:posicao + 2]
+
+    nomes = [arg for arg in argumentos if not arg.isdigit()] or list(BENCHMARKS)
+    tamanhos = [int(arg) for arg in argumentos if arg.isdigit()]
+    for nome in nomes:
+        if nome == 'suite':
+            # A suíte recebe todos os tamanhos juntos (um único JSON)
+            benchmark_suite(tamanhos or TAMANHOS_SUITE, caminho_json)
+            continue
+        if nome not in BENCHMARKS:
+            print(f"❌ Benchmark desconhecido: {nome}. Opções: {', '.join(BENCHMARKS)}")
+            continue
+        if tamanhos:
+            for tamanho in tamanhos:
+                BENCHMARKS[nome](tamanho)
+        else:
+            BENCHMARKS[nome]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Boletim materializado: uma linha por aluno, uma coluna por disciplina e a média
+Mantido por gatilhos em alunos/notas; leitura é uma varredura indexada simples.
+Uso: python boletim.py reconstruir|verificar [banco.db]
+"""
+
+import sys
+
+import pivot
+
+# Diferença máxima aceita em soma/média (acúmulo de ponto flutuante)
+TOLERANCIA = 1e-6
+
+GATILHOS = (
+    'trg_boletim_alunos_insert', 'trg_boletim_alunos_update', 'trg_boletim_alunos_delete',
+    'trg_boletim_notas_insert', 'trg_boletim_notas_update', 'trg_boletim_notas_delete',
+)
+
+
+def _identificador(nome):
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _literal(texto):
+    return "'" + texto.replace("'", "''") + "'"
+
+
+def disciplinas_do_boletim(conexao):
+    """Disciplinas materializadas como colunas, na ordem de exibição"""
+    return tuple(linha[0] for linha in conexao.execute(
+        "SELECT disciplina FROM boletim_disciplinas ORDER BY posicao"))
+
+
+def _existe_boletim(conexao):
+    return conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'boletim_disciplinas'"
+    ).fetchone() is not None
+
+
+def boletim_disponivel(conexao, disciplinas):
+    """True se o boletim existe e tem coluna para todas as disciplinas informadas"""
+    if not _existe_boletim(conexao):
+        return False
+    return set(disciplinas) <= set(disciplinas_do_boletim(conexao))
+
+
+def incluir_disciplinas(conexao, disciplinas):
+    """
+    Dá coluna no boletim às disciplinas que ainda não têm: ALTER TABLE e
+    gatilhos recriados na transação de quem grava a nota (chamar antes do
+    INSERT). Retorna as disciplinas incluídas.
+    """
+    if not _existe_boletim(conexao):
+        return ()
+    atuais = disciplinas_do_boletim(conexao)
+    novas = tuple(sorted({d for d in disciplinas if d} - set(atuais)))
+    if not novas:
+        return ()
+
+    todas = atuais + novas
+    # As chaves das disciplinas atuais não mudam: cada uma só depende das anteriores
+    colunas = pivot.colunas_disciplinas(todas)[len(atuais):]
+    for posicao, (disciplina, coluna) in enumerate(zip(novas, colunas), len(atuais)):
+        conexao.execute(f"ALTER TABLE boletim ADD COLUMN {_identificador(coluna)} REAL")
+        conexao.execute(
+            "INSERT INTO boletim_disciplinas (posicao, disciplina, coluna) VALUES (?, ?, ?)",
+            (posicao, disciplina, coluna))
+        # Notas gravadas antes da coluna existir (soma e média já as contam)
+        if conexao.execute("SELECT 1 FROM notas WHERE disciplina = ? LIMIT 1",
+                           (disciplina,)).fetchone():
+            conexao.execute(f"""
+                UPDATE boletim SET {_identificador(coluna)} = (
+                    SELECT nota FROM notas WHERE aluno_id = boletim.id AND disciplina = ?)
+            """, (disciplina,))
+
+    for gatilho in GATILHOS:
+        conexao.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    for sql in _sql_gatilhos(todas):
+        conexao.execute(sql)
+    return novas
+
+
+def ler_boletim(conexao, disciplinas, filtro="", parametros=()):
+    """
+    Lê o boletim já materializado, com as mesmas chaves do pivot dinâmico.
+    `filtro` é o trecho WHERE/LIMIT aplicado à tabela boletim (ordem nome, id).
+    """
+    disciplinas = tuple(disciplinas)
+    mapa = dict(conexao.execute("SELECT disciplina, coluna FROM boletim_disciplinas"))
+    selecao = "".join(
+        f", {_identificador(mapa[disciplina])} AS {_identificador(chave)}"
+        for disciplina, chave in zip(disciplinas, pivot.colunas_disciplinas(disciplinas)))
+    cursor = conexao.execute(
+        f"SELECT id, nome, matricula{selecao} FROM boletim{filtro}", parametros)
+    colunas = [desc[0] for desc in cursor.description]
+    for linha in cursor:
+        yield dict(zip(colunas, linha))
+
+
+def _sql_gatilhos(disciplinas):
+    """Gatilhos que aplicam cada alteração de alunos/notas ao boletim"""
+    colunas = pivot.colunas_disciplinas(disciplinas)
+
+    def atribuir(registro, valor):
+        return ",\n            ".join(
+            f"{_identificador(coluna)} = CASE WHEN {registro}.disciplina = {_literal(disciplina)} "
+            f"THEN {valor} ELSE {_identificador(coluna)} END"
+            for disciplina, coluna in zip(disciplinas, colunas))
+
+    def somar(registro):
+        return (f"soma = soma + {registro}.nota,\n"
+                f"            quantidade = quantidade + 1,\n"
+                f"            media = (soma + {registro}.nota) / (quantidade + 1)")
+
+    def subtrair(registro):
+        return (f"soma = CASE WHEN quantidade > 1 THEN soma - {registro}.nota ELSE 0 END,\n"
+                f"            quantidade = quantidade - 1,\n"
+                f"            media = CASE WHEN quantidade > 1 "
+                f"THEN (soma - {registro}.nota) / (quantidade - 1) END")
+
+    def separar(*partes):
+        return ",\n            ".join(parte for parte in partes if parte)
+
+    adicionar = (f"UPDATE boletim SET\n            {separar(atribuir('NEW', 'NEW.nota'), somar('NEW'))}\n"
+                 f"        WHERE id = NEW.aluno_id;")
+    remover = (f"UPDATE boletim SET\n            {separar(atribuir('OLD', 'NULL'), subtrair('OLD'))}\n"
+               f"        WHERE id = OLD.aluno_id;")
+
+    return [
+        """CREATE TRIGGER trg_boletim_alunos_insert AFTER INSERT ON alunos BEGIN
+        INSERT OR IGNORE INTO boletim (id, nome, matricula) VALUES (NEW.id, NEW.nome, NEW.matricula);
+    END""",
+        """CREATE TRIGGER trg_boletim_alunos_update AFTER UPDATE OF nome, matricula ON alunos BEGIN
+        UPDATE boletim SET nome = NEW.nome, matricula = NEW.matricula WHERE id = NEW.id;
+    END""",
+        """CREATE TRIGGER trg_boletim_alunos_delete AFTER DELETE ON alunos BEGIN
+        DELETE FROM boletim WHERE id = OLD.id;
+    END""",
+        f"""CREATE TRIGGER trg_boletim_notas_insert AFTER INSERT ON notas BEGIN
+        {adicionar}
+    END""",
+        f"""CREATE TRIGGER trg_boletim_notas_update AFTER UPDATE OF aluno_id, disciplina, nota ON notas BEGIN
+        {remover}
+        {adicionar}
+    END""",
+        f"""CREATE TRIGGER trg_boletim_notas_delete AFTER DELETE ON notas BEGIN
+        {remover}
+    END""",
+    ]
+
+
+def _sql_agregado_vivo(disciplinas, ordem):
+    """Agregação direta de alunos/notas com as mesmas colunas do boletim"""
+    colunas = "".join(
+        f",\n            MAX(CASE WHEN n.disciplina = {_literal(disciplina)} THEN n.nota END)"
+        for disciplina in disciplinas)
+    return f"""
+        SELECT a.id, a.nome, a.matricula{colunas},
+            COALESCE(SUM(n.nota), 0), COUNT(n.id), AVG(n.nota)
+        FROM alunos a
+        LEFT JOIN notas n ON a.id = n.aluno_id
+        GROUP BY a.id
+        ORDER BY {ordem}
+    """
+
+
+def reconstruir_boletim(conexao, disciplinas=None):
+    """Recria tabela, gatilhos e conteúdo do boletim a partir das notas (chamar em transação)"""
+    if disciplinas is None:
+        disciplinas = pivot.listar_disciplinas(conexao, pivot.DISCIPLINAS)
+    disciplinas = tuple(disciplinas)
+    colunas = pivot.colunas_disciplinas(disciplinas)
+
+    for gatilho in GATILHOS:
+        conexao.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    conexao.execute("DROP TABLE IF EXISTS boletim")
+    conexao.execute("DROP TABLE IF EXISTS boletim_disciplinas")
+
+    definicoes = "".join(f"\n            {_identificador(coluna)} REAL," for coluna in colunas)
+    conexao.execute(f"""
+        CREATE TABLE boletim (
+            id INTEGER PRIMARY KEY,
+            nome TEXT,
+            matricula TEXT,{definicoes}
+            soma REAL NOT NULL DEFAULT 0,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            media REAL
+        )
+    """)
+    conexao.execute("CREATE INDEX idx_boletim_nome ON boletim (nome)")
+    conexao.execute("""
+        CREATE TABLE boletim_disciplinas (
+            posicao INTEGER PRIMARY KEY,
+            disciplina TEXT UNIQUE NOT NULL,
+            coluna TEXT NOT NULL
+        )
+    """)
+    conexao.executemany(
+        "INSERT INTO boletim_disciplinas (posicao, disciplina, coluna) VALUES (?, ?, ?)",
+        [(posicao, disciplina, coluna)
+         for posicao, (disciplina, coluna) in enumerate(zip(disciplinas, colunas))])
+
+    nomes = ", ".join(['id', 'nome', 'matricula', *map(_identificador, colunas),
+                       'soma', 'quantidade', 'media'])
+    conexao.execute(f"INSERT INTO boletim ({nomes}) {_sql_agregado_vivo(disciplinas, 'a.id')}")
+
+    for sql in _sql_gatilhos(disciplinas):
+        conexao.execute(sql)
+
+
+def _iguais(esperado, encontrado, tolerancia=0.0):
+    if esperado is None or encontrado is None:
+        return esperado is None and encontrado is None
+    if isinstance(esperado, (int, float)) and isinstance(encontrado, (int, float)):
+        return abs(esperado - encontrado) <= tolerancia
+    return esperado == encontrado
+
+
+def verificar_boletim(conexao, limite=100):
+    """
+    Compara o boletim com a agregação direta de alunos/notas.
+    Retorna a lista de divergências (até `limite`) como dicionários.
+    """
+    divergencias = []
+    disciplinas = disciplinas_do_boletim(conexao)
+
+    faltando = [d for d in pivot.listar_disciplinas(conexao, ()) if d not in disciplinas]
+    for disciplina in faltando:
+        divergencias.append({'id': None, 'coluna': disciplina,
+                             'problema': 'disciplina sem coluna no boletim'})
+
+    colunas = ['id', 'nome', 'matricula', *pivot.colunas_disciplinas(disciplinas),
+               'soma', 'quantidade', 'media']
+    tolerancias = {'soma': TOLERANCIA, 'media': TOLERANCIA}
+    selecao = ", ".join(map(_identificador, colunas))
+    vivo = conexao.execute(_sql_agregado_vivo(disciplinas, 'a.id'))
+    materializado = conexao.cursor().execute(f"SELECT {selecao} FROM boletim ORDER BY id")
+
+    # Junção por intercalação: os dois cursores vêm ordenados por id
+    esperado = next(vivo, None)
+    encontrado = next(materializado, None)
+    while (esperado or encontrado) and len(divergencias) < limite:
+        if encontrado is None or (esperado is not None and esperado[0] < encontrado[0]):
+            divergencias.append({'id': esperado[0], 'coluna': None,
+                                 'problema': 'aluno ausente no boletim'})
+            esperado = next(vivo, None)
+        elif esperado is None or encontrado[0] < esperado[0]:
+            divergencias.append({'id': encontrado[0], 'coluna': None,
+                                 'problema': 'linha sem aluno correspondente'})
+            encontrado = next(materializado, None)
+        else:
+            for coluna, valor_esperado, valor_encontrado in zip(colunas, esperado, encontrado):
+                if not _iguais(valor_esperado, valor_encontrado, tolerancias.get(coluna, 0.0)):
+                    divergencias.append({'id': esperado[0], 'coluna': coluna,
+                                         'problema': f'esperado {valor_esperado!r}, '
+                                                     f'encontrado {valor_encontrado!r}'})
+            esperado = next(vivo, None)
+            encontrado = next(materializado, None)
+
+    return divergencias[:limite]
+
+
+def main():
+    from conexao import conectar
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('reconstruir', 'verificar'):
+        print("Uso: python boletim.py reconstruir|verificar [banco.db]")
+        sys.exit(1)
+
+    conexao = conectar(sys.argv[2] if len(sys.argv) > 2 else None)
+    if not conexao:
+        sys.exit(1)
+
+    try:
+        if sys.argv[1] == 'reconstruir':
+            with conexao:
+                reconstruir_boletim(conexao)
+            print("✅ Boletim reconstruído com sucesso!")
+        else:
+            divergencias = verificar_boletim(conexao)
+            if not divergencias:
+                print("✅ Boletim consistente com as notas.")
+            else:
+                print(f"❌ {len(divergencias)} divergência(s) encontrada(s):")
+                for d in divergencias:
+                    print(f"  aluno {d['id']} | {d['coluna'] or '-'} | {d['problema']}")
+                print("💡 Execute: python boletim.py reconstruir")
+                sys.exit(2)
+    finally:
+        conexao.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Busca de alunos por nome/matrícula com índice FTS5 (tokenizador trigram)
+O índice alunos_busca espelha alunos e é mantido por gatilhos.
+Uso: python busca.py reconstruir|termo [banco.db]
+"""
+
+import sqlite3
+import sys
+
+# O trigram indexa sequências de 3 caracteres; termos menores usam LIKE
+TAMANHO_MINIMO_TERMO = 3
+
+GATILHOS = (
+    'trg_busca_alunos_insert', 'trg_busca_alunos_update', 'trg_busca_alunos_delete',
+)
+
+SQL_GATILHOS = [
+    """CREATE TRIGGER trg_busca_alunos_insert AFTER INSERT ON alunos BEGIN
+        INSERT INTO alunos_busca (rowid, nome, matricula) VALUES (NEW.id, NEW.nome, NEW.matricula);
+    END""",
+    """CREATE TRIGGER trg_busca_alunos_update AFTER UPDATE OF nome, matricula ON alunos BEGIN
+        INSERT INTO alunos_busca (alunos_busca, rowid, nome, matricula)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.matricula);
+        INSERT INTO alunos_busca (rowid, nome, matricula) VALUES (NEW.id, NEW.nome, NEW.matricula);
+    END""",
+    """CREATE TRIGGER trg_busca_alunos_delete AFTER DELETE ON alunos BEGIN
+        INSERT INTO alunos_busca (alunos_busca, rowid, nome, matricula)
+        VALUES ('delete', OLD.id, OLD.nome, OLD.matricula);
+    END""",
+]
+
+
+def reconstruir_busca(conexao):
+    """
+    Recria o índice FTS5 (conteúdo externo: a própria tabela alunos) e seus gatilhos.
+    Retorna False se o SQLite não tiver FTS5; as buscas continuam com LIKE.
+    """
+    for gatilho in GATILHOS:
+        conexao.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    conexao.execute("DROP TABLE IF EXISTS alunos_busca")
+    try:
+        conexao.execute("""
+            CREATE VIRTUAL TABLE alunos_busca USING fts5 (
+                nome, matricula,
+                content = 'alunos', content_rowid = 'id',
+                tokenize = 'trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Índice de busca indisponível ({e}); usando LIKE.")
+        return False
+
+    conexao.execute("INSERT INTO alunos_busca (alunos_busca) VALUES ('rebuild')")
+    for sql in SQL_GATILHOS:
+        conexao.execute(sql)
+    return True
+
+
+def busca_disponivel(conexao):
+    """True se o índice alunos_busca existe neste banco"""
+    cursor = conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alunos_busca'")
+    return cursor.fetchone() is not None
+
+
+def _usa_indice(conexao, termo):
+    return len(termo) >= TAMANHO_MINIMO_TERMO and busca_disponivel(conexao)
+
+
+def expressao_fts(termo, coluna=None):
+    """Termo como frase literal do FTS5 (aspas escapadas), opcionalmente restrito à coluna"""
+    frase = '"' + termo.replace('"', '""') + '"'
+    return f"{coluna} : {frase}" if coluna else frase
+
+
+def filtro_nome(conexao, termo):
+    """
+    Condição SQL (e parâmetros) que seleciona alunos cujo nome contém `termo`.
+    Aplica-se a qualquer tabela com colunas id/nome (alunos ou boletim).
+    """
+    if _usa_indice(conexao, termo):
+        return ("id IN (SELECT rowid FROM alunos_busca WHERE alunos_busca MATCH ?)",
+                [expressao_fts(termo, 'nome')])
+    return "nome LIKE ?", [f"%{termo}%"]
+
+
+def buscar_alunos(conexao, termo, limite=None):
+    """
+    Alunos (id, nome, matricula, cpf) cujo nome ou matrícula contém `termo`,
+    do mais relevante (bm25) para o menos relevante.
+    """
+    sufixo = " LIMIT ?" if limite else ""
+    parametros_limite = [limite] if limite else []
+    if _usa_indice(conexao, termo):
+        cursor = conexao.execute(f"""
+            SELECT a.id, a.nome, a.matricula, a.cpf
+            FROM alunos_busca b
+            JOIN alunos a ON a.id = b.rowid
+            WHERE alunos_busca MATCH ?
+            ORDER BY b.rank{sufixo}
+        """, [expressao_fts(termo), *parametros_limite])
+    else:
+        cursor = conexao.execute(f"""
+            SELECT id, nome, matricula, cpf FROM alunos
+            WHERE nome LIKE ? OR matricula LIKE ?
+            ORDER BY nome, id{sufixo}
+        """, [f"%{termo}%", f"%{termo}%", *parametros_limite])
+    return cursor.fetchall()
+
+
+def main():
+    from conexao import conectar
+
+    if len(sys.argv) < 2:
+        print("Uso: python busca.py reconstruir|termo [banco.db]")
+        sys.exit(1)
+
+    conexao = conectar(sys.argv[2] if len(sys.argv) > 2 else None)
+    if not conexao:
+        sys.exit(1)
+
+    try:
+        if sys.argv[1] == 'reconstruir':
+            with conexao:
+                if reconstruir_busca(conexao):
+                    print("✅ Índice de busca reconstruído com sucesso!")
+        else:
+            for aluno_id, nome, matricula, cpf in buscar_alunos(conexao, sys.argv[1], limite=50):
+                print(f"{aluno_id:<6} {nome:<30} {matricula or '':<12} {cpf}")
+    finally:
+        conexao.close()
+
+
+if __name__ == "__main__":
+    main()
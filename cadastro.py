@@ -1,5 +1,52 @@
 import sqlite3
 
+import numpy as np
+
+import metricas
+from backend import TAMANHO_LOTE, gravar_notas
+from conexao import conectar
+from escritor import gravar_funcao
+from repositorio import invalidar_alunos, invalidar_notas
+from validacao_cpf import validar_cpfs
+
+# Próximo id livre de alunos (AUTOINCREMENT nunca reaproveita ids)
+SQL_PROXIMO_ID_ALUNO = """
+    SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'alunos'), 0),
+               COALESCE((SELECT MAX(id) FROM alunos), 0)) + 1
+"""
+
+SQL_INSERIR_ALUNO = """
+    INSERT INTO alunos (id, nome, cpf, endereco, matricula)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Motivo de rejeição pela coluna UNIQUE violada (o SQLite informa "alunos.cpf" etc.)
+MOTIVOS_INTEGRIDADE = {
+    'alunos.cpf': "CPF já cadastrado",
+    'alunos.matricula': "matrícula já cadastrada",
+}
+
+def motivo_integridade(erro):
+    """Motivo legível de um IntegrityError, pela restrição que foi violada"""
+    mensagem = str(erro)
+    for restricao, motivo in MOTIVOS_INTEGRIDADE.items():
+        if restricao in mensagem:
+            return motivo
+    return f"restrição violada ({mensagem})"
+
+def gerar_matricula(aluno_id):
+    """Matrícula no formato MAT0001 derivada do id do aluno"""
+    return f"MAT{aluno_id:04d}"
+
+def _inserir_aluno(conexao, nome, cpf, endereco):
+    """Insere o aluno já com a matrícula gerada a partir do próximo id (roda no escritor)"""
+    cursor = conexao.execute(f"""
+        INSERT INTO alunos (id, nome, cpf, endereco, matricula)
+        SELECT proximo, ?, ?, ?, printf('MAT%04d', proximo)
+        FROM ({SQL_PROXIMO_ID_ALUNO.strip()} AS proximo)
+    """, (nome, cpf, endereco))
+    return cursor.lastrowid
+
 def cadastrar_aluno(nome, cpf, endereco):
     """Função para cadastrar um novo aluno"""
     if not nome.strip():
@@ -15,41 +62,24 @@ def cadastrar_aluno(nome, cpf, endereco):
         return False
 
     try:
-        conexao = sqlite3.connect('sistema_nota.db')
-        cursor = conexao.cursor()
-
-        # Verifica se o aluno já existe pelo CPF
-        cursor.execute("SELECT id FROM alunos WHERE cpf = ?", (cpf,))
-        resultado = cursor.fetchone()
-
-        if resultado:
-            print("Erro: CPF já cadastrado.")
-            return False
-
-        # Insere o novo aluno
-        cursor.execute("INSERT INTO alunos (nome, cpf, endereco) VALUES (?, ?, ?)", 
-                      (nome, cpf, endereco))
-        
-        # Gera matrícula
-        aluno_id = cursor.lastrowid
-        matricula = f"MAT{aluno_id:04d}"
-        cursor.execute("UPDATE alunos SET matricula = ? WHERE id = ?", (matricula, aluno_id))
-
-        conexao.commit()
+        with metricas.DURACAO_CADASTRO.cronometrar():
+            aluno_id = gravar_funcao(_inserir_aluno, nome, cpf, endereco)
+        metricas.ALUNOS_CADASTRADOS.incrementar(modo='individual')
+        matricula = gerar_matricula(aluno_id)
+        invalidar_alunos()
         print(f"✅ Aluno {nome} cadastrado com sucesso. Matrícula: {matricula}")
         return True
 
+    except sqlite3.IntegrityError as erro:
+        metricas.FALHAS.incrementar(operacao='cadastrar_aluno')
+        print(f"Erro: {motivo_integridade(erro)}.")
+        return False
+
     except Exception as erro:
+        metricas.FALHAS.incrementar(operacao='cadastrar_aluno')
         print("Erro ao cadastrar aluno:", erro)
-        if conexao:
-            conexao.rollback()
         return False
 
-    finally:
-        if conexao:
-            cursor.close()
-            conexao.close()
-
 def cadastrar_nota(nome, nota, disciplina, funcionario_id):
     """Função para cadastrar nota de aluno"""
     if not nome.strip():
@@ -64,53 +94,184 @@ def cadastrar_nota(nome, nota, disciplina, funcionario_id):
         print("Erro: Disciplina não pode estar vazia.")
         return False
 
+    conexao = conectar()
+    if not conexao:
+        print("Erro: Não foi possível conectar ao banco de dados.")
+        return False
+
+    cursor = None
     try:
-        conexao = sqlite3.connect('sistema_nota.db')
         cursor = conexao.cursor()
 
         # Verifica se o aluno existe
         cursor.execute("SELECT id FROM alunos WHERE nome = ?", (nome,))
         resultado = cursor.fetchone()
 
-        if not resultado:
-            print(f"Erro: Aluno '{nome}' não encontrado.")
-            return False
-
-        aluno_id = resultado[0]
-
-        # Verifica se já existe nota para essa disciplina
-        cursor.execute("""
-            SELECT id FROM notas 
-            WHERE aluno_id = ? AND disciplina = ?
-        """, (aluno_id, disciplina))
-        
-        nota_existente = cursor.fetchone()
-        
-        if nota_existente:
-            # Atualiza a nota existente
-            cursor.execute("""
-                UPDATE notas SET nota = ?, funcionario_id = ?
-                WHERE id = ?
-            """, (nota, funcionario_id, nota_existente[0]))
-            print(f"✅ Nota de {disciplina} atualizada para {nome}: {nota}")
-        else:
-            # Insere nova nota
-            cursor.execute("""
-                INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id)
-                VALUES (?, ?, ?, ?)
-            """, (aluno_id, disciplina, nota, funcionario_id))
-            print(f"✅ Nota de {disciplina} cadastrada para {nome}: {nota}")
-
-        conexao.commit()
+    except Exception as erro:
+        metricas.FALHAS.incrementar(operacao='gravar_nota')
+        print("Erro ao cadastrar nota:", erro)
+        return False
+
+    finally:
+        # Leitura encerrada e conexão devolvida antes de esperar o escritor:
+        # um SELECT pendente seguraria a trava de leitura que a gravação precisa
+        if cursor:
+            cursor.close()
+        conexao.close()
+
+    if not resultado:
+        print(f"Erro: Aluno '{nome}' não encontrado.")
+        return False
+
+    aluno_id = resultado[0]
+
+    try:
+        # Insere a nota ou atualiza a existente no mesmo comando
+        with metricas.DURACAO_GRAVACAO_NOTA.cronometrar():
+            gravar_notas([(aluno_id, disciplina, nota, funcionario_id)])
+        metricas.NOTAS_GRAVADAS.incrementar(modo='individual')
+        invalidar_notas(aluno_id)
+        print(f"✅ Nota de {disciplina} registrada para {nome}: {nota}")
         return True
 
     except Exception as erro:
+        metricas.FALHAS.incrementar(operacao='gravar_nota')
         print("Erro ao cadastrar nota:", erro)
-        if conexao:
-            conexao.rollback()
         return False
 
+def _inserir_lote_alunos(conexao, lote):
+    """
+    Insere um lote reservando um bloco de ids/matrículas na mesma transação
+    (roda no escritor). Retorna os (indice, aluno, motivo) rejeitados.
+    """
+    proximo_id = conexao.execute(SQL_PROXIMO_ID_ALUNO).fetchone()[0]
+    linhas = [(proximo_id + i, nome, cpf, endereco, gerar_matricula(proximo_id + i))
+              for i, (_, (nome, cpf, endereco)) in enumerate(lote)]
+    conexao.execute("SAVEPOINT lote_alunos")
+    try:
+        conexao.executemany(SQL_INSERIR_ALUNO, linhas)
+        conexao.execute("RELEASE lote_alunos")
+        return []
+    except sqlite3.IntegrityError:
+        # CPF ou matrícula gravados por outro caminho após a carga: desfaz e insere um a um
+        conexao.execute("ROLLBACK TO lote_alunos")
+        conexao.execute("RELEASE lote_alunos")
+    rejeitados = []
+    for (indice, aluno), linha in zip(lote, linhas):
+        try:
+            conexao.execute(SQL_INSERIR_ALUNO, linha)
+        except sqlite3.IntegrityError as erro:
+            rejeitados.append((indice, aluno, motivo_integridade(erro)))
+    return rejeitados
+
+def _normalizar_lote_cpfs(lote, ao_rejeitar):
+    """
+    Valida os CPFs do lote de uma vez e troca cada um pela forma só com dígitos.
+    Retorna (lote com os válidos, quantidade de inválidos).
+    """
+    validos, motivos, normalizados = validar_cpfs([cpf for _, (_, cpf, _) in lote],
+                                                  normalizar=True)
+    if ao_rejeitar:
+        for posicao in np.flatnonzero(~validos):
+            ao_rejeitar(*lote[posicao], motivos[posicao])
+    aceitos = [(indice, (nome, str(normalizado), endereco))
+               for (indice, (nome, _, endereco)), valido, normalizado
+               in zip(lote, validos, normalizados) if valido]
+    return aceitos, len(lote) - len(aceitos)
+
+def _gravar_lote_alunos(lote, cpfs, ao_rejeitar, validar_cpf=False):
+    """
+    Valida o lote, descarta CPFs já vistos (`cpfs`, atualizado aqui) e grava
+    o restante pelo escritor; retorna (inseridos, rejeitados)
+    """
+    invalidos = 0
+    if validar_cpf:
+        lote, invalidos = _normalizar_lote_cpfs(lote, ao_rejeitar)
+
+    # Repetidos no arquivo ou já cadastrados, comparados depois da normalização
+    novos = []
+    for indice, aluno in lote:
+        if aluno[1] in cpfs:
+            invalidos += 1
+            if ao_rejeitar:
+                ao_rejeitar(indice, aluno, "CPF já cadastrado")
+            continue
+        cpfs.add(aluno[1])
+        novos.append((indice, aluno))
+    lote = novos
+    if not lote:
+        return 0, invalidos
+
+    rejeitados = gravar_funcao(_inserir_lote_alunos, lote)
+    metricas.ALUNOS_CADASTRADOS.incrementar(len(lote) - len(rejeitados), modo='lote')
+    invalidar_alunos()
+    if ao_rejeitar:
+        for indice, aluno, motivo in rejeitados:
+            ao_rejeitar(indice, aluno, motivo)
+    return len(lote) - len(rejeitados), len(rejeitados) + invalidos
+
+def cadastrar_alunos_em_lote(alunos, tamanho_lote=TAMANHO_LOTE, ao_rejeitar=None,
+                             validar_cpf=False):
+    """
+    Matricula vários alunos (nome, cpf, endereco) em transações por lote.
+    CPFs repetidos no arquivo ou já cadastrados (e, com validar_cpf=True, CPFs
+    com dígitos verificadores inválidos) são rejeitados via
+    ao_rejeitar(indice, aluno, motivo). Com validar_cpf=True os CPFs são
+    comparados e gravados só com dígitos. Retorna a tupla (cadastrados, rejeitados).
+    Um erro de gravação interrompe a matrícula com RuntimeError; os lotes
+    anteriores continuam gravados.
+    """
+    conexao = conectar()
+    if not conexao:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+
+    cadastrados = 0
+    rejeitados = 0
+
+    try:
+        # Uma única consulta carrega os CPFs existentes; a checagem é feita em memória
+        cpfs = {linha[0] for linha in conexao.execute("SELECT cpf FROM alunos")}
+        if validar_cpf and cpfs:
+            # CPFs antigos podem estar gravados com pontuação
+            cpfs.update(validar_cpfs(list(cpfs), normalizar=True)[2])
+            cpfs.discard('')
+
+        lote = []
+        for indice, aluno in enumerate(alunos):
+            nome, cpf, endereco = (str(campo or '').strip() for campo in aluno)
+            motivo = None
+            if not nome:
+                motivo = "nome vazio"
+            elif not cpf:
+                motivo = "CPF vazio"
+            elif not endereco:
+                motivo = "endereço vazio"
+
+            if motivo:
+                rejeitados += 1
+                if ao_rejeitar:
+                    ao_rejeitar(indice, aluno, motivo)
+                continue
+
+            lote.append((indice, (nome, cpf, endereco)))
+            if len(lote) >= tamanho_lote:
+                inseridos, falhas = _gravar_lote_alunos(lote, cpfs, ao_rejeitar, validar_cpf)
+                cadastrados += inseridos
+                rejeitados += falhas
+                lote = []
+
+        if lote:
+            inseridos, falhas = _gravar_lote_alunos(lote, cpfs, ao_rejeitar, validar_cpf)
+            cadastrados += inseridos
+            rejeitados += falhas
+
+    except Exception as erro:
+        # Lotes anteriores já foram confirmados; o lote atual e o resto da entrada não
+        metricas.FALHAS.incrementar(operacao='cadastrar_alunos_lote')
+        raise RuntimeError(f"Matrícula interrompida após {cadastrados} aluno(s) cadastrado(s) e "
+                           f"{rejeitados} rejeitado(s): {erro}") from erro
+
     finally:
-        if conexao:
-            cursor.close()
-            conexao.close()
+        conexao.close()
+
+    return cadastrados, rejeitados
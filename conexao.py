@@ -1,10 +1,405 @@
+import atexit
+import contextvars
+import os
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 
-def conectar():
-    """Função para conectar ao banco de dados SQLite"""
-    try:
-        conexao = sqlite3.connect('sistema_nota.db')
+import metricas
+from migracoes import aplicar_migracoes
+from rastreamento import abrir_conexao
+
+# Banco de dados padrão do sistema
+CAMINHO_BANCO = 'sistema_nota.db'
+
+# Rede de escolas: cada escola tem os seus bancos em <PASTA_ESCOLAS>/<id>/
+# (SISTEMA_NOTAS_ESCOLA escolhe a escola do processo; sem escola, CAMINHO_BANCO)
+PASTA_ESCOLAS = os.environ.get('SISTEMA_NOTAS_ESCOLAS_PASTA', 'escolas')
+FORMATO_ID_ESCOLA = re.compile(r'[A-Za-z0-9_-]+')
+
+# Escolas consultadas ao mesmo tempo nas operações da rede inteira
+ESCOLAS_EM_PARALELO = 4
+
+# Configuração do pool de conexões
+TAMANHO_MAXIMO_POOL = 8
+TEMPO_ESPERA_POOL = 10  # segundos aguardando uma conexão livre
+INTERVALO_VERIFICACAO = 30  # segundos ociosa antes de testar a conexão
+
+# PRAGMAs aplicados a cada conexão nova do pool
+PRAGMAS = {
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+    'cache_size': -16000,
+}
+
+
+class ConexaoPool:
+    """Conexão emprestada do pool; close() devolve ao pool em vez de fechar"""
+
+    _pool = None
+    _conexao = None
+
+    def __init__(self, pool, conexao, geracao=0):
+        self._pool = pool
+        self._conexao = conexao
+        self._geracao = geracao
+
+    def __getattr__(self, nome):
+        if self._conexao is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool.")
+        return getattr(self._conexao, nome)
+
+    def __enter__(self):
+        self._conexao.__enter__()
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        return self._conexao.__exit__(tipo, valor, traceback)
+
+    def close(self):
+        """Devolve a conexão ao pool"""
+        if self._conexao is not None:
+            conexao, self._conexao = self._conexao, None
+            self._pool.devolver(conexao, self._geracao)
+
+    def __del__(self):
+        # Garante a devolução de conexões esquecidas abertas
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PoolConexoes:
+    """Pool limitado de conexões SQLite compartilhado entre threads"""
+
+    def __init__(self, caminho, tamanho_maximo=TAMANHO_MAXIMO_POOL,
+                 tempo_espera=TEMPO_ESPERA_POOL, somente_leitura=False, pragmas=None):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self.tempo_espera = tempo_espera
+        self.somente_leitura = somente_leitura
+        self.pragmas = PRAGMAS if pragmas is None else pragmas
+        self._condicao = threading.Condition()
+        self._livres = []  # pilha de (conexao, instante da devolução)
+        self._total = 0
+        self._geracao = 0  # muda quando o arquivo é trocado (renovar)
+        self._pid = os.getpid()
+        self._migrado = False
+        self._zerar_contadores()
+
+    def _zerar_contadores(self):
+        self.contadores = {
+            'criadas': 0,
+            'descartadas': 0,
+            'aquisicoes': 0,
+            'reutilizadas': 0,
+            'esperas': 0,
+            'tempo_espera_total': 0.0,
+            'tempo_espera_maximo': 0.0,
+        }
+
+    def _verificar_fork(self):
+        """Descarta conexões herdadas de outro processo (após fork)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._livres = []
+            self._total = 0
+            self._zerar_contadores()
+
+    def _criar_conexao(self):
+        if self.somente_leitura:
+            # Arquivo que nunca é alterado no lugar (só trocado inteiro): sem travas
+            uri = Path(self.caminho).resolve().as_uri() + '?mode=ro&immutable=1'
+            conexao = abrir_conexao(uri, uri=True, check_same_thread=False)
+        else:
+            conexao = abrir_conexao(self.caminho, check_same_thread=False)
+        try:
+            for pragma, valor in self.pragmas.items():
+                conexao.execute(f"PRAGMA {pragma} = {valor}")
+            if self.somente_leitura:
+                return conexao
+            if not self._migrado:
+                self._migrado = aplicar_migracoes(conexao)
+            # Depois das migrações (a que recria notas exige as chaves desligadas)
+            conexao.execute("PRAGMA foreign_keys = ON")
+        except Exception:
+            conexao.close()
+            raise
         return conexao
+
+    def _conexao_saudavel(self, conexao):
+        try:
+            conexao.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _descartar(self, conexao):
+        try:
+            conexao.close()
+        except sqlite3.Error:
+            pass
+        with self._condicao:
+            self._total -= 1
+            self.contadores['descartadas'] += 1
+            self._condicao.notify()
+
+    def obter(self):
+        """Empresta uma conexão, reaproveitando uma livre sempre que possível"""
+        inicio = time.perf_counter()
+        esperou = False
+        with self._condicao:
+            self._verificar_fork()
+            geracao = self._geracao
+            while True:
+                if self._livres:
+                    conexao, devolvida_em = self._livres.pop()
+                    break
+                if self._total < self.tamanho_maximo:
+                    self._total += 1
+                    conexao, devolvida_em = None, None
+                    break
+                restante = self.tempo_espera - (time.perf_counter() - inicio)
+                if restante <= 0:
+                    raise TimeoutError(
+                        f"Nenhuma conexão livre para '{self.caminho}' após {self.tempo_espera}s")
+                esperou = True
+                self._condicao.wait(restante)
+
+        reutilizada = conexao is not None
+        if reutilizada and time.monotonic() - devolvida_em > INTERVALO_VERIFICACAO:
+            if not self._conexao_saudavel(conexao):
+                self._descartar(conexao)
+                with self._condicao:
+                    self._total += 1
+                conexao, reutilizada = None, False
+
+        if conexao is None:
+            try:
+                conexao = self._criar_conexao()
+            except Exception:
+                with self._condicao:
+                    self._total -= 1
+                    self._condicao.notify()
+                raise
+
+        espera = time.perf_counter() - inicio
+        with self._condicao:
+            self.contadores['aquisicoes'] += 1
+            if reutilizada:
+                self.contadores['reutilizadas'] += 1
+            else:
+                self.contadores['criadas'] += 1
+            if esperou:
+                self.contadores['esperas'] += 1
+            self.contadores['tempo_espera_total'] += espera
+            self.contadores['tempo_espera_maximo'] = max(
+                self.contadores['tempo_espera_maximo'], espera)
+
+        return ConexaoPool(self, conexao, geracao)
+
+    def devolver(self, conexao, geracao=None):
+        """Recebe de volta uma conexão emprestada"""
+        if self._pid != os.getpid():
+            return
+        if geracao is not None and geracao != self._geracao:
+            # Aberta antes de renovar(): aponta para o arquivo antigo
+            self._descartar(conexao)
+            return
+        try:
+            if conexao.in_transaction:
+                conexao.rollback()
+        except sqlite3.Error:
+            self._descartar(conexao)
+            return
+        with self._condicao:
+            self._livres.append((conexao, time.monotonic()))
+            self._condicao.notify()
+
+    def renovar(self):
+        """
+        O arquivo foi trocado: fecha as conexões livres e descarta as emprestadas
+        quando voltarem; as próximas abrem o arquivo novo.
+        """
+        with self._condicao:
+            self._geracao += 1
+        self.fechar()
+
+    def fechar(self):
+        """Fecha todas as conexões livres do pool"""
+        with self._condicao:
+            livres, self._livres = self._livres, []
+            self._total -= len(livres)
+        for conexao, _ in livres:
+            try:
+                conexao.close()
+            except sqlite3.Error:
+                pass
+
+    def estatisticas(self):
+        """Retorna os contadores do pool, incluindo espera média e taxa de reuso"""
+        with self._condicao:
+            dados = dict(self.contadores)
+            dados['abertas'] = self._total
+            dados['livres'] = len(self._livres)
+        aquisicoes = dados['aquisicoes']
+        dados['tempo_espera_medio'] = dados['tempo_espera_total'] / aquisicoes if aquisicoes else 0.0
+        dados['taxa_reuso'] = dados['reutilizadas'] / aquisicoes if aquisicoes else 0.0
+        return dados
+
+
+# Roteamento por escola
+
+_pastas_escolas = {}  # escola -> pasta registrada fora de PASTA_ESCOLAS
+_escola_atual = contextvars.ContextVar(
+    'escola_atual', default=os.environ.get('SISTEMA_NOTAS_ESCOLA') or None)
+
+
+def validar_escola(escola_id):
+    """Identificador da escola como texto (vira nome de pasta: letras, dígitos, _ e -)"""
+    escola_id = str(escola_id).strip()
+    if not FORMATO_ID_ESCOLA.fullmatch(escola_id):
+        raise ValueError(f"Identificador de escola inválido: {escola_id!r}")
+    return escola_id
+
+
+def registrar_escola(escola_id, pasta):
+    """Associa a escola a uma pasta própria (em vez de <PASTA_ESCOLAS>/<id>)"""
+    _pastas_escolas[validar_escola(escola_id)] = pasta
+
+
+def pasta_escola(escola_id):
+    escola_id = validar_escola(escola_id)
+    return _pastas_escolas.get(escola_id) or os.path.join(PASTA_ESCOLAS, escola_id)
+
+
+def caminho_escola(escola_id, arquivo=CAMINHO_BANCO):
+    """Banco `arquivo` da escola: escolas/12/sistema_nota.db"""
+    return os.path.join(pasta_escola(escola_id), arquivo)
+
+
+def escolas_cadastradas(arquivo=CAMINHO_BANCO):
+    """Escolas que já têm o banco `arquivo`, em ordem de identificador"""
+    escolas = set(_pastas_escolas)
+    if os.path.isdir(PASTA_ESCOLAS):
+        escolas.update(nome for nome in os.listdir(PASTA_ESCOLAS)
+                       if FORMATO_ID_ESCOLA.fullmatch(nome))
+    return sorted(escola for escola in escolas
+                  if os.path.exists(caminho_escola(escola, arquivo)))
+
+
+def escola_atual():
+    """Escola do contexto atual (None = instalação de uma escola só)"""
+    return _escola_atual.get()
+
+
+def definir_escola(escola_id):
+    """Fixa a escola do contexto atual (ex.: a escolhida no início da sessão)"""
+    _escola_atual.set(None if escola_id is None else validar_escola(escola_id))
+
+
+@contextmanager
+def usar_escola(escola_id):
+    """Dentro do bloco, quem não informa o caminho usa os bancos da escola"""
+    token = _escola_atual.set(None if escola_id is None else validar_escola(escola_id))
+    try:
+        yield
+    finally:
+        _escola_atual.reset(token)
+
+
+def banco_atual(arquivo=CAMINHO_BANCO):
+    """Caminho do banco `arquivo` da escola do contexto (o próprio arquivo se não há escola)"""
+    escola_id = escola_atual()
+    return arquivo if escola_id is None else caminho_escola(escola_id, arquivo)
+
+
+def em_cada_escola(funcao, *args, escolas=None, arquivo=CAMINHO_BANCO):
+    """
+    Executa funcao(*args) no contexto de cada escola (em paralelo, até
+    ESCOLAS_EM_PARALELO); retorna [(escola, resultado)] na ordem das escolas.
+    A escola com erro é informada e fica fora do resultado.
+    """
+    escolas = escolas_cadastradas(arquivo) if escolas is None else list(escolas)
+
+    def executar(escola_id):
+        with usar_escola(escola_id):
+            return funcao(*args)
+
+    resultados = []
+    with ThreadPoolExecutor(max_workers=max(1, min(ESCOLAS_EM_PARALELO, len(escolas))),
+                            thread_name_prefix='escolas') as executor:
+        futuros = [(escola_id, executor.submit(executar, escola_id)) for escola_id in escolas]
+        for escola_id, futuro in futuros:
+            try:
+                resultados.append((escola_id, futuro.result()))
+            except Exception as e:
+                metricas.FALHAS.incrementar(operacao='rede_escolas')
+                print(f"Erro na escola {escola_id}: {e}")
+    return resultados
+
+
+# Pools por banco
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obter_pool(caminho=None, **opcoes):
+    """Retorna o pool do banco informado, criando-o (com as opções) na primeira chamada"""
+    caminho = caminho or banco_atual()
+    with _pools_lock:
+        pool = _pools.get(caminho)
+        if pool is None:
+            pool = _pools[caminho] = PoolConexoes(caminho, **opcoes)
+        return pool
+
+
+def estatisticas_pool(caminho=None):
+    """Contadores do pool (tempo de espera, reuso, conexões abertas)"""
+    return obter_pool(caminho).estatisticas()
+
+
+METRICAS_POOL = (
+    ('sistema_notas_conexoes_abertas', 'gauge', 'Conexões do pool (emprestadas e livres)', 'abertas'),
+    ('sistema_notas_conexoes_livres', 'gauge', 'Conexões livres no pool', 'livres'),
+    ('sistema_notas_conexoes_criadas_total', 'counter', 'Conexões abertas pelo pool', 'criadas'),
+    ('sistema_notas_conexoes_descartadas_total', 'counter', 'Conexões descartadas pelo pool',
+     'descartadas'),
+    ('sistema_notas_conexoes_aquisicoes_total', 'counter', 'Conexões emprestadas', 'aquisicoes'),
+    ('sistema_notas_conexoes_esperas_total', 'counter', 'Empréstimos que esperaram conexão livre',
+     'esperas'),
+    ('sistema_notas_conexoes_espera_segundos_total', 'counter', 'Tempo total esperando conexão',
+     'tempo_espera_total'),
+)
+
+
+@metricas.REGISTRO.registrar_coletor
+def _metricas_pools():
+    with _pools_lock:
+        pools = list(_pools.items())
+    for caminho, pool in pools:
+        yield from metricas.amostras_de(pool.estatisticas(), METRICAS_POOL, {'banco': caminho})
+
+
+@atexit.register
+def fechar_pools():
+    """Fecha as conexões livres de todos os pools"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.fechar()
+
+
+def conectar(caminho=None):
+    """Função para conectar ao banco de dados SQLite (conexão do pool)"""
+    try:
+        return obter_pool(caminho).obter()
     except Exception as e:
         print(f"Erro ao conectar ao SQLite: {e}")
         return None
@@ -18,24 +413,28 @@ def login_funcionario():
         if not conexao:
             print("Erro: Não foi possível conectar ao banco de dados.")
             return None
-            
+
         cursor = conexao.cursor()
 
         cpf = input("CPF: ")
         senha = input("Senha: ")
 
-        cursor.execute("SELECT id, nome FROM funcionario WHERE cpf = ? AND senha = ?", (cpf, senha))
-        resultado = cursor.fetchone()
+        with metricas.DURACAO_LOGIN.cronometrar(origem='terminal'):
+            cursor.execute("SELECT id, nome FROM funcionario WHERE cpf = ? AND senha = ?", (cpf, senha))
+            resultado = cursor.fetchone()
 
         if resultado:
+            metricas.LOGINS.incrementar(origem='terminal', resultado='sucesso')
             funcionario_id, nome = resultado
             print(f"\nBem-vindo(a), {nome}!")
             return funcionario_id
         else:
+            metricas.LOGINS.incrementar(origem='terminal', resultado='recusado')
             print("CPF ou senha incorretos.")
             return None
 
     except Exception as e:
+        metricas.LOGINS.incrementar(origem='terminal', resultado='erro')
         print(f"Erro no login: {e}")
         return None
 
@@ -0,0 +1,285 @@
+"""
+Escritor único do banco com commit em grupo
+Todas as gravações de alunos e notas passam por uma thread com a sua própria
+conexão: comandos que chegam juntos são aplicados em uma só transação, cada
+um em um SAVEPOINT (a falha de um comando não desfaz os outros).
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import metricas
+from conexao import banco_atual
+from migracoes import aplicar_migracoes
+from rastreamento import abrir_conexao, origem_externa, pilha_chamadas
+
+# Tempo máximo que o primeiro comando de um lote espera por outros (segundos)
+ATRASO_MAXIMO_LOTE = 0.002
+
+# Comandos por transação
+TAMANHO_MAXIMO_LOTE = 500
+
+# Tempo máximo que quem grava espera o commit (segundos)
+TEMPO_ESPERA_GRAVACAO = 30
+
+# Latências guardadas para os percentis
+AMOSTRAS_LATENCIA = 10_000
+
+# PRAGMAs da conexão de escrita, na ordem: o busy_timeout primeiro, para cobrir
+# as travas de leitores e de escritores de outros processos desde o início.
+# O modo WAL (leituras não bloqueiam a gravação) é ligado pela migração 8
+PRAGMAS_ESCRITA = {
+    'busy_timeout': 10000,
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+}
+
+
+class Comando:
+    """Uma gravação enfileirada: funcao(conexao, *args) executada no escritor"""
+
+    def __init__(self, funcao, args):
+        self.funcao = funcao
+        self.args = args
+        self.futuro = Future()
+        self.enviado_em = time.perf_counter()
+        # Quem enviou: as consultas do comando são atribuídas a essas funções
+        self.origem = pilha_chamadas()
+
+
+class EscritorBD:
+    """
+    Thread que aplica as gravações de um banco por uma única conexão.
+
+    enviar() devolve um Future; executar()/executar_funcao() esperam o commit e
+    devolvem o resultado (ou levantam a exceção do comando).
+    """
+
+    def __init__(self, caminho, atraso_maximo=ATRASO_MAXIMO_LOTE,
+                 tamanho_maximo_lote=TAMANHO_MAXIMO_LOTE):
+        self.caminho = caminho
+        self.atraso_maximo = atraso_maximo
+        self.tamanho_maximo_lote = tamanho_maximo_lote
+        self._fila = queue.Queue()
+        self._trava = threading.Lock()
+        self._zerar_contadores()
+        self._thread = threading.Thread(target=self._trabalhar, name="escritor-bd", daemon=True)
+        self._thread.start()
+
+    def _zerar_contadores(self):
+        self.contadores = {
+            'comandos': 0,
+            'cancelados': 0,
+            'falhas': 0,
+            'lotes': 0,
+            'maior_lote': 0,
+            'transacoes_com_erro': 0,
+        }
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+
+    def enviar(self, funcao, *args):
+        """Enfileira funcao(conexao, *args); retorna um Future com o resultado"""
+        comando = Comando(funcao, args)
+        self._fila.put(comando)
+        return comando.futuro
+
+    def executar_funcao(self, funcao, *args):
+        """Executa funcao(conexao, *args) na transação do escritor e espera o commit"""
+        futuro = self.enviar(funcao, *args)
+        try:
+            return futuro.result(TEMPO_ESPERA_GRAVACAO)
+        except TimeoutError:
+            # Desiste só se o comando ainda estiver na fila; se o escritor já
+            # começou, o commit vem em seguida e o resultado é o verdadeiro
+            if futuro.cancel():
+                raise
+            return futuro.result()
+
+    def executar(self, sql, parametros=(), muitos=False):
+        """Executa um comando SQL (executemany com muitos=True); retorna as linhas afetadas"""
+        return self.executar_funcao(_executar_sql, sql, parametros, muitos)
+
+    def encerrar(self):
+        """Aplica os comandos já enfileirados e fecha a conexão"""
+        if self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join(TEMPO_ESPERA_GRAVACAO)
+
+    def _abrir(self):
+        conexao = abrir_conexao(self.caminho, isolation_level=None, check_same_thread=False)
+        for pragma, valor in PRAGMAS_ESCRITA.items():
+            conexao.execute(f"PRAGMA {pragma} = {valor}")
+        aplicar_migracoes(conexao)
+        # Remover um aluno apaga as notas dele (ON DELETE CASCADE)
+        conexao.execute("PRAGMA foreign_keys = ON")
+        return conexao
+
+    def _proximo_lote(self):
+        """Bloqueia até o primeiro comando e junta os que chegarem dentro do prazo"""
+        primeiro = self._fila.get()
+        if primeiro is None:
+            return None, True
+        lote = [primeiro]
+        prazo = primeiro.enviado_em + self.atraso_maximo
+        while len(lote) < self.tamanho_maximo_lote:
+            restante = prazo - time.perf_counter()
+            try:
+                comando = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if comando is None:
+                return lote, True
+            lote.append(comando)
+        return lote, False
+
+    def _trabalhar(self):
+        conexao = None
+        encerrar = False
+        while not encerrar:
+            lote, encerrar = self._proximo_lote()
+            if lote:
+                lote = self._descartar_cancelados(lote)
+            if not lote:
+                continue
+            try:
+                if conexao is None:
+                    conexao = self._abrir()
+                self._aplicar(conexao, lote)
+            except Exception as e:
+                for comando in lote:
+                    if not comando.futuro.done():
+                        comando.futuro.set_exception(e)
+        if conexao is not None:
+            conexao.close()
+
+    def _descartar_cancelados(self, lote):
+        """Tira do lote os comandos que quem enviou desistiu de esperar"""
+        ativos = [comando for comando in lote if comando.futuro.set_running_or_notify_cancel()]
+        if len(ativos) < len(lote):
+            with self._trava:
+                self.contadores['cancelados'] += len(lote) - len(ativos)
+        return ativos
+
+    def _aplicar(self, conexao, lote):
+        """Aplica o lote em uma transação; cada comando isolado em um SAVEPOINT"""
+        resultados = []
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            for comando in lote:
+                conexao.execute("SAVEPOINT comando")
+                try:
+                    with origem_externa(comando.origem):
+                        resultados.append((comando.funcao(conexao, *comando.args), None))
+                    conexao.execute("RELEASE comando")
+                except Exception as e:
+                    conexao.execute("ROLLBACK TO comando")
+                    conexao.execute("RELEASE comando")
+                    resultados.append((None, e))
+            conexao.execute("COMMIT")
+        except Exception:
+            if conexao.in_transaction:
+                conexao.execute("ROLLBACK")
+            with self._trava:
+                self.contadores['transacoes_com_erro'] += 1
+            raise
+
+        concluido = time.perf_counter()
+        with self._trava:
+            self.contadores['lotes'] += 1
+            self.contadores['comandos'] += len(lote)
+            self.contadores['maior_lote'] = max(self.contadores['maior_lote'], len(lote))
+            self._latencias.extend(concluido - comando.enviado_em for comando in lote)
+        for comando, (resultado, erro) in zip(lote, resultados):
+            if erro is None:
+                comando.futuro.set_result(resultado)
+            else:
+                with self._trava:
+                    self.contadores['falhas'] += 1
+                comando.futuro.set_exception(erro)
+
+    def estatisticas(self):
+        """Comandos, lotes, tamanho médio dos lotes e latência (fila + commit) em ms"""
+        with self._trava:
+            dados = dict(self.contadores)
+            latencias = sorted(self._latencias)
+        dados['pendentes'] = self._fila.qsize()
+        dados['tamanho_medio_lote'] = dados['comandos'] / dados['lotes'] if dados['lotes'] else 0.0
+        if latencias:
+            dados['latencia_media_ms'] = sum(latencias) / len(latencias) * 1000
+            dados['latencia_p50_ms'] = latencias[len(latencias) // 2] * 1000
+            dados['latencia_p95_ms'] = latencias[int(len(latencias) * 0.95)] * 1000
+            dados['latencia_maxima_ms'] = latencias[-1] * 1000
+        return dados
+
+
+def _executar_sql(conexao, sql, parametros, muitos):
+    cursor = conexao.executemany(sql, parametros) if muitos else conexao.execute(sql, parametros)
+    return cursor.rowcount
+
+
+_escritores = {}
+_escritores_lock = threading.Lock()
+_pid = os.getpid()
+
+
+def obter_escritor(caminho=None):
+    """Retorna o escritor do banco informado, iniciando-o na primeira chamada"""
+    global _pid
+    caminho = caminho or banco_atual()
+    with _escritores_lock:
+        if _pid != os.getpid():
+            # Processo filho (fork): a thread do escritor não foi herdada
+            _pid = os.getpid()
+            _escritores.clear()
+        escritor = _escritores.get(caminho)
+        if escritor is None:
+            escritor = _escritores[caminho] = EscritorBD(caminho)
+        return escritor
+
+
+def gravar(sql, parametros=(), caminho=None, muitos=False):
+    """Executa um comando de gravação pelo escritor do banco; retorna as linhas afetadas"""
+    return obter_escritor(caminho).executar(sql, parametros, muitos)
+
+
+def gravar_funcao(funcao, *args, caminho=None):
+    """Executa funcao(conexao, *args) pelo escritor do banco (várias instruções atômicas)"""
+    return obter_escritor(caminho).executar_funcao(funcao, *args)
+
+
+def estatisticas_escritor(caminho=None):
+    """Contadores do escritor (lotes, tamanho médio, latência por comando)"""
+    return obter_escritor(caminho).estatisticas()
+
+
+METRICAS_ESCRITOR = (
+    ('sistema_notas_escritor_comandos_total', 'counter', 'Comandos aplicados pelo escritor',
+     'comandos'),
+    ('sistema_notas_escritor_falhas_total', 'counter', 'Comandos do escritor com erro', 'falhas'),
+    ('sistema_notas_escritor_lotes_total', 'counter', 'Transações (lotes) do escritor', 'lotes'),
+    ('sistema_notas_escritor_pendentes', 'gauge', 'Comandos na fila do escritor', 'pendentes'),
+)
+
+
+@metricas.REGISTRO.registrar_coletor
+def _metricas_escritores():
+    with _escritores_lock:
+        escritores = list(_escritores.items())
+    for caminho, escritor in escritores:
+        yield from metricas.amostras_de(escritor.estatisticas(), METRICAS_ESCRITOR,
+                                        {'banco': caminho})
+
+
+@atexit.register
+def encerrar_escritores():
+    """Aplica as gravações pendentes e encerra os escritores (o próximo uso cria outro)"""
+    with _escritores_lock:
+        escritores = list(_escritores.values())
+        _escritores.clear()
+    for escritor in escritores:
+        escritor.encerrar()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Estatísticas incrementais das notas: quantidade, soma, soma dos quadrados,
+mínimo e máximo por disciplina e no geral, mantidos por gatilhos.
+Uso: python estatisticas.py reconstruir|verificar [banco.db]
+"""
+
+import math
+import sys
+
+# Chave da linha com o agregado de todas as disciplinas
+GERAL = ''
+
+# Diferença aceita em soma/soma dos quadrados (acúmulo de ponto flutuante): relativa,
+# pois as somas crescem com a quantidade de notas, e absoluta perto de zero
+TOLERANCIA_RELATIVA = 1e-9
+TOLERANCIA = 1e-6
+
+GATILHOS = (
+    'trg_estatisticas_alunos_insert', 'trg_estatisticas_alunos_delete',
+    'trg_estatisticas_notas_insert', 'trg_estatisticas_notas_update',
+    'trg_estatisticas_notas_delete',
+)
+
+# Agregado recalculado a partir das notas (usado na reconstrução e na verificação)
+SQL_AGREGADO_VIVO = f"""
+    SELECT disciplina, COUNT(*), SUM(nota), SUM(nota * nota), MIN(nota), MAX(nota)
+    FROM notas GROUP BY disciplina
+    UNION ALL
+    SELECT '{GERAL}', COUNT(*), SUM(nota), SUM(nota * nota), MIN(nota), MAX(nota)
+    FROM notas HAVING COUNT(*) > 0
+    ORDER BY 1
+"""
+
+
+def _adicionar(registro, chave):
+    """Soma a nota do registro (NEW/OLD) à linha `chave`, criando-a se preciso"""
+    return f"""
+        INSERT INTO estatisticas_notas
+            (disciplina, quantidade, soma, soma_quadrados, minimo, maximo)
+        VALUES ({chave}, 1, {registro}.nota, {registro}.nota * {registro}.nota,
+                {registro}.nota, {registro}.nota)
+        ON CONFLICT (disciplina) DO UPDATE SET
+            quantidade = quantidade + 1,
+            soma = soma + excluded.soma,
+            soma_quadrados = soma_quadrados + excluded.soma_quadrados,
+            minimo = MIN(minimo, excluded.minimo),
+            maximo = MAX(maximo, excluded.maximo);"""
+
+
+def _remover(registro, chave, minimo, maximo):
+    """
+    Retira a nota do registro da linha `chave`. Mínimo/máximo só são
+    recalculados (pelas subconsultas indexadas) quando a nota removida era o extremo.
+    """
+    return f"""
+        UPDATE estatisticas_notas SET
+            quantidade = quantidade - 1,
+            soma = CASE WHEN quantidade > 1 THEN soma - {registro}.nota ELSE 0 END,
+            soma_quadrados = CASE WHEN quantidade > 1
+                THEN soma_quadrados - {registro}.nota * {registro}.nota ELSE 0 END,
+            minimo = CASE WHEN {registro}.nota > minimo THEN minimo ELSE ({minimo}) END,
+            maximo = CASE WHEN {registro}.nota < maximo THEN maximo ELSE ({maximo}) END
+        WHERE disciplina = {chave};
+        DELETE FROM estatisticas_notas WHERE disciplina = {chave} AND quantidade <= 0;"""
+
+
+def _remover_nota(registro):
+    # Primeiro a disciplina (reparo pelo índice (disciplina, nota)), depois o geral,
+    # cujo mínimo/máximo sai das linhas por disciplina já corrigidas
+    return (
+        _remover(registro, f"{registro}.disciplina",
+                 f"SELECT MIN(nota) FROM notas WHERE disciplina = {registro}.disciplina",
+                 f"SELECT MAX(nota) FROM notas WHERE disciplina = {registro}.disciplina")
+        + _remover(registro, f"'{GERAL}'",
+                   f"SELECT MIN(minimo) FROM estatisticas_notas WHERE disciplina <> '{GERAL}'",
+                   f"SELECT MAX(maximo) FROM estatisticas_notas WHERE disciplina <> '{GERAL}'"))
+
+
+def _adicionar_nota(registro):
+    return _adicionar(registro, f"{registro}.disciplina") + _adicionar(registro, f"'{GERAL}'")
+
+
+SQL_GATILHOS = [
+    """CREATE TRIGGER trg_estatisticas_alunos_insert AFTER INSERT ON alunos BEGIN
+        UPDATE contadores SET valor = valor + 1 WHERE nome = 'alunos';
+    END""",
+    """CREATE TRIGGER trg_estatisticas_alunos_delete AFTER DELETE ON alunos BEGIN
+        UPDATE contadores SET valor = valor - 1 WHERE nome = 'alunos';
+    END""",
+    f"""CREATE TRIGGER trg_estatisticas_notas_insert AFTER INSERT ON notas BEGIN
+        {_adicionar_nota('NEW')}
+    END""",
+    f"""CREATE TRIGGER trg_estatisticas_notas_update AFTER UPDATE OF disciplina, nota ON notas BEGIN
+        {_remover_nota('OLD')}
+        {_adicionar_nota('NEW')}
+    END""",
+    f"""CREATE TRIGGER trg_estatisticas_notas_delete AFTER DELETE ON notas BEGIN
+        {_remover_nota('OLD')}
+    END""",
+]
+
+
+def reconstruir_estatisticas(conexao):
+    """Recria tabelas, gatilhos e agregados a partir de alunos/notas (chamar em transação)"""
+    for gatilho in GATILHOS:
+        conexao.execute(f"DROP TRIGGER IF EXISTS {gatilho}")
+    conexao.execute("DROP TABLE IF EXISTS estatisticas_notas")
+    conexao.execute("""
+        CREATE TABLE estatisticas_notas (
+            disciplina TEXT PRIMARY KEY,
+            quantidade INTEGER NOT NULL,
+            soma REAL NOT NULL,
+            soma_quadrados REAL NOT NULL,
+            minimo REAL,
+            maximo REAL
+        )
+    """)
+    conexao.execute("""
+        CREATE TABLE IF NOT EXISTS contadores (
+            nome TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL
+        )
+    """)
+    conexao.execute("""
+        INSERT OR REPLACE INTO contadores (nome, valor) SELECT 'alunos', COUNT(*) FROM alunos
+    """)
+    conexao.execute(f"""
+        INSERT INTO estatisticas_notas
+            (disciplina, quantidade, soma, soma_quadrados, minimo, maximo)
+        {SQL_AGREGADO_VIVO}
+    """)
+    for sql in SQL_GATILHOS:
+        conexao.execute(sql)
+
+
+def _resumo(quantidade, soma, soma_quadrados, minimo, maximo):
+    """Média, variância e desvio padrão (populacionais) a partir dos acumuladores"""
+    media = soma / quantidade
+    variancia = max(soma_quadrados / quantidade - media * media, 0.0)
+    return {
+        'quantidade': quantidade,
+        'soma': soma,
+        'soma_quadrados': soma_quadrados,
+        'media': media,
+        'variancia': variancia,
+        'desvio_padrao': math.sqrt(variancia),
+        'minimo': minimo,
+        'maximo': maximo,
+    }
+
+
+def ler_estatisticas(conexao):
+    """
+    Lê os agregados mantidos pelos gatilhos (uma linha por disciplina).
+    Retorna {'total_alunos', 'total_notas', 'geral', 'disciplinas'};
+    'geral' é None quando não há notas.
+    """
+    linha = conexao.execute("SELECT valor FROM contadores WHERE nome = 'alunos'").fetchone()
+    geral = None
+    disciplinas = []
+    for disciplina, *acumuladores in conexao.execute("""
+        SELECT disciplina, quantidade, soma, soma_quadrados, minimo, maximo
+        FROM estatisticas_notas ORDER BY disciplina
+    """):
+        if disciplina == GERAL:
+            geral = _resumo(*acumuladores)
+        else:
+            disciplinas.append({'disciplina': disciplina, **_resumo(*acumuladores)})
+
+    return {
+        'total_alunos': linha[0] if linha else 0,
+        'total_notas': geral['quantidade'] if geral else 0,
+        'geral': geral,
+        'disciplinas': disciplinas,
+    }
+
+
+def combinar_estatisticas(resultados):
+    """
+    Junta resultados de ler_estatisticas de vários bancos (as escolas da rede):
+    soma os acumuladores, então média e desvio saem exatos, não uma média de médias.
+    """
+    total_alunos = 0
+    acumulados = {}  # disciplina -> [quantidade, soma, soma_quadrados, minimo, maximo]
+    for dados in resultados:
+        total_alunos += dados['total_alunos']
+        linhas = list(dados['disciplinas'])
+        if dados['geral']:
+            linhas.append({'disciplina': GERAL, **dados['geral']})
+        for linha in linhas:
+            atual = acumulados.get(linha['disciplina'])
+            if atual is None:
+                acumulados[linha['disciplina']] = [linha['quantidade'], linha['soma'],
+                                                   linha['soma_quadrados'], linha['minimo'],
+                                                   linha['maximo']]
+            else:
+                atual[0] += linha['quantidade']
+                atual[1] += linha['soma']
+                atual[2] += linha['soma_quadrados']
+                atual[3] = min(atual[3], linha['minimo'])
+                atual[4] = max(atual[4], linha['maximo'])
+
+    geral = _resumo(*acumulados.pop(GERAL)) if GERAL in acumulados else None
+    return {
+        'total_alunos': total_alunos,
+        'total_notas': geral['quantidade'] if geral else 0,
+        'geral': geral,
+        'disciplinas': [{'disciplina': disciplina, **_resumo(*acumulados[disciplina])}
+                        for disciplina in sorted(acumulados)],
+    }
+
+
+def ler_estatisticas_rede(escolas=None):
+    """
+    Estatísticas de cada escola (lidas em paralelo, da réplica quando roteado)
+    e o total da rede: ({escola: dados}, combinado).
+    """
+    import replica
+    from conexao import em_cada_escola
+
+    def ler():
+        conexao = replica.conectar_relatorio('estatisticas')
+        if not conexao:
+            raise RuntimeError("Não foi possível conectar ao banco de dados.")
+        try:
+            return ler_estatisticas(conexao)
+        finally:
+            conexao.close()
+
+    por_escola = dict(em_cada_escola(ler, escolas=escolas))
+    return por_escola, combinar_estatisticas(por_escola.values())
+
+
+def verificar_estatisticas(conexao):
+    """Compara os agregados mantidos com o cálculo direto; retorna a lista de divergências"""
+    divergencias = []
+    colunas = ('quantidade', 'soma', 'soma_quadrados', 'minimo', 'maximo')
+
+    esperado = {linha[0]: linha[1:] for linha in conexao.execute(SQL_AGREGADO_VIVO)}
+    encontrado = {linha[0]: linha[1:] for linha in conexao.execute("""
+        SELECT disciplina, quantidade, soma, soma_quadrados, minimo, maximo
+        FROM estatisticas_notas
+    """)}
+
+    for disciplina in sorted(esperado.keys() | encontrado.keys()):
+        rotulo = disciplina or '(geral)'
+        if disciplina not in encontrado:
+            divergencias.append(f"{rotulo}: sem linha de estatísticas")
+        elif disciplina not in esperado:
+            divergencias.append(f"{rotulo}: linha sem notas correspondentes")
+        else:
+            for coluna, valor_esperado, valor_encontrado in zip(
+                    colunas, esperado[disciplina], encontrado[disciplina]):
+                if not math.isclose(valor_esperado, valor_encontrado,
+                                    rel_tol=TOLERANCIA_RELATIVA, abs_tol=TOLERANCIA):
+                    divergencias.append(f"{rotulo}: {coluna} esperado {valor_esperado!r}, "
+                                        f"encontrado {valor_encontrado!r}")
+
+    total_alunos = conexao.execute("SELECT COUNT(*) FROM alunos").fetchone()[0]
+    linha = conexao.execute("SELECT valor FROM contadores WHERE nome = 'alunos'").fetchone()
+    if not linha or linha[0] != total_alunos:
+        divergencias.append(f"total de alunos: esperado {total_alunos}, "
+                            f"encontrado {linha[0] if linha else None}")
+
+    return divergencias
+
+
+def main():
+    from conexao import conectar
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('reconstruir', 'verificar'):
+        print("Uso: python estatisticas.py reconstruir|verificar [banco.db]")
+        sys.exit(1)
+
+    conexao = conectar(sys.argv[2] if len(sys.argv) > 2 else None)
+    if not conexao:
+        sys.exit(1)
+
+    try:
+        if sys.argv[1] == 'reconstruir':
+            with conexao:
+                reconstruir_estatisticas(conexao)
+            print("✅ Estatísticas reconstruídas com sucesso!")
+        else:
+            divergencias = verificar_estatisticas(conexao)
+            if not divergencias:
+                print("✅ Estatísticas consistentes com as notas.")
+            else:
+                print(f"❌ {len(divergencias)} divergência(s) encontrada(s):")
+                for divergencia in divergencias:
+                    print(f"  {divergencia}")
+                print("💡 Execute: python estatisticas.py reconstruir")
+                sys.exit(2)
+    finally:
+        conexao.close()
+
+
+if __name__ == "__main__":
+    main()
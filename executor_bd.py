@@ -0,0 +1,138 @@
+"""
+Executor de consultas fora da thread do Tkinter
+As funções rodam em threads de trabalho; os resultados voltam por uma fila
+drenada com root.after, então os callbacks sempre executam na thread da interface.
+"""
+
+import queue
+import threading
+import tkinter as tk
+from collections import defaultdict
+from itertools import count
+
+
+class Tarefa:
+    """Uma chamada enviada ao executor"""
+
+    def __init__(self, numero, funcao, args, kwargs, canal, geracao, ao_concluir, ao_falhar):
+        self.numero = numero
+        self.funcao = funcao
+        self.args = args
+        self.kwargs = kwargs
+        self.canal = canal
+        self.geracao = geracao
+        self.ao_concluir = ao_concluir
+        self.ao_falhar = ao_falhar
+
+
+class ExecutorBD:
+    """
+    Executa funções de banco em threads de trabalho.
+
+    Cada tarefa pode ter um `canal` (ex.: 'notas_aluno'): um novo envio no mesmo
+    canal torna obsoletas as anteriores, que deixam de rodar se ainda estão na
+    fila e têm o resultado descartado se já terminaram. Tarefas sem canal
+    (gravações) nunca são canceladas.
+    """
+
+    def __init__(self, root, trabalhadores=2, intervalo_ms=30, ao_mudar_ocupado=None):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self.ao_mudar_ocupado = ao_mudar_ocupado
+
+        self.pedidos = queue.Queue()
+        self.resultados = queue.Queue()
+        self.geracoes = defaultdict(int)
+        self.trava = threading.Lock()
+        self.numeros = count(1)
+        self.pendentes = 0
+        self.drenando = False
+
+        self.threads = [threading.Thread(target=self._trabalhar, name=f"executor-bd-{i}", daemon=True)
+                        for i in range(trabalhadores)]
+        for thread in self.threads:
+            thread.start()
+
+    def enviar(self, funcao, *args, canal=None, ao_concluir=None, ao_falhar=None, **kwargs):
+        """Agenda funcao(*args, **kwargs); ao_concluir(resultado) / ao_falhar(erro) rodam na interface"""
+        with self.trava:
+            if canal is not None:
+                self.geracoes[canal] += 1
+            tarefa = Tarefa(next(self.numeros), funcao, args, kwargs, canal,
+                            self.geracoes[canal] if canal is not None else None,
+                            ao_concluir, ao_falhar)
+        self._alterar_pendentes(1)
+        self.pedidos.put(tarefa)
+        if not self.drenando:
+            self.drenando = True
+            self.root.after(self.intervalo_ms, self._drenar)
+        return tarefa
+
+    def cancelar(self, canal):
+        """Torna obsoletas as tarefas pendentes do canal"""
+        with self.trava:
+            self.geracoes[canal] += 1
+
+    def cancelar_todos(self):
+        """Cancela todos os canais (ex.: ao trocar de tela); gravações seguem normalmente"""
+        with self.trava:
+            for canal in self.geracoes:
+                self.geracoes[canal] += 1
+
+    def obsoleta(self, tarefa):
+        if tarefa.canal is None:
+            return False
+        with self.trava:
+            return self.geracoes[tarefa.canal] != tarefa.geracao
+
+    def encerrar(self):
+        """Sinaliza às threads que terminem depois das tarefas já enfileiradas"""
+        for _ in self.threads:
+            self.pedidos.put(None)
+
+    def _trabalhar(self):
+        while True:
+            tarefa = self.pedidos.get()
+            if tarefa is None:
+                return
+            if self.obsoleta(tarefa):
+                self.resultados.put((tarefa, None, None))
+                continue
+            try:
+                resultado = tarefa.funcao(*tarefa.args, **tarefa.kwargs)
+                self.resultados.put((tarefa, resultado, None))
+            except Exception as e:
+                self.resultados.put((tarefa, None, e))
+
+    def _drenar(self):
+        """Entrega os resultados prontos (roda na thread da interface)"""
+        while True:
+            try:
+                tarefa, resultado, erro = self.resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._alterar_pendentes(-1)
+            if self.obsoleta(tarefa):
+                continue
+            try:
+                if erro is not None:
+                    if tarefa.ao_falhar:
+                        tarefa.ao_falhar(erro)
+                    else:
+                        print(f"Erro na tarefa {tarefa.funcao.__name__}: {erro}")
+                elif tarefa.ao_concluir:
+                    tarefa.ao_concluir(resultado)
+            except tk.TclError:
+                # A tela que pediu o resultado já foi destruída
+                pass
+
+        if self.pendentes:
+            self.root.after(self.intervalo_ms, self._drenar)
+        else:
+            self.drenando = False
+
+    def _alterar_pendentes(self, quantidade):
+        antes = self.pendentes
+        self.pendentes += quantidade
+        if self.ao_mudar_ocupado and bool(antes) != bool(self.pendentes):
+            self.ao_mudar_ocupado(bool(self.pendentes))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Exportação das notas e boletins da escola para CSV ou JSONL
+As linhas são lidas do cursor em blocos (fetchmany) e gravadas conforme
+chegam, com gzip opcional: a memória usada não depende do tamanho da escola.
+Uso: python exportar.py saida.csv|saida.jsonl[.gz] [notas|boletim]
+     [--disciplina NOME]... [--de MATRICULA] [--ate MATRICULA] [--banco arquivo.db]
+"""
+
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+import backend
+import metricas
+import pivot
+import replica
+
+# Linhas por fetchmany e por gravação no arquivo
+TAMANHO_BLOCO = 2000
+
+# Compressão do gzip: o nível 9 (padrão) leva ~45% mais tempo por arquivos ~10% menores
+NIVEL_GZIP = 6
+
+FORMATOS = ('csv', 'jsonl')
+TIPOS = ('notas', 'boletim')
+
+
+def formato_do_arquivo(caminho):
+    """(formato, comprimido) pela extensão: .csv, .jsonl, com ou sem .gz"""
+    nome = caminho.lower()
+    comprimido = nome.endswith('.gz')
+    if comprimido:
+        nome = nome[:-len('.gz')]
+    formato = os.path.splitext(nome)[1].lstrip('.')
+    if formato not in FORMATOS:
+        raise ValueError(f"Extensão não suportada: use {', '.join('.' + f for f in FORMATOS)} "
+                         f"(com .gz opcional).")
+    return formato, comprimido
+
+
+def _blocos_notas(conexao, disciplinas=None, faixa_matricula=None):
+    """(colunas, blocos de linhas): uma linha por nota, em ordem de matrícula e disciplina"""
+    colunas = ['matricula', 'nome', 'disciplina', 'nota']
+    selecao = "a.matricula, a.nome, n.disciplina, n.nota"
+    if 'data_atribuicao' in {linha[1] for linha in conexao.execute("PRAGMA table_info(notas)")}:
+        # Banco do sistema_escolar_completo
+        colunas.append('data_atribuicao')
+        selecao += ", n.data_atribuicao"
+
+    filtros = []
+    parametros = []
+    faixa, parametros_faixa = backend.filtro_faixa_matricula(faixa_matricula, 'a.matricula')
+    if faixa:
+        filtros.append(faixa)
+        parametros.extend(parametros_faixa)
+    if disciplinas:
+        filtros.append("n.disciplina IN (SELECT value FROM json_each(?))")
+        parametros.append(json.dumps(list(disciplinas)))
+    filtro = f" WHERE {' AND '.join(filtros)}" if filtros else ""
+
+    # CROSS JOIN fixa alunos por fora, percorrida pelo índice de matrícula: só as
+    # notas de cada aluno são ordenadas, nunca o resultado inteiro
+    cursor = conexao.execute(f"""
+        SELECT {selecao}
+        FROM alunos a
+        CROSS JOIN notas n ON n.aluno_id = a.id{filtro}
+        ORDER BY a.matricula, n.disciplina
+    """, parametros)
+
+    def blocos():
+        while True:
+            bloco = cursor.fetchmany(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            yield bloco
+    return colunas, blocos()
+
+
+def _blocos_boletim(conexao, disciplinas=None, faixa_matricula=None):
+    """(colunas, blocos de linhas): um aluno por linha, uma coluna por disciplina"""
+    todas = pivot.listar_disciplinas(conexao, backend.DISCIPLINAS)
+    # Chaves calculadas sobre todas as disciplinas, como no boletim lido
+    colunas = list(pivot.COLUNAS_ALUNO) + [
+        chave for disciplina, chave in zip(todas, pivot.colunas_disciplinas(todas))
+        if not disciplinas or disciplina in disciplinas]
+    boletins = backend.ler_boletim_alunos(conexao, faixa_matricula=faixa_matricula)
+
+    def blocos():
+        bloco = []
+        for aluno in boletins:
+            bloco.append([aluno[coluna] for coluna in colunas])
+            if len(bloco) == TAMANHO_BLOCO:
+                yield bloco
+                bloco = []
+        if bloco:
+            yield bloco
+    return colunas, blocos()
+
+
+def _gravar_csv(arquivo, colunas, blocos):
+    escritor = csv.writer(arquivo)
+    escritor.writerow(colunas)
+    for bloco in blocos:
+        escritor.writerows(bloco)
+        yield len(bloco)
+
+
+def _gravar_jsonl(arquivo, colunas, blocos):
+    for bloco in blocos:
+        arquivo.write(''.join(json.dumps(dict(zip(colunas, linha)), ensure_ascii=False) + '\n'
+                              for linha in bloco))
+        yield len(bloco)
+
+
+GRAVADORES = {
+    'csv': _gravar_csv,
+    'jsonl': _gravar_jsonl,
+}
+
+LEITORES = {
+    'notas': _blocos_notas,
+    'boletim': _blocos_boletim,
+}
+
+
+def exportar(caminho_saida, tipo='notas', disciplinas=None, faixa_matricula=None,
+             caminho=None, ao_progredir=None):
+    """
+    Exporta as notas (uma linha por nota) ou os boletins (uma linha por aluno)
+    para caminho_saida; o formato vem da extensão. O arquivo só aparece
+    completo (gravado em .tmp e renomeado). ao_progredir(linhas, segundos) é
+    chamado a cada bloco. Retorna {'linhas', 'segundos', 'linhas_por_segundo', 'bytes'}.
+    """
+    if tipo not in LEITORES:
+        raise ValueError(f"Tipo de exportação inválido: {tipo}. Opções: {', '.join(TIPOS)}")
+    formato, comprimido = formato_do_arquivo(caminho_saida)
+    conexao = replica.conectar_relatorio('exportacao', caminho)
+    if not conexao:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+
+    temporario = caminho_saida + '.tmp'
+    inicio = time.perf_counter()
+    linhas = 0
+    try:
+        colunas, blocos = LEITORES[tipo](conexao, disciplinas, faixa_matricula)
+        if comprimido:
+            arquivo = gzip.open(temporario, 'wt', compresslevel=NIVEL_GZIP, encoding='utf-8',
+                                newline='')
+        else:
+            arquivo = open(temporario, 'w', encoding='utf-8', newline='')
+        with arquivo:
+            for quantidade in GRAVADORES[formato](arquivo, colunas, blocos):
+                linhas += quantidade
+                if ao_progredir:
+                    ao_progredir(linhas, time.perf_counter() - inicio)
+        os.replace(temporario, caminho_saida)
+    except Exception:
+        metricas.FALHAS.incrementar(operacao='exportar')
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        conexao.close()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'linhas': linhas,
+        'segundos': segundos,
+        'linhas_por_segundo': linhas / segundos if segundos else 0.0,
+        'bytes': os.path.getsize(caminho_saida),
+    }
+
+
+def imprimir_resultado(caminho_saida, resultado):
+    print(f"✅ {resultado['linhas']} linha(s) exportada(s) para {caminho_saida} "
+          f"em {resultado['segundos']:.2f}s ({resultado['linhas_por_segundo']:,.0f} linhas/s, "
+          f"{resultado['bytes'] / 1024 / 1024:.1f} MB)")
+
+
+def _opcoes(argumentos, nome):
+    """Remove de argumentos todas as ocorrências de `nome valor` e devolve os valores"""
+    valores = []
+    while nome in argumentos:
+        posicao = argumentos.index(nome)
+        valores.append(argumentos[posicao + 1])
+        del argumentos[posicao:posicao + 2]
+    return valores
+
+
+def main():
+    argumentos = sys.argv[1:]
+    disciplinas = _opcoes(argumentos, '--disciplina')
+    de = (_opcoes(argumentos, '--de') or [None])[-1]
+    ate = (_opcoes(argumentos, '--ate') or [None])[-1]
+    caminho = (_opcoes(argumentos, '--banco') or [None])[-1]
+    if not argumentos or len(argumentos) > 2:
+        print(__doc__.strip().split('\n', 3)[-1])
+        sys.exit(1)
+    caminho_saida = argumentos[0]
+    tipo = argumentos[1] if len(argumentos) > 1 else 'notas'
+
+    def progresso(linhas, segundos):
+        print(f"\r📤 {linhas} linha(s) ({linhas / segundos:,.0f} linhas/s)", end='', flush=True)
+
+    try:
+        resultado = exportar(caminho_saida, tipo, disciplinas, (de, ate), caminho, progresso)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"\n❌ Erro na exportação: {e}")
+        sys.exit(1)
+    print()
+    imprimir_resultado(caminho_saida, resultado)
+
+
+if __name__ == "__main__":
+    main()
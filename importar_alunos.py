@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Matrícula de alunos em lote a partir de arquivos CSV ou JSONL
+Uso: python importar_alunos.py arquivo.csv [relatorio_rejeitados.csv]
+
+Cada registro deve ter as colunas nome, cpf e endereco; CPFs com dígitos
+verificadores inválidos são rejeitados.
+"""
+
+import csv
+import os
+import sys
+import time
+
+from cadastro import cadastrar_alunos_em_lote
+from importar_notas import ler_registros
+
+
+def importar_alunos(caminho, caminho_rejeitados=None):
+    """Matricula os alunos do arquivo; registros inválidos vão para o relatório"""
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(caminho)
+    caminho_rejeitados = caminho_rejeitados or f"{caminho}.rejeitados.csv"
+
+    def alunos():
+        for _, registro in ler_registros(caminho):
+            yield registro.get('nome'), registro.get('cpf'), registro.get('endereco')
+
+    inicio = time.perf_counter()
+    with open(caminho_rejeitados, 'w', encoding='utf-8', newline='') as relatorio:
+        escritor = csv.writer(relatorio)
+        escritor.writerow(['registro', 'motivo', 'nome', 'cpf', 'endereco'])
+
+        def rejeitar(indice, aluno, motivo):
+            escritor.writerow([indice + 1, motivo, *aluno])
+
+        cadastrados, rejeitados = cadastrar_alunos_em_lote(alunos(), ao_rejeitar=rejeitar,
+                                                           validar_cpf=True)
+    duracao = time.perf_counter() - inicio
+
+    if not rejeitados:
+        os.remove(caminho_rejeitados)
+
+    return {
+        'cadastrados': cadastrados,
+        'rejeitados': rejeitados,
+        'segundos': duracao,
+        'alunos_por_segundo': (cadastrados + rejeitados) / duracao if duracao else 0.0,
+        'relatorio_rejeitados': caminho_rejeitados if rejeitados else None,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python importar_alunos.py arquivo.csv|arquivo.jsonl [relatorio_rejeitados.csv]")
+        sys.exit(1)
+
+    caminho = sys.argv[1]
+    caminho_rejeitados = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print(f"📥 Matriculando alunos de {caminho}...")
+    try:
+        resultado = importar_alunos(caminho, caminho_rejeitados)
+    except FileNotFoundError:
+        print(f"❌ Arquivo não encontrado: {caminho}")
+        sys.exit(1)
+    except RuntimeError as e:
+        # O relatório de rejeitados fica com os registros lidos até a interrupção
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ {resultado['cadastrados']} aluno(s) matriculado(s) em {resultado['segundos']:.2f}s "
+          f"({resultado['alunos_por_segundo']:.0f} alunos/s)")
+    if resultado['rejeitados']:
+        print(f"⚠️ {resultado['rejeitados']} registro(s) rejeitado(s). "
+              f"Relatório: {resultado['relatorio_rejeitados']}")
+
+
+if __name__ == "__main__":
+    main()
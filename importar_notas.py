@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Importação de notas em lote a partir de arquivos CSV ou JSONL
+Uso: python importar_notas.py arquivo.csv [relatorio_rejeitadas.csv]
+
+Cada registro deve ter as colunas matricula (ou aluno_id), disciplina e nota.
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+
+from backend import atribuir_notas_em_lote
+from conexao import conectar
+
+
+def ler_registros(caminho):
+    """Lê o arquivo sob demanda, gerando (numero_da_linha, registro)"""
+    with open(caminho, 'r', encoding='utf-8-sig', newline='') as arquivo:
+        if caminho.lower().endswith(('.jsonl', '.json', '.ndjson')):
+            for numero, linha in enumerate(arquivo, 1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    registro = None
+                yield numero, registro if isinstance(registro, dict) else {'_linha': linha.strip()}
+        else:
+            amostra = arquivo.read(4096)
+            arquivo.seek(0)
+            delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+            leitor = csv.DictReader(arquivo, delimiter=delimitador)
+            for registro in leitor:
+                yield leitor.line_num, registro
+
+
+def _mapa_matriculas():
+    """Mapeia matrícula -> id de todos os alunos com uma única consulta"""
+    conexao = conectar()
+    if not conexao:
+        return {}
+    try:
+        return dict(conexao.execute(
+            "SELECT matricula, id FROM alunos WHERE matricula IS NOT NULL"))
+    finally:
+        conexao.close()
+
+
+def _aluno_do_registro(registro, matriculas):
+    """Resolve o aluno pelo campo aluno_id ou pela matrícula"""
+    aluno_id = registro.get('aluno_id')
+    if aluno_id not in (None, ''):
+        try:
+            return int(aluno_id)
+        except (TypeError, ValueError):
+            return None
+    matricula = registro.get('matricula')
+    if matricula is None:
+        return None
+    return matriculas.get(str(matricula).strip())
+
+
+def importar_notas(caminho, funcionario_id=1, caminho_rejeitadas=None):
+    """Importa notas de um arquivo CSV/JSONL; linhas inválidas vão para o relatório"""
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(caminho)
+    caminho_rejeitadas = caminho_rejeitadas or f"{caminho}.rejeitadas.csv"
+    matriculas = _mapa_matriculas()
+    atual = {}  # último registro lido (a validação ocorre logo após a leitura)
+
+    def notas():
+        for numero, registro in ler_registros(caminho):
+            atual['linha'], atual['registro'] = numero, registro
+            disciplina = registro.get('disciplina')
+            yield (_aluno_do_registro(registro, matriculas),
+                   disciplina.strip() if isinstance(disciplina, str) else disciplina,
+                   registro.get('nota'))
+
+    inicio = time.perf_counter()
+    with open(caminho_rejeitadas, 'w', encoding='utf-8', newline='') as relatorio:
+        escritor = csv.writer(relatorio)
+        escritor.writerow(['linha', 'motivo', 'registro'])
+
+        def rejeitar(indice, linha, motivo):
+            escritor.writerow([atual['linha'], motivo,
+                               json.dumps(atual['registro'], ensure_ascii=False)])
+
+        gravadas, rejeitadas = atribuir_notas_em_lote(
+            notas(), funcionario_id, ao_rejeitar=rejeitar)
+    duracao = time.perf_counter() - inicio
+
+    if not rejeitadas:
+        os.remove(caminho_rejeitadas)
+
+    return {
+        'gravadas': gravadas,
+        'rejeitadas': rejeitadas,
+        'segundos': duracao,
+        'notas_por_segundo': (gravadas + rejeitadas) / duracao if duracao else 0.0,
+        'relatorio_rejeitadas': caminho_rejeitadas if rejeitadas else None,
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python importar_notas.py arquivo.csv|arquivo.jsonl [relatorio_rejeitadas.csv]")
+        sys.exit(1)
+
+    caminho = sys.argv[1]
+    caminho_rejeitadas = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print(f"📥 Importando notas de {caminho}...")
+    try:
+        resultado = importar_notas(caminho, caminho_rejeitadas=caminho_rejeitadas)
+    except FileNotFoundError:
+        print(f"❌ Arquivo não encontrado: {caminho}")
+        sys.exit(1)
+    except RuntimeError as e:
+        # O relatório de rejeitadas fica com as linhas lidas até a interrupção
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ {resultado['gravadas']} nota(s) gravada(s) em {resultado['segundos']:.2f}s "
+          f"({resultado['notas_por_segundo']:.0f} notas/s)")
+    if resultado['rejeitadas']:
+        print(f"⚠️ {resultado['rejeitadas']} linha(s) rejeitada(s). "
+              f"Relatório: {resultado['relatorio_rejeitadas']}")
+
+
+if __name__ == "__main__":
+    main()
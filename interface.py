@@ -1,14 +1,94 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import sqlite3
+from tkinter import ttk, messagebox, filedialog
 from functools import partial
 
+from backend import (DISCIPLINAS, consultar_pagina_alunos, listar_disciplinas, contar_alunos,
+                     consultar_janela_alunos, excluir_aluno, gravar_notas)
+from conexao import conectar
+from escritor import gravar
+from executor_bd import ExecutorBD
+from importar_notas import importar_notas
+import metricas
+from lista_virtual import ListaVirtual, SincronizadorTreeview
+from migracoes import aplicar_migracoes
+from pivot import colunas_disciplinas
+import repositorio
+
+# Alunos por página na tela de consulta de notas
+TAMANHO_PAGINA_CONSULTA = 200
+
+
+# Consultas executadas nas threads do ExecutorBD (sem acesso a widgets)
+def autenticar_funcionario(cpf, senha):
+    """(id, nome) do funcionário ou None se CPF/senha não conferem"""
+    conn = conectar()
+    if not conn:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+    try:
+        with metricas.DURACAO_LOGIN.cronometrar(origem='interface'):
+            return conn.execute("SELECT id, nome FROM funcionario WHERE cpf = ? AND senha = ?",
+                                (cpf, senha)).fetchone()
+    finally:
+        conn.close()
+
+
+def cadastrar_aluno_bd(nome, cpf, endereco, matricula):
+    """Insere o aluno; retorna False se o CPF ou a matrícula já estão cadastrados"""
+    conn = conectar()
+    if not conn:
+        raise RuntimeError("Não foi possível conectar ao banco de dados.")
+    try:
+        # Verifica se CPF ou matrícula já existem
+        existente = conn.execute("SELECT id FROM alunos WHERE cpf = ? OR matricula = ?",
+                                 (cpf, matricula)).fetchone()
+    finally:
+        # Devolvida antes de esperar o escritor
+        conn.close()
+    if existente:
+        return False
+    
+    with metricas.DURACAO_CADASTRO.cronometrar():
+        gravar("""
+            INSERT INTO alunos (nome, cpf, endereco, matricula)
+            VALUES (?, ?, ?, ?)
+        """, (nome, cpf, endereco, matricula))
+    metricas.ALUNOS_CADASTRADOS.incrementar(modo='individual')
+    repositorio.invalidar_alunos()
+    return True
+
+
+def consultar_alunos_combobox():
+    # Lidos do cache do repositório; cadastros e remoções o invalidam
+    return [aluno[:3] for aluno in repositorio.listar_alunos()]
+
+
+def consultar_notas_aluno(aluno_id):
+    return repositorio.notas_do_aluno(aluno_id)
+
+
+def gravar_nota(aluno_id, disciplina, nota, funcionario_id):
+    # Insere a nota ou atualiza a existente no mesmo comando (escritor único)
+    with metricas.DURACAO_GRAVACAO_NOTA.cronometrar():
+        gravar_notas([(aluno_id, disciplina, nota, funcionario_id)])
+    metricas.NOTAS_GRAVADAS.incrementar(modo='individual')
+    repositorio.invalidar_notas(aluno_id)
+
+
+def remover_aluno_bd(aluno_id):
+    excluir_aluno(aluno_id)
+
+
 class SistemaEscolar:
     def __init__(self, root):
         self.root = root
         self.root.title("Sistema Escolar")
         self.root.geometry("900x600")
         
+        # Consultas rodam fora da thread da interface; a barra mostra quando há espera
+        self.barra_status = ttk.Label(self.root, anchor='w', padding=(10, 2))
+        self.barra_status.pack(side=tk.BOTTOM, fill='x')
+        self.executor = ExecutorBD(self.root, ao_mudar_ocupado=self.mostrar_carregando)
+        
         # Criar banco de dados se não existir
         self.criar_banco_dados()
         
@@ -16,7 +96,7 @@ class SistemaEscolar:
         self.tela_login()
     
     def criar_banco_dados(self):
-        conn = sqlite3.connect('sistema_nota.db')
+        conn = conectar()
         cursor = conn.cursor()
         
         # Tabela de funcionários
@@ -60,6 +140,9 @@ class SistemaEscolar:
         """)
         
         conn.commit()
+        
+        # Índices e demais migrações de esquema
+        aplicar_migracoes(conn)
         conn.close()
     
     def tela_login(self):
@@ -86,26 +169,26 @@ class SistemaEscolar:
         senha = self.senha_entry.get()
         
         if cpf == "12345678900" and senha == "admin123":
+            metricas.LOGINS.incrementar(origem='interface', resultado='sucesso')
             self.funcionario_id = 1
             self.nome_funcionario = "Administrador"
             self.menu_principal()
         else:
-            try:
-                conn = sqlite3.connect('sistema_nota.db')
-                cursor = conn.cursor()
-                
-                cursor.execute("SELECT id, nome FROM funcionario WHERE cpf = ? AND senha = ?", (cpf, senha))
-                resultado = cursor.fetchone()
-                
-                if resultado:
-                    self.funcionario_id, self.nome_funcionario = resultado
-                    self.menu_principal()
-                else:
-                    messagebox.showerror("Erro", "CPF ou senha incorretos!")
-            except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao fazer login: {e}")
-            finally:
-                conn.close()
+            self.executor.enviar(autenticar_funcionario, cpf, senha, canal='login',
+                                 ao_concluir=self.login_concluido, ao_falhar=self.login_falhou)
+    
+    def login_concluido(self, resultado):
+        if resultado:
+            metricas.LOGINS.incrementar(origem='interface', resultado='sucesso')
+            self.funcionario_id, self.nome_funcionario = resultado
+            self.menu_principal()
+        else:
+            metricas.LOGINS.incrementar(origem='interface', resultado='recusado')
+            messagebox.showerror("Erro", "CPF ou senha incorretos!")
+    
+    def login_falhou(self, erro):
+        metricas.LOGINS.incrementar(origem='interface', resultado='erro')
+        self.mostrar_erro("Erro ao fazer login", erro)
     
     def menu_principal(self):
         """Menu principal após login"""
@@ -183,35 +266,23 @@ class SistemaEscolar:
             messagebox.showerror("Erro", "Todos os campos são obrigatórios!")
             return
         
-        try:
-            conn = sqlite3.connect('sistema_nota.db')
-            cursor = conn.cursor()
-            
-            # Verifica se CPF ou matrícula já existem
-            cursor.execute("SELECT id FROM alunos WHERE cpf = ? OR matricula = ?", (cpf, matricula))
-            if cursor.fetchone():
-                messagebox.showerror("Erro", "CPF ou matrícula já cadastrados!")
-                return
-            
-            # Insere o novo aluno
-            cursor.execute("""
-                INSERT INTO alunos (nome, cpf, endereco, matricula)
-                VALUES (?, ?, ?, ?)
-            """, (nome, cpf, endereco, matricula))
-            
-            conn.commit()
-            messagebox.showinfo("Sucesso", "Aluno cadastrado com sucesso!")
-            
-            # Limpa os campos
-            self.nome_aluno_entry.delete(0, tk.END)
-            self.cpf_aluno_entry.delete(0, tk.END)
-            self.endereco_aluno_entry.delete(0, tk.END)
-            self.matricula_aluno_entry.delete(0, tk.END)
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao cadastrar aluno: {e}")
-        finally:
-            conn.close()
+        # Gravações não têm canal: nunca são descartadas
+        self.executor.enviar(cadastrar_aluno_bd, nome, cpf, endereco, matricula,
+                             ao_concluir=self.cadastro_concluido,
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao cadastrar aluno"))
+    
+    def cadastro_concluido(self, cadastrado):
+        if not cadastrado:
+            messagebox.showerror("Erro", "CPF ou matrícula já cadastrados!")
+            return
+        
+        messagebox.showinfo("Sucesso", "Aluno cadastrado com sucesso!")
+        
+        # Limpa os campos
+        self.nome_aluno_entry.delete(0, tk.END)
+        self.cpf_aluno_entry.delete(0, tk.END)
+        self.endereco_aluno_entry.delete(0, tk.END)
+        self.matricula_aluno_entry.delete(0, tk.END)
     
     def tela_listar_alunos(self):
         """Tela para listar e remover alunos"""
@@ -222,9 +293,11 @@ class SistemaEscolar:
         
         ttk.Label(frame, text="Lista de Alunos", font=('Arial', 16)).pack(pady=10)
         
-        # Treeview para exibir alunos
+        # Lista virtual: só as linhas visíveis ficam no Treeview
         columns = ('id', 'nome', 'cpf', 'matricula', 'endereco')
-        self.tree_alunos = ttk.Treeview(frame, columns=columns, show='headings')
+        self.lista_alunos = ListaVirtual(frame, columns, contar_alunos, self.buscar_pagina_alunos,
+                                         executor=self.executor)
+        self.tree_alunos = self.lista_alunos.tree
         
         # Configurar colunas
         self.tree_alunos.heading('id', text='ID')
@@ -240,11 +313,7 @@ class SistemaEscolar:
         self.tree_alunos.column('matricula', width=100)
         self.tree_alunos.column('endereco', width=250)
         
-        # Barra de rolagem
-        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.tree_alunos.yview)
-        self.tree_alunos.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree_alunos.pack(expand=True, fill='both')
+        self.lista_alunos.pack(expand=True, fill='both')
         
         # Botões
         btn_frame = ttk.Frame(frame)
@@ -258,27 +327,17 @@ class SistemaEscolar:
         self.carregar_alunos()
     
     def carregar_alunos(self):
-        """Carrega a lista de alunos do banco de dados"""
+        """Recarrega a lista de alunos (as páginas são lidas sob demanda)"""
         try:
-            conn = sqlite3.connect('sistema_nota.db')
-            cursor = conn.cursor()
-            
-            # Limpa a treeview
-            for item in self.tree_alunos.get_children():
-                self.tree_alunos.delete(item)
-            
-            # Busca alunos
-            cursor.execute("SELECT id, nome, cpf, matricula, endereco FROM alunos ORDER BY nome")
-            alunos = cursor.fetchall()
-            
-            # Insere na treeview
-            for aluno in alunos:
-                self.tree_alunos.insert('', tk.END, values=aluno)
-                
+            self.lista_alunos.recarregar()
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao carregar alunos: {e}")
-        finally:
-            conn.close()
+    
+    def buscar_pagina_alunos(self, numero, tamanho, anterior):
+        """Página da lista virtual: por chave (nome, id) se a anterior é conhecida"""
+        if anterior:
+            return consultar_janela_alunos(limit=tamanho, after=(anterior[1], anterior[0]))
+        return consultar_janela_alunos(offset=numero * tamanho, limit=tamanho)
     
     def remover_aluno(self):
         """Remove o aluno selecionado"""
@@ -289,26 +348,17 @@ class SistemaEscolar:
         
         aluno_id = self.tree_alunos.item(selected_item)['values'][0]
         aluno_nome = self.tree_alunos.item(selected_item)['values'][1]
+        if not isinstance(aluno_id, int):
+            # Linha ainda carregando
+            return
         
         if messagebox.askyesno("Confirmar", f"Tem certeza que deseja remover o aluno {aluno_nome}?"):
-            try:
-                conn = sqlite3.connect('sistema_nota.db')
-                cursor = conn.cursor()
-                
-                # Remove primeiro as notas associadas ao aluno
-                cursor.execute("DELETE FROM notas WHERE aluno_id = ?", (aluno_id,))
-                
-                # Remove o aluno
-                cursor.execute("DELETE FROM alunos WHERE id = ?", (aluno_id,))
-                
-                conn.commit()
+            def concluido(_):
                 messagebox.showinfo("Sucesso", "Aluno removido com sucesso!")
                 self.carregar_alunos()
-                
-            except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao remover aluno: {e}")
-            finally:
-                conn.close()
+            
+            self.executor.enviar(remover_aluno_bd, aluno_id, ao_concluir=concluido,
+                                 ao_falhar=partial(self.mostrar_erro, "Erro ao remover aluno"))
     
     def tela_atribuir_notas(self):
         """Tela para atribuir notas aos alunos"""
@@ -339,8 +389,7 @@ class SistemaEscolar:
         ttk.Label(nota_frame, text="Disciplina:").pack(side=tk.LEFT, padx=5)
         
         self.disciplina_var = tk.StringVar()
-        disciplinas = ['Matemática', 'Português', 'História', 'Geografia', 'Ciências', 'Inglês', 'Artes', 'Educação Física']
-        self.disciplina_combobox = ttk.Combobox(nota_frame, textvariable=self.disciplina_var, values=disciplinas)
+        self.disciplina_combobox = ttk.Combobox(nota_frame, textvariable=self.disciplina_var, values=DISCIPLINAS)
         self.disciplina_combobox.pack(side=tk.LEFT, padx=5)
         
         ttk.Label(nota_frame, text="Nota (0-10):").pack(side=tk.LEFT, padx=5)
@@ -348,8 +397,11 @@ class SistemaEscolar:
         self.nota_entry = ttk.Entry(nota_frame, width=5)
         self.nota_entry.pack(side=tk.LEFT, padx=5)
         
-        # Botão para atribuir nota
-        ttk.Button(frame, text="Atribuir Nota", command=self.atribuir_nota).pack(pady=10)
+        # Botões para atribuir nota e importar planilha
+        acoes_frame = ttk.Frame(frame)
+        acoes_frame.pack(pady=10)
+        ttk.Button(acoes_frame, text="Atribuir Nota", command=self.atribuir_nota).pack(side=tk.LEFT, padx=5)
+        ttk.Button(acoes_frame, text="Importar Arquivo...", command=self.importar_notas_arquivo).pack(side=tk.LEFT, padx=5)
         
         # Treeview para exibir notas do aluno selecionado
         columns = ('disciplina', 'nota')
@@ -365,6 +417,7 @@ class SistemaEscolar:
         self.tree_notas.configure(yscroll=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree_notas.pack(expand=True, fill='both')
+        self.sinc_notas = SincronizadorTreeview(self.tree_notas)
         
         # Botão para atualizar notas
         ttk.Button(frame, text="Atualizar Notas", command=self.carregar_notas_aluno).pack(pady=5)
@@ -377,24 +430,17 @@ class SistemaEscolar:
     
     def carregar_alunos_combobox(self):
         """Carrega a lista de alunos no combobox"""
-        try:
-            conn = sqlite3.connect('sistema_nota.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT id, nome, matricula FROM alunos ORDER BY nome")
-            alunos = cursor.fetchall()
-            
-            # Formata como "Nome (Matrícula)"
-            alunos_formatados = [f"{aluno[1]} ({aluno[2]})" for aluno in alunos]
-            self.aluno_combobox['values'] = alunos_formatados
-            
-            # Armazena os IDs dos alunos na mesma ordem
-            self.alunos_ids = [aluno[0] for aluno in alunos]
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar alunos: {e}")
-        finally:
-            conn.close()
+        self.executor.enviar(consultar_alunos_combobox, canal='alunos_combobox',
+                             ao_concluir=self.preencher_alunos_combobox,
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao carregar alunos"))
+    
+    def preencher_alunos_combobox(self, alunos):
+        # Formata como "Nome (Matrícula)"
+        alunos_formatados = [f"{aluno[1]} ({aluno[2]})" for aluno in alunos]
+        self.aluno_combobox['values'] = alunos_formatados
+        
+        # Armazena os IDs dos alunos na mesma ordem
+        self.alunos_ids = [aluno[0] for aluno in alunos]
     
     def carregar_notas_aluno(self):
         """Carrega as notas do aluno selecionado"""
@@ -404,31 +450,14 @@ class SistemaEscolar:
             
         aluno_id = self.alunos_ids[selected_index]
         
-        try:
-            conn = sqlite3.connect('sistema_nota.db')
-            cursor = conn.cursor()
-            
-            # Limpa a treeview
-            for item in self.tree_notas.get_children():
-                self.tree_notas.delete(item)
-            
-            # Busca notas do aluno
-            cursor.execute("""
-                SELECT disciplina, nota FROM notas 
-                WHERE aluno_id = ? 
-                ORDER BY disciplina
-            """, (aluno_id,))
-            
-            notas = cursor.fetchall()
-            
-            # Insere na treeview
-            for nota in notas:
-                self.tree_notas.insert('', tk.END, values=nota)
-                
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar notas: {e}")
-        finally:
-            conn.close()
+        # Trocar de aluno descarta a consulta anterior ainda pendente
+        self.executor.enviar(consultar_notas_aluno, aluno_id, canal='notas_aluno',
+                             ao_concluir=partial(self.preencher_notas_aluno, aluno_id),
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao carregar notas"))
+    
+    def preencher_notas_aluno(self, aluno_id, notas):
+        # Aplica só as notas alteradas (itens identificados por aluno/disciplina)
+        self.sinc_notas.sincronizar(notas, [f"{aluno_id}|{disciplina}" for disciplina, _ in notas])
     
     def atribuir_nota(self):
         """Atribui uma nota ao aluno selecionado"""
@@ -458,45 +487,41 @@ class SistemaEscolar:
             messagebox.showwarning("Aviso", "Digite um valor numérico para a nota!")
             return
             
-        try:
-            conn = sqlite3.connect('sistema_nota.db')
-            cursor = conn.cursor()
-            
-            # Verifica se já existe nota para essa disciplina
-            cursor.execute("""
-                SELECT id FROM notas 
-                WHERE aluno_id = ? AND disciplina = ?
-            """, (aluno_id, disciplina))
-            
-            nota_existente = cursor.fetchone()
-            
-            if nota_existente:
-                # Atualiza a nota existente
-                cursor.execute("""
-                    UPDATE notas SET nota = ?, funcionario_id = ?
-                    WHERE id = ?
-                """, (nota, self.funcionario_id, nota_existente[0]))
-                mensagem = "Nota atualizada com sucesso!"
-            else:
-                # Insere nova nota
-                cursor.execute("""
-                    INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id)
-                    VALUES (?, ?, ?, ?)
-                """, (aluno_id, disciplina, nota, self.funcionario_id))
-                mensagem = "Nota atribuída com sucesso!"
-            
-            conn.commit()
-            messagebox.showinfo("Sucesso", mensagem)
+        def concluido(_):
+            messagebox.showinfo("Sucesso", "Nota registrada com sucesso!")
             
             # Limpa os campos e atualiza a lista
             self.disciplina_var.set('')
             self.nota_entry.delete(0, tk.END)
             self.carregar_notas_aluno()
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao atribuir nota: {e}")
-        finally:
-            conn.close()
+        
+        # Gravações não têm canal: nunca são descartadas
+        self.executor.enviar(gravar_nota, aluno_id, disciplina, nota, self.funcionario_id,
+                             ao_concluir=concluido,
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao atribuir nota"))
+    
+    def importar_notas_arquivo(self):
+        """Importa notas em lote de um arquivo CSV ou JSONL"""
+        caminho = filedialog.askopenfilename(
+            title="Importar notas",
+            filetypes=[("Planilhas CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Todos os arquivos", "*.*")])
+        if not caminho:
+            return
+        
+        self.executor.enviar(importar_notas, caminho, self.funcionario_id,
+                             ao_concluir=self.importacao_concluida,
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao importar notas"))
+    
+    def importacao_concluida(self, resultado):
+        mensagem = (f"{resultado['gravadas']} nota(s) gravada(s) "
+                    f"({resultado['notas_por_segundo']:.0f} notas/s).")
+        if resultado['rejeitadas']:
+            mensagem += (f"\n{resultado['rejeitadas']} linha(s) rejeitada(s). "
+                         f"Relatório: {resultado['relatorio_rejeitadas']}")
+            messagebox.showwarning("Importação concluída", mensagem)
+        else:
+            messagebox.showinfo("Importação concluída", mensagem)
+        self.carregar_notas_aluno()
     
     def tela_consultar_notas(self):
         """Tela para consultar notas de todos os alunos"""
@@ -507,22 +532,22 @@ class SistemaEscolar:
         
         ttk.Label(frame, text="Consultar Notas", font=('Arial', 16)).pack(pady=10)
         
-        # Treeview para exibir notas
-        columns = ['aluno', 'matricula', 'matematica', 'portugues', 'historia', 'geografia', 
-                  'ciencias', 'ingles', 'artes', 'educacao_fisica']
+        # As colunas dependem das disciplinas cadastradas, lidas fora da interface
+        self.executor.enviar(listar_disciplinas, canal='consulta_notas',
+                             ao_concluir=partial(self.montar_consulta_notas, frame),
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao carregar disciplinas"))
+    
+    def montar_consulta_notas(self, frame, disciplinas):
+        # Treeview para exibir notas (uma coluna por disciplina cadastrada)
+        self.colunas_disciplinas = colunas_disciplinas(tuple(disciplinas))
+        columns = ['aluno', 'matricula', *self.colunas_disciplinas]
         self.tree_consulta_notas = ttk.Treeview(frame, columns=columns, show='headings')
         
         # Configurar colunas
         self.tree_consulta_notas.heading('aluno', text='Aluno')
         self.tree_consulta_notas.heading('matricula', text='Matrícula')
-        self.tree_consulta_notas.heading('matematica', text='Matemática')
-        self.tree_consulta_notas.heading('portugues', text='Português')
-        self.tree_consulta_notas.heading('historia', text='História')
-        self.tree_consulta_notas.heading('geografia', text='Geografia')
-        self.tree_consulta_notas.heading('ciencias', text='Ciências')
-        self.tree_consulta_notas.heading('ingles', text='Inglês')
-        self.tree_consulta_notas.heading('artes', text='Artes')
-        self.tree_consulta_notas.heading('educacao_fisica', text='Educ. Física')
+        for coluna, disciplina in zip(self.colunas_disciplinas, disciplinas):
+            self.tree_consulta_notas.heading(coluna, text=disciplina)
         
         # Ajustar largura das colunas
         for col in columns:
@@ -535,59 +560,72 @@ class SistemaEscolar:
         self.tree_consulta_notas.configure(yscroll=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree_consulta_notas.pack(expand=True, fill='both')
+        self.sinc_consulta_notas = SincronizadorTreeview(self.tree_consulta_notas)
+        self.consulta_after = None
         
         # Botões
         btn_frame = ttk.Frame(frame)
         btn_frame.pack(pady=10)
         
         ttk.Button(btn_frame, text="Atualizar", command=self.carregar_consulta_notas).pack(side=tk.LEFT, padx=5)
+        self.btn_carregar_mais = ttk.Button(btn_frame, text="Carregar Mais", command=self.carregar_mais_consulta_notas)
+        self.btn_carregar_mais.pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Voltar", command=self.menu_principal).pack(side=tk.LEFT, padx=5)
         
         # Carregar notas
         self.carregar_consulta_notas()
     
     def carregar_consulta_notas(self):
-        """Carrega a consulta de notas no formato pivot"""
-        try:
-            conn = sqlite3.connect('sistema_nota.db')
-            cursor = conn.cursor()
-            
-            # Limpa a treeview
-            for item in self.tree_consulta_notas.get_children():
-                self.tree_consulta_notas.delete(item)
-            
-            # Consulta pivot de notas
-            cursor.execute("""
-                SELECT a.nome, a.matricula,
-                    MAX(CASE WHEN n.disciplina = 'Matemática' THEN n.nota END) AS matematica,
-                    MAX(CASE WHEN n.disciplina = 'Português' THEN n.nota END) AS portugues,
-                    MAX(CASE WHEN n.disciplina = 'História' THEN n.nota END) AS historia,
-                    MAX(CASE WHEN n.disciplina = 'Geografia' THEN n.nota END) AS geografia,
-                    MAX(CASE WHEN n.disciplina = 'Ciências' THEN n.nota END) AS ciencias,
-                    MAX(CASE WHEN n.disciplina = 'Inglês' THEN n.nota END) AS ingles,
-                    MAX(CASE WHEN n.disciplina = 'Artes' THEN n.nota END) AS artes,
-                    MAX(CASE WHEN n.disciplina = 'Educação Física' THEN n.nota END) AS educacao_fisica
-                FROM alunos a
-                LEFT JOIN notas n ON a.id = n.aluno_id
-                GROUP BY a.id, a.nome, a.matricula
-                ORDER BY a.nome
-            """)
-            
-            notas = cursor.fetchall()
-            
-            # Insere na treeview
-            for nota in notas:
-                self.tree_consulta_notas.insert('', tk.END, values=nota)
-                
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar notas: {e}")
-        finally:
-            conn.close()
+        """Atualiza as linhas já exibidas da consulta de notas no formato pivot"""
+        self.btn_carregar_mais.state(['disabled'])
+        # Relê tantas linhas quanto as exibidas e aplica só a diferença
+        quantidade = max(len(self.sinc_consulta_notas.ordem), TAMANHO_PAGINA_CONSULTA)
+        self.executor.enviar(consultar_pagina_alunos, limit=quantidade, canal='consulta_notas',
+                             ao_concluir=partial(self.exibir_consulta_notas, quantidade, False),
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao carregar notas"))
+    
+    def carregar_mais_consulta_notas(self):
+        """Acrescenta a próxima página de alunos (paginação por nome/id)"""
+        self.btn_carregar_mais.state(['disabled'])
+        # Um novo pedido (ex.: "Atualizar") descarta a página ainda pendente
+        self.executor.enviar(consultar_pagina_alunos, after=self.consulta_after,
+                             limit=TAMANHO_PAGINA_CONSULTA, canal='consulta_notas',
+                             ao_concluir=partial(self.exibir_consulta_notas, TAMANHO_PAGINA_CONSULTA, True),
+                             ao_falhar=partial(self.mostrar_erro, "Erro ao carregar notas"))
+    
+    def exibir_consulta_notas(self, quantidade, acrescentar, pagina):
+        linhas = [(aluno['nome'], aluno['matricula'],
+                   *(aluno.get(coluna) for coluna in self.colunas_disciplinas))
+                  for aluno in pagina]
+        chaves = [str(aluno['id']) for aluno in pagina]
+        if acrescentar:
+            self.sinc_consulta_notas.acrescentar(linhas, chaves)
+        else:
+            self.sinc_consulta_notas.sincronizar(linhas, chaves)
+        
+        if pagina:
+            self.consulta_after = (pagina[-1]['nome'], pagina[-1]['id'])
+        elif not acrescentar:
+            self.consulta_after = None
+        
+        # Desabilita o botão quando não há mais páginas
+        self.btn_carregar_mais.state(['!disabled'] if len(pagina) == quantidade else ['disabled'])
+    
+    def mostrar_erro(self, titulo, erro):
+        messagebox.showerror("Erro", f"{titulo}: {erro}")
+    
+    def mostrar_carregando(self, ocupado):
+        """Indica na barra de status (e no cursor) que há consultas em andamento"""
+        self.barra_status.config(text="⏳ Carregando..." if ocupado else "")
+        self.root.config(cursor='watch' if ocupado else '')
     
     def limpar_tela(self):
         """Remove todos os widgets da tela principal"""
+        # Resultados de consultas da tela anterior são descartados
+        self.executor.cancelar_todos()
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if widget is not self.barra_status:
+                widget.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
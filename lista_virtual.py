@@ -0,0 +1,303 @@
+"""
+Atualização eficiente de ttk.Treeview
+SincronizadorTreeview aplica ao Treeview só a diferença para o novo resultado.
+ListaVirtual mantém no Treeview só as linhas visíveis; as demais ficam no banco e
+são buscadas por páginas (com um cache pequeno) conforme a barra de rolagem se move.
+"""
+
+import tkinter as tk
+from bisect import bisect_left
+from collections import OrderedDict
+from tkinter import ttk
+
+# Texto exibido nas linhas cuja página ainda está sendo lida
+CARREGANDO = '…'
+
+
+def _maior_subsequencia_crescente(valores):
+    """Índices de uma maior subsequência crescente de `valores` (O(n log n))"""
+    finais = []        # menor valor final de uma subsequência de cada tamanho
+    indices = []       # índice (em valores) desse final
+    anteriores = [-1] * len(valores)
+    for i, valor in enumerate(valores):
+        tamanho = bisect_left(finais, valor)
+        if tamanho == len(finais):
+            finais.append(valor)
+            indices.append(i)
+        else:
+            finais[tamanho] = valor
+            indices[tamanho] = i
+        anteriores[i] = indices[tamanho - 1] if tamanho else -1
+
+    resultado = set()
+    i = indices[-1] if indices else -1
+    while i != -1:
+        resultado.add(i)
+        i = anteriores[i]
+    return resultado
+
+
+class SincronizadorTreeview:
+    """
+    Mantém os itens de primeiro nível de um Treeview iguais a uma lista de linhas.
+
+    O iid de cada item é str(chave(linha)). A cada sincronizar() só são feitas
+    as operações Tk da diferença: remoção das chaves que sumiram, inserção das
+    novas, atualização dos valores alterados e movimento dos itens fora de ordem.
+    Os valores anteriores ficam guardados aqui, sem precisar consultar o Tk.
+    """
+
+    def __init__(self, tree, chave=lambda linha: linha[0]):
+        self.tree = tree
+        self.chave = chave
+        self.valores = {}
+        self.ordem = []
+
+    def limpar(self):
+        if self.ordem:
+            self.tree.delete(*self.ordem)
+        self.valores.clear()
+        self.ordem = []
+
+    def sincronizar(self, linhas, chaves=None):
+        """Deixa o Treeview igual a `linhas`; retorna o número de operações Tk"""
+        if chaves is None:
+            chaves = [str(self.chave(linha)) for linha in linhas]
+        novos = dict(zip(chaves, map(tuple, linhas)))
+        operacoes = 0
+
+        removidos = [iid for iid in self.ordem if iid not in novos]
+        if removidos:
+            self.tree.delete(*removidos)
+            operacoes += 1
+        posicao_atual = {iid: i for i, iid in enumerate(i for i in self.ordem if i in novos)}
+
+        # Itens que já existem e continuam na mesma ordem relativa não se movem
+        existentes = [i for i, iid in enumerate(chaves) if iid in posicao_atual]
+        fixos = {existentes[i] for i in _maior_subsequencia_crescente(
+            [posicao_atual[chaves[i]] for i in existentes])}
+
+        anterior = None
+        for i, iid in enumerate(chaves):
+            valores = novos[iid]
+            if iid not in posicao_atual:
+                indice = self.tree.index(anterior) + 1 if anterior is not None else 0
+                self.tree.insert('', indice, iid=iid, values=valores)
+                operacoes += 1
+            else:
+                if self.valores[iid] != valores:
+                    self.tree.item(iid, values=valores)
+                    operacoes += 1
+                if i not in fixos:
+                    # Desanexa antes de calcular a posição: o índice fica inequívoco
+                    self.tree.detach(iid)
+                    indice = self.tree.index(anterior) + 1 if anterior is not None else 0
+                    self.tree.move(iid, '', indice)
+                    operacoes += 1
+            anterior = iid
+
+        self.valores = novos
+        self.ordem = list(chaves)
+        return operacoes
+
+    def acrescentar(self, linhas, chaves=None):
+        """Insere linhas novas no fim (ex.: próxima página)"""
+        if chaves is None:
+            chaves = [str(self.chave(linha)) for linha in linhas]
+        for iid, linha in zip(chaves, linhas):
+            self.tree.insert('', tk.END, iid=iid, values=linha)
+            self.valores[iid] = tuple(linha)
+            self.ordem.append(iid)
+
+
+class ListaVirtual:
+    """
+    Treeview com rolagem virtual.
+
+    contar() -> total de linhas
+    buscar_pagina(numero, tamanho, anterior) -> linhas da página `numero`;
+        `anterior` é a última linha da página anterior quando ela está em cache
+        (permite paginação por chave em vez de OFFSET), senão None.
+    A primeira coluna de cada linha identifica o registro (mantém a seleção).
+    Com um `executor` (ExecutorBD), contagem e páginas são lidas fora da thread
+    da interface; enquanto chegam, as linhas aparecem como "carregando".
+    """
+
+    def __init__(self, master, colunas, contar, buscar_pagina,
+                 tamanho_pagina=100, paginas_em_cache=8, executor=None):
+        self.contar = contar
+        self.buscar_pagina = buscar_pagina
+        self.tamanho_pagina = tamanho_pagina
+        self.paginas_em_cache = paginas_em_cache
+        self.executor = executor
+        self.canal = ('lista_virtual', id(self))
+        self.canal_total = ('lista_virtual_total', id(self))
+        self.buscando = None
+        self.vazia = (CARREGANDO,) + ('',) * (len(colunas) - 1)
+
+        self.cache = OrderedDict()
+        self.total = 0
+        self.inicio = 0
+        self.linhas_visiveis = 1
+        self.selecionado = None
+
+        self.frame = ttk.Frame(master)
+        self.tree = ttk.Treeview(self.frame, columns=colunas, show='headings', selectmode='browse')
+        self.sincronizador = SincronizadorTreeview(self.tree)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._rolar_barra)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(expand=True, fill='both')
+
+        self.tree.bind('<Configure>', self._redimensionar)
+        self.tree.bind('<<TreeviewSelect>>', self._selecionar)
+        self.tree.bind('<MouseWheel>', lambda e: self.rolar(-3 if e.delta > 0 else 3))
+        self.tree.bind('<Button-4>', lambda e: self.rolar(-3))
+        self.tree.bind('<Button-5>', lambda e: self.rolar(3))
+        self.tree.bind('<Prior>', lambda e: self.rolar(-self.linhas_visiveis))
+        self.tree.bind('<Next>', lambda e: self.rolar(self.linhas_visiveis))
+        self.tree.bind('<Up>', lambda e: self._mover_selecao(-1))
+        self.tree.bind('<Down>', lambda e: self._mover_selecao(1))
+
+    def pack(self, **opcoes):
+        self.frame.pack(**opcoes)
+
+    def recarregar(self):
+        """Descarta o cache e relê o total (após inserções/remoções)"""
+        self.cache.clear()
+        if self.executor:
+            self.executor.cancelar(self.canal)
+            self.buscando = None
+            self.executor.enviar(self.contar, canal=self.canal_total, ao_concluir=self._definir_total)
+        else:
+            self._definir_total(self.contar())
+
+    def _definir_total(self, total):
+        self.total = total
+        self.inicio = max(0, min(self.inicio, self.total - self.linhas_visiveis))
+        self._desenhar()
+
+    def rolar(self, linhas):
+        self.ir_para(self.inicio + linhas)
+        return 'break'
+
+    def ir_para(self, inicio):
+        inicio = max(0, min(int(inicio), self.total - self.linhas_visiveis))
+        if inicio != self.inicio:
+            self.inicio = inicio
+            self._desenhar()
+
+    def _guardar(self, numero, pagina):
+        self.cache[numero] = pagina
+        # O cache sempre comporta a janela visível inteira
+        limite = max(self.paginas_em_cache, self.linhas_visiveis // self.tamanho_pagina + 2)
+        while len(self.cache) > limite:
+            self.cache.popitem(last=False)
+
+    def _pagina(self, numero):
+        """Página `numero` do cache (LRU), do banco, ou None se virá do executor"""
+        if numero in self.cache:
+            self.cache.move_to_end(numero)
+            return self.cache[numero]
+        if self.executor:
+            return None
+
+        anterior = self.cache.get(numero - 1)
+        pagina = self.buscar_pagina(numero, self.tamanho_pagina, anterior[-1] if anterior else None)
+        self._guardar(numero, pagina)
+        return pagina
+
+    def _janela(self):
+        """Linhas de [inicio, inicio + linhas_visiveis), lendo só as páginas necessárias"""
+        fim = min(self.inicio + self.linhas_visiveis, self.total)
+        linhas = []
+        faltando = []
+        for numero in range(self.inicio // self.tamanho_pagina,
+                            (fim - 1) // self.tamanho_pagina + 1 if fim else 0):
+            base = numero * self.tamanho_pagina
+            pagina = self._pagina(numero)
+            if pagina is None:
+                faltando.append(numero)
+                pagina = [self.vazia] * min(self.tamanho_pagina, self.total - base)
+            linhas.extend(pagina[max(self.inicio - base, 0):fim - base])
+        if faltando:
+            self._buscar(tuple(faltando))
+        return linhas
+
+    def _buscar(self, numeros):
+        """Pede ao executor as páginas (consecutivas) que faltam na janela"""
+        if numeros == self.buscando:
+            return
+        self.buscando = numeros
+        anterior = self.cache.get(numeros[0] - 1)
+
+        def buscar():
+            paginas = {}
+            ultima = anterior[-1] if anterior else None
+            for numero in numeros:
+                paginas[numero] = pagina = self.buscar_pagina(numero, self.tamanho_pagina, ultima)
+                ultima = pagina[-1] if pagina else None
+            return paginas
+
+        # Um novo pedido no mesmo canal descarta o anterior (rolagem rápida)
+        self.executor.enviar(buscar, canal=self.canal, ao_concluir=self._receber)
+
+    def _receber(self, paginas):
+        self.buscando = None
+        for numero, pagina in paginas.items():
+            self._guardar(numero, pagina)
+        self._desenhar()
+
+    def _desenhar(self):
+        linhas = self._janela()
+
+        # Itens identificados pelo registro: rolar uma linha remove uma e insere outra
+        chaves = [f"{CARREGANDO}{self.inicio + posicao}" if linha is self.vazia else str(linha[0])
+                  for posicao, linha in enumerate(linhas)]
+        self.sincronizador.sincronizar(linhas, chaves)
+
+        # Mantém selecionado o mesmo registro enquanto ele estiver visível
+        selecionado = str(self.selecionado)
+        self.tree.selection_set([selecionado] if selecionado in self.sincronizador.valores else [])
+
+        if self.total:
+            self.scrollbar.set(self.inicio / self.total,
+                               (self.inicio + len(linhas)) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _rolar_barra(self, acao, quantidade, unidade=None):
+        if acao == 'moveto':
+            self.ir_para(float(quantidade) * self.total)
+        elif acao == 'scroll':
+            passo = self.linhas_visiveis if unidade == 'pages' else 1
+            self.rolar(int(quantidade) * passo)
+
+    def _redimensionar(self, evento):
+        altura_linha = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        # Desconta o cabeçalho (aproximadamente uma linha)
+        linhas = max(1, evento.height // int(altura_linha) - 1)
+        if linhas != self.linhas_visiveis:
+            self.linhas_visiveis = linhas
+            self.inicio = max(0, min(self.inicio, self.total - linhas))
+            self._desenhar()
+
+    def _selecionar(self, evento):
+        selecao = self.tree.selection()
+        if selecao and self.tree.item(selecao[0])['values'][0] != CARREGANDO:
+            self.selecionado = self.tree.item(selecao[0])['values'][0]
+
+    def _mover_selecao(self, passo):
+        selecao = self.tree.selection()
+        posicao = self.tree.index(selecao[0]) + passo if selecao else 0
+        if posicao < 0:
+            self.rolar(-1)
+            posicao = 0
+        elif posicao >= self.linhas_visiveis:
+            self.rolar(1)
+            posicao = self.linhas_visiveis - 1
+        itens = self.tree.get_children()
+        if itens:
+            iid = itens[min(posicao, len(itens) - 1)]
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+        return 'break'
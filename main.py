@@ -1,32 +1,18 @@
-import sqlite3
-from backend import consultar_alunos, atribuir_nota
+from arquivo import buscar_arquivados, notas_arquivadas, resumo_arquivos
+from conexao import conectar, definir_escola, escola_atual, escolas_cadastradas
+from backend import consultar_pagina_alunos, atribuir_nota, excluir_aluno, DISCIPLINAS
 from cadastro import cadastrar_aluno
+from estatisticas import ler_estatisticas, ler_estatisticas_rede
+from exportar import exportar, imprimir_resultado
 from login import login_funcionario
+import metricas
+import replica
+from rastreamento import relatorio
+from repositorio import listar_alunos, listar_alunos_rede, notas_do_aluno, metricas_cache
 
 def conectar_db():
     """Conecta ao banco de dados SQLite"""
-    try:
-        return sqlite3.connect('sistema_nota.db')
-    except Exception as e:
-        print(f"Erro ao conectar ao banco: {e}")
-        return None
-
-def listar_alunos():
-    """Lista todos os alunos cadastrados"""
-    conn = conectar_db()
-    if not conn:
-        return []
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, nome, matricula, cpf FROM alunos ORDER BY nome')
-        alunos = cursor.fetchall()
-        return alunos
-    except Exception as e:
-        print(f"Erro ao listar alunos: {e}")
-        return []
-    finally:
-        conn.close()
+    return conectar()
 
 def mostrar_alunos():
     """Mostra a lista de alunos de forma organizada"""
@@ -103,14 +89,8 @@ def remover_aluno():
     print(f"CPF: {aluno_encontrado[3]}")
     
     # Verifica se o aluno tem notas
-    conn = conectar_db()
-    if not conn:
-        return
-    
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM notas WHERE aluno_id = ?", (aluno_id,))
-        total_notas = cursor.fetchone()[0]
+        total_notas = len(notas_do_aluno(aluno_id))
         
         if total_notas > 0:
             print(f"⚠️ ATENÇÃO: Este aluno possui {total_notas} nota(s) cadastrada(s).")
@@ -119,15 +99,8 @@ def remover_aluno():
         # Confirma remoção
         confirmacao = input(f"\n❌ Confirma a remoção do aluno {aluno_encontrado[1]}? (s/n): ").lower()
         if confirmacao in ['s', 'sim', 'y', 'yes']:
-            # Remove notas primeiro (devido à foreign key)
-            cursor.execute("DELETE FROM notas WHERE aluno_id = ?", (aluno_id,))
-            notas_removidas = cursor.rowcount
-            
-            # Remove o aluno
-            cursor.execute("DELETE FROM alunos WHERE id = ?", (aluno_id,))
-            aluno_removido = cursor.rowcount
-            
-            conn.commit()
+            # Remove as notas e o aluno em uma só transação
+            aluno_removido, notas_removidas = excluir_aluno(aluno_id)
             
             if aluno_removido > 0:
                 print(f"✅ Aluno removido com sucesso!")
@@ -140,9 +113,6 @@ def remover_aluno():
             
     except Exception as e:
         print(f"❌ Erro ao remover aluno: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
 
 def adicionar_nota():
     """Interface para adicionar nota"""
@@ -169,10 +139,7 @@ def adicionar_nota():
         return
     
     # Lista disciplinas
-    disciplinas = [
-        "Matemática", "Português", "História", "Geografia",
-        "Ciências", "Inglês", "Artes", "Educação Física"
-    ]
+    disciplinas = DISCIPLINAS
     
     print("\n📚 DISCIPLINAS DISPONÍVEIS:")
     for i, disciplina in enumerate(disciplinas, 1):
@@ -224,7 +191,9 @@ def consultar_notas():
     nome_busca = input("Digite o nome do aluno (ou deixe vazio para todos): ").strip()
     
     try:
-        resultados = consultar_alunos(nome_busca)
+        # Busca uma página por vez (paginação por nome/id)
+        tamanho_pagina = 20
+        resultados = consultar_pagina_alunos(nome_busca, limit=tamanho_pagina)
         
         if not resultados:
             print("❌ Nenhum aluno encontrado.")
@@ -235,18 +204,84 @@ def consultar_notas():
         print(f"{'Matrícula':<12} {'Nome':<20} {'Mat.':<6} {'Port.':<6} {'Hist.':<6} {'Geo.':<6} {'Ciên.':<6} {'Ing.':<6} {'Artes':<6} {'Ed.Fís.':<6}")
         print("-"*80)
         
-        for aluno in resultados:
-            print(f"{aluno['matricula']:<12} {aluno['nome']:<20} "
-                  f"{aluno['matematica'] or '-':<6} {aluno['portugues'] or '-':<6} "
-                  f"{aluno['historia'] or '-':<6} {aluno['geografia'] or '-':<6} "
-                  f"{aluno['ciencias'] or '-':<6} {aluno['ingles'] or '-':<6} "
-                  f"{aluno['artes'] or '-':<6} {aluno['educacao_fisica'] or '-':<6}")
+        while resultados:
+            for aluno in resultados:
+                print(f"{aluno['matricula']:<12} {aluno['nome']:<20} "
+                      f"{aluno['matematica'] or '-':<6} {aluno['portugues'] or '-':<6} "
+                      f"{aluno['historia'] or '-':<6} {aluno['geografia'] or '-':<6} "
+                      f"{aluno['ciencias'] or '-':<6} {aluno['ingles'] or '-':<6} "
+                      f"{aluno['artes'] or '-':<6} {aluno['educacao_fisica'] or '-':<6}")
+            
+            if len(resultados) < tamanho_pagina:
+                break
+            if input("\n[ENTER] próxima página | [s] sair: ").strip().lower() == 's':
+                break
+            ultimo = resultados[-1]
+            resultados = consultar_pagina_alunos(nome_busca, after=(ultimo['nome'], ultimo['id']),
+                                                 limit=tamanho_pagina)
         
         print("="*80)
         
     except Exception as e:
         print(f"❌ Erro ao consultar notas: {e}")
 
+def consultar_historico():
+    """Consulta alunos e notas dos anos letivos arquivados"""
+    print("\n📦 HISTÓRICO (ANOS ARQUIVADOS)")
+    print("="*40)
+    
+    try:
+        resumo = resumo_arquivos()
+        if not resumo:
+            print("❌ Nenhum ano letivo arquivado.")
+            return
+        for ano, alunos, notas, _ in resumo:
+            print(f"{ano}: {alunos} aluno(s), {notas} nota(s)")
+        
+        termo = input("\nDigite a matrícula, o CPF ou o nome do aluno: ").strip()
+        if not termo:
+            return
+        
+        encontrados = buscar_arquivados(termo)
+        if not encontrados:
+            print("❌ Nenhum aluno arquivado encontrado.")
+            return
+        
+        for ano, aluno_id, nome, matricula, cpf in encontrados:
+            print(f"\n{ano} | {nome} | Matrícula: {matricula} | CPF: {cpf}")
+            notas = notas_arquivadas(ano, aluno_id)
+            if not notas:
+                print("   Sem notas.")
+            for disciplina, nota in notas:
+                print(f"   {disciplina:<20} {nota:.1f}")
+        
+    except Exception as e:
+        print(f"❌ Erro ao consultar o histórico: {e}")
+
+def exportar_notas():
+    """Exporta notas ou boletins para CSV/JSONL (para o ministério)"""
+    print("\n📤 EXPORTAR NOTAS")
+    print("="*40)
+    print("1. Notas (uma linha por nota)")
+    print("2. Boletins (uma linha por aluno)")
+    tipo = 'boletim' if input("Escolha uma opção: ").strip() == "2" else 'notas'
+    
+    saida = input("Arquivo de saída (.csv, .jsonl, com .gz opcional) [notas.csv]: ").strip() or 'notas.csv'
+    disciplinas = [d.strip() for d in input("Disciplinas separadas por vírgula (ENTER = todas): ").split(',')
+                   if d.strip()]
+    de = input("Matrícula inicial (ENTER = primeira): ").strip() or None
+    ate = input("Matrícula final (ENTER = última): ").strip() or None
+    
+    def progresso(linhas, segundos):
+        print(f"\r📤 {linhas} linha(s) ({linhas / segundos:,.0f} linhas/s)", end='', flush=True)
+    
+    try:
+        resultado = exportar(saida, tipo, disciplinas, (de, ate), ao_progredir=progresso)
+        print()
+        imprimir_resultado(saida, resultado)
+    except Exception as e:
+        print(f"\n❌ Erro na exportação: {e}")
+
 def ver_notas_detalhadas():
     """Mostra notas detalhadas de um aluno específico"""
     print("\n📋 NOTAS DETALHADAS")
@@ -308,60 +343,96 @@ def estatisticas():
     print("\n📈 ESTATÍSTICAS DO SISTEMA")
     print("="*40)
     
-    conn = conectar_db()
+    conn = replica.conectar_relatorio('estatisticas')
     if not conn:
         return
     
     try:
-        cursor = conn.cursor()
+        if replica.relatorio_na_replica('estatisticas'):
+            print(f"📸 Dados da réplica de relatórios (atualizada há {replica.idade_replica():.0f}s)")
         
-        # Total de alunos
-        cursor.execute("SELECT COUNT(*) FROM alunos")
-        total_alunos = cursor.fetchone()[0]
+        # Agregados mantidos pelos gatilhos: leitura de poucas linhas
+        dados = ler_estatisticas(conn)
+        geral = dados['geral']
         
-        # Total de notas
-        cursor.execute("SELECT COUNT(*) FROM notas")
-        total_notas = cursor.fetchone()[0]
+        print(f"👥 Total de alunos: {dados['total_alunos']}")
+        print(f"📝 Total de notas: {dados['total_notas']}")
+        if geral:
+            print(f"📊 Média geral: {geral['media']:.2f}")
+            print(f"📐 Desvio padrão: {geral['desvio_padrao']:.2f}")
+            print(f"🏆 Melhor nota: {geral['maximo']}")
+            print(f"📉 Pior nota: {geral['minimo']}")
         
-        # Média geral
-        cursor.execute("SELECT AVG(nota) FROM notas")
-        media_geral = cursor.fetchone()[0]
-        
-        # Melhor nota
-        cursor.execute("SELECT MAX(nota) FROM notas")
-        melhor_nota = cursor.fetchone()[0]
-        
-        # Pior nota
-        cursor.execute("SELECT MIN(nota) FROM notas")
-        pior_nota = cursor.fetchone()[0]
-        
-        # Notas por disciplina
-        cursor.execute("""
-            SELECT disciplina, COUNT(*), AVG(nota)
-            FROM notas
-            GROUP BY disciplina
-            ORDER BY disciplina
-        """)
-        notas_por_disciplina = cursor.fetchall()
-        
-        print(f"👥 Total de alunos: {total_alunos}")
-        print(f"📝 Total de notas: {total_notas}")
-        if media_geral:
-            print(f"📊 Média geral: {media_geral:.2f}")
-            print(f"🏆 Melhor nota: {melhor_nota}")
-            print(f"📉 Pior nota: {pior_nota}")
-        
-        if notas_por_disciplina:
+        if dados['disciplinas']:
             print(f"\n📚 NOTAS POR DISCIPLINA:")
             print("-"*40)
-            for disciplina, quantidade, media in notas_por_disciplina:
-                print(f"{disciplina}: {quantidade} notas, média {media:.2f}")
+            for d in dados['disciplinas']:
+                print(f"{d['disciplina']}: {d['quantidade']} notas, média {d['media']:.2f}, "
+                      f"desvio {d['desvio_padrao']:.2f}")
+        
+        cache = metricas_cache()
+        print(f"\n🗃️ Cache de leituras: {cache['acertos']} acertos, {cache['falhas']} falhas "
+              f"(taxa de acerto {cache['taxa_acerto']:.0%}), {cache['invalidacoes']} invalidações")
+        
+        consultas = relatorio(5)
+        if consultas:
+            print("\n🐢 Consultas com mais tempo total nesta sessão:")
+            for c in consultas:
+                print(f"{c['total_s'] * 1000:8.1f} ms em {c['execucoes']} execuções - {c['origem']}")
         
     except Exception as e:
         print(f"❌ Erro ao gerar estatísticas: {e}")
     finally:
         conn.close()
 
+def rede_escolas():
+    """Estatísticas e alunos de todas as escolas da rede (consulta em cada banco e junta)"""
+    print("\n🏫 REDE DE ESCOLAS")
+    print("="*40)
+    
+    try:
+        por_escola, rede = ler_estatisticas_rede()
+        if not por_escola:
+            print("❌ Nenhuma escola cadastrada.")
+            return
+        
+        for escola_id, dados in por_escola.items():
+            media = f"média {dados['geral']['media']:.2f}" if dados['geral'] else "sem notas"
+            print(f"{escola_id}: {dados['total_alunos']} aluno(s), {dados['total_notas']} nota(s), {media}")
+        print("-"*40)
+        print(f"👥 Total de alunos: {rede['total_alunos']}")
+        print(f"📝 Total de notas: {rede['total_notas']}")
+        if rede['geral']:
+            print(f"📊 Média geral: {rede['geral']['media']:.2f}")
+            print(f"📐 Desvio padrão: {rede['geral']['desvio_padrao']:.2f}")
+        for d in rede['disciplinas']:
+            print(f"{d['disciplina']}: {d['quantidade']} notas, média {d['media']:.2f}, "
+                  f"desvio {d['desvio_padrao']:.2f}")
+        
+        if input("\nListar os alunos de todas as escolas? (s/N): ").strip().lower() != 's':
+            return
+        print(f"\n{'Escola':<10} {'Nome':<20} {'Matrícula':<12} {'CPF':<15}")
+        print("-"*60)
+        for escola_id, _, nome, matricula, cpf in listar_alunos_rede():
+            print(f"{escola_id:<10} {nome:<20} {matricula:<12} {cpf:<15}")
+        
+    except Exception as e:
+        print(f"❌ Erro ao consultar a rede de escolas: {e}")
+
+def escolher_escola():
+    """Escolhe a escola da sessão quando há rede de escolas (SISTEMA_NOTAS_ESCOLA já define)"""
+    escolas = escolas_cadastradas()
+    if escola_atual() is not None or not escolas:
+        return True
+    
+    print(f"🏫 Escolas: {', '.join(escolas)}")
+    escola_id = input("Escola: ").strip()
+    if escola_id not in escolas:
+        print("❌ Escola não encontrada.")
+        return False
+    definir_escola(escola_id)
+    return True
+
 def menu_principal(funcionario_id):
     """Menu principal do sistema"""
     while True:
@@ -375,6 +446,11 @@ def menu_principal(funcionario_id):
         print("5. 📋 Ver notas detalhadas")
         print("6. 📈 Estatísticas")
         print("7. 🗑️ Remover aluno")
+        print("8. 🩺 Diagnóstico")
+        print("9. 📦 Histórico (anos arquivados)")
+        print("10. 📤 Exportar notas (CSV/JSONL)")
+        if escolas_cadastradas():
+            print("11. 🏫 Rede de escolas (todas)")
         print("0. 🚪 Sair")
         print("="*50)
         
@@ -394,6 +470,14 @@ def menu_principal(funcionario_id):
             estatisticas()
         elif opcao == "7":
             remover_aluno()
+        elif opcao == "8":
+            metricas.imprimir_diagnostico()
+        elif opcao == "9":
+            consultar_historico()
+        elif opcao == "10":
+            exportar_notas()
+        elif opcao == "11" and escolas_cadastradas():
+            rede_escolas()
         elif opcao == "0":
             print("👋 Obrigado por usar o sistema!")
             break
@@ -405,6 +489,14 @@ def main():
     print("🎓 SISTEMA DE GESTÃO DE NOTAS ESCOLARES")
     print("="*50)
     
+    # Com rede de escolas, todos os bancos da sessão são os da escola escolhida
+    if not escolher_escola():
+        return
+    
+    # Arquivo .prom para o Prometheus, se SISTEMA_NOTAS_METRICAS_ARQUIVO estiver definido
+    metricas.iniciar_exportacao()
+    replica.iniciar_atualizacao()
+    
     # Login do funcionário
     funcionario_id = login_funcionario()
     
@@ -0,0 +1,383 @@
+"""
+Métricas operacionais do sistema (contadores, medidores e histogramas)
+Os pontos de entrada (login, gravação de notas, cadastro e remoção de alunos,
+rotas HTTP) atualizam as métricas do registro global; pool de conexões,
+escritor e cache entram por coletores lidos no momento da exportação.
+Saída no formato texto do Prometheus (rota /metrics do servidor.py ou arquivo
+para o textfile collector) e no menu de diagnóstico do main.py.
+"""
+
+import atexit
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Limites superiores (segundos) dos baldes dos histogramas de latência
+BALDES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Janela da taxa "por minuto" dos contadores e eventos guardados para calculá-la
+JANELA_TAXA = 60
+EVENTOS_TAXA = 10_000
+
+# Arquivo .prom gravado periodicamente quando definido (ex.: textfile collector)
+ARQUIVO_METRICAS = os.environ.get('SISTEMA_NOTAS_METRICAS_ARQUIVO')
+INTERVALO_EXPORTACAO = 15
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _formatar_rotulos(rotulos):
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos.items()) + '}'
+
+
+def _formatar_valor(valor):
+    if valor == math.inf:
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    """Base: valores por combinação de rótulos"""
+
+    tipo = 'untyped'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+        self._valores = {}
+
+    def _chave(self, rotulos):
+        if len(rotulos) != len(self.rotulos) or any(nome not in rotulos for nome in self.rotulos):
+            raise ValueError(f"{self.nome} espera os rótulos {self.rotulos}, recebeu {tuple(rotulos)}")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def _itens(self):
+        with self._trava:
+            return [(dict(zip(self.rotulos, chave)), valor) for chave, valor in self._valores.items()]
+
+    def amostras(self):
+        """(sufixo, rótulos, valor) no formato do Prometheus"""
+        return [('', rotulos, valor) for rotulos, valor in self._itens()]
+
+
+class Contador(Metrica):
+    """Valor que só cresce (eventos); guarda os eventos recentes para a taxa por minuto"""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._eventos = deque(maxlen=EVENTOS_TAXA)
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+            self._eventos.append((time.monotonic(), chave, valor))
+
+    def valor(self, **rotulos):
+        """Total (somando as combinações de rótulos não informados)"""
+        with self._trava:
+            return sum(valor for chave, valor in self._valores.items()
+                       if all(chave[self.rotulos.index(nome)] == str(filtro)
+                              for nome, filtro in rotulos.items()))
+
+    def por_minuto(self):
+        """Eventos nos últimos JANELA_TAXA segundos, convertidos para por minuto"""
+        limite = time.monotonic() - JANELA_TAXA
+        with self._trava:
+            recentes = sum(valor for instante, _, valor in self._eventos if instante >= limite)
+        return recentes * 60 / JANELA_TAXA
+
+
+class Medidor(Metrica):
+    """Valor que sobe e desce (ex.: operações em andamento)"""
+
+    tipo = 'gauge'
+
+    def definir(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = valor
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def decrementar(self, valor=1, **rotulos):
+        self.incrementar(-valor, **rotulos)
+
+
+class Histograma(Metrica):
+    """Distribuição em baldes fixos (contagem por balde, soma e total)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), baldes=BALDES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.baldes = tuple(sorted(baldes))
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        indice = bisect_left(self.baldes, valor)
+        with self._trava:
+            dados = self._valores.get(chave)
+            if dados is None:
+                dados = self._valores[chave] = [[0] * (len(self.baldes) + 1), 0.0, 0]
+            dados[0][indice] += 1
+            dados[1] += valor
+            dados[2] += 1
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        """Observa a duração do bloco em segundos (também quando ele levanta exceção)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def resumo(self):
+        """(rótulos, total, média, p50, p95) por combinação; percentis pelo limite do balde"""
+        resumos = []
+        for rotulos, (contagens, soma, total) in self._itens():
+            if not total:
+                continue
+            percentis = []
+            for fracao in (0.5, 0.95):
+                acumulado = 0
+                for limite, contagem in zip(self.baldes + (math.inf,), contagens):
+                    acumulado += contagem
+                    if acumulado >= fracao * total:
+                        percentis.append(limite)
+                        break
+            resumos.append((rotulos, total, soma / total, *percentis))
+        return resumos
+
+    def amostras(self):
+        amostras = []
+        for rotulos, (contagens, soma, total) in self._itens():
+            acumulado = 0
+            for limite, contagem in zip(self.baldes + (math.inf,), contagens):
+                acumulado += contagem
+                amostras.append(('_bucket', {**rotulos, 'le': _formatar_valor(float(limite))},
+                                 acumulado))
+            amostras.append(('_sum', rotulos, soma))
+            amostras.append(('_count', rotulos, total))
+        return amostras
+
+
+class RegistroMetricas:
+    """Métricas nomeadas e coletores chamados a cada exportação"""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._metricas = {}
+        self._coletores = []
+
+    def _obter(self, classe, nome, ajuda, rotulos, **opcoes):
+        with self._trava:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, ajuda, rotulos, **opcoes)
+            elif type(metrica) is not classe:
+                raise ValueError(f"Métrica {nome} já registrada como {metrica.tipo}")
+            return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._obter(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome, ajuda, rotulos=()):
+        return self._obter(Medidor, nome, ajuda, rotulos)
+
+    def histograma(self, nome, ajuda, rotulos=(), baldes=BALDES_LATENCIA):
+        return self._obter(Histograma, nome, ajuda, rotulos, baldes=baldes)
+
+    def registrar_coletor(self, coletor):
+        """
+        coletor() gera (nome, tipo, ajuda, rótulos, valor) com valores lidos na
+        hora (ex.: conexões abertas no pool). Retorna o coletor (uso como decorador).
+        """
+        with self._trava:
+            if coletor not in self._coletores:
+                self._coletores.append(coletor)
+        return coletor
+
+    def metricas(self):
+        with self._trava:
+            return list(self._metricas.values())
+
+    def coletadas(self):
+        """Amostras dos coletores; um coletor com erro não impede os demais"""
+        with self._trava:
+            coletores = list(self._coletores)
+        amostras = []
+        for coletor in coletores:
+            try:
+                amostras.extend(coletor())
+            except Exception as e:
+                amostras.append(('sistema_notas_coletor_erros', 'gauge',
+                                 'Coletores que falharam na última exportação',
+                                 {'coletor': getattr(coletor, '__qualname__', '?'),
+                                  'erro': type(e).__name__}, 1))
+        return amostras
+
+    def texto_prometheus(self):
+        """Exposição no formato texto 0.0.4 do Prometheus"""
+        linhas = []
+        for metrica in self.metricas():
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            for sufixo, rotulos, valor in metrica.amostras():
+                linhas.append(f"{metrica.nome}{sufixo}{_formatar_rotulos(rotulos)} "
+                              f"{_formatar_valor(valor)}")
+
+        # As amostras de um mesmo nome precisam sair juntas, após HELP e TYPE
+        familias = {}
+        for nome, tipo, ajuda, rotulos, valor in self.coletadas():
+            familias.setdefault(nome, (tipo, ajuda, []))[2].append((rotulos, valor))
+        for nome, (tipo, ajuda, amostras) in familias.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in amostras:
+                linhas.append(f"{nome}{_formatar_rotulos(rotulos)} {_formatar_valor(valor)}")
+        return '\n'.join(linhas) + '\n'
+
+    def gravar_arquivo(self, caminho):
+        """Grava a exposição em um arquivo .prom (troca atômica: o leitor nunca vê metade)"""
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.texto_prometheus())
+        os.replace(temporario, caminho)
+
+
+REGISTRO = RegistroMetricas()
+
+# Métricas dos pontos de entrada
+LOGINS = REGISTRO.contador(
+    'sistema_notas_logins_total', 'Tentativas de login por origem e resultado',
+    ('origem', 'resultado'))
+DURACAO_LOGIN = REGISTRO.histograma(
+    'sistema_notas_login_segundos', 'Duração da verificação de login', ('origem',))
+NOTAS_GRAVADAS = REGISTRO.contador(
+    'sistema_notas_notas_gravadas_total', 'Notas gravadas (inclusões e alterações)', ('modo',))
+DURACAO_GRAVACAO_NOTA = REGISTRO.histograma(
+    'sistema_notas_gravacao_nota_segundos', 'Duração da gravação de uma nota (até o commit)')
+ALUNOS_CADASTRADOS = REGISTRO.contador(
+    'sistema_notas_alunos_cadastrados_total', 'Alunos matriculados', ('modo',))
+DURACAO_CADASTRO = REGISTRO.histograma(
+    'sistema_notas_cadastro_aluno_segundos', 'Duração do cadastro de um aluno (até o commit)')
+ALUNOS_REMOVIDOS = REGISTRO.contador(
+    'sistema_notas_alunos_removidos_total', 'Alunos removidos')
+ALUNOS_ARQUIVADOS = REGISTRO.contador(
+    'sistema_notas_alunos_arquivados_total', 'Alunos movidos para o arquivo do ano letivo')
+DURACAO_REMOCAO = REGISTRO.histograma(
+    'sistema_notas_remocao_aluno_segundos', 'Duração da remoção de um aluno com as notas')
+FALHAS = REGISTRO.contador(
+    'sistema_notas_falhas_total', 'Operações que terminaram em erro', ('operacao',))
+REQUISICOES_HTTP = REGISTRO.contador(
+    'sistema_notas_http_requisicoes_total', 'Requisições ao servidor de consultas',
+    ('rota', 'status'))
+REQUISICOES_EM_ANDAMENTO = REGISTRO.medidor(
+    'sistema_notas_http_em_andamento', 'Requisições sendo atendidas agora')
+DURACAO_HTTP = REGISTRO.histograma(
+    'sistema_notas_http_segundos', 'Duração das requisições (até o fim da resposta)', ('rota',))
+
+_INICIO = time.time()
+
+
+@REGISTRO.registrar_coletor
+def _metricas_processo():
+    yield ('sistema_notas_inicio_segundos', 'gauge', 'Início do processo (epoch)', {}, _INICIO)
+
+
+def texto_prometheus():
+    return REGISTRO.texto_prometheus()
+
+
+def amostras_de(dados, descricoes, rotulos):
+    """Amostras de coletor tiradas de um dicionário de estatísticas (nome, tipo, ajuda, chave)"""
+    for nome, tipo, ajuda, chave in descricoes:
+        if chave in dados:
+            yield nome, tipo, ajuda, rotulos, dados[chave]
+
+
+_exportacao = None
+
+
+def iniciar_exportacao(caminho=None, intervalo=INTERVALO_EXPORTACAO):
+    """
+    Grava o arquivo .prom a cada `intervalo` segundos e ao sair. Sem caminho usa
+    SISTEMA_NOTAS_METRICAS_ARQUIVO; sem nenhum dos dois não faz nada.
+    """
+    global _exportacao
+    caminho = caminho or ARQUIVO_METRICAS
+    if not caminho or _exportacao is not None:
+        return False
+
+    def gravar():
+        try:
+            REGISTRO.gravar_arquivo(caminho)
+        except OSError as e:
+            print(f"Erro ao gravar métricas em {caminho}: {e}")
+
+    def exportar():
+        while True:
+            gravar()
+            time.sleep(intervalo)
+
+    _exportacao = threading.Thread(target=exportar, name="exportacao-metricas", daemon=True)
+    _exportacao.start()
+    atexit.register(gravar)
+    return True
+
+
+def _segundos(valor):
+    return '> ' + _segundos(BALDES_LATENCIA[-1]) if valor == math.inf else f"{valor * 1000:.1f} ms"
+
+
+def imprimir_diagnostico():
+    """Resumo legível das métricas (menu de diagnóstico do terminal)"""
+    print("\n🩺 DIAGNÓSTICO")
+    print("=" * 60)
+    metricas = REGISTRO.metricas()
+
+    print("Contadores (total | último minuto):")
+    for metrica in metricas:
+        if isinstance(metrica, Contador):
+            print(f"  {metrica.nome:<45} {metrica.valor():>8} | {metrica.por_minuto():>6.0f}/min")
+            if metrica.rotulos:
+                for rotulos, valor in sorted(metrica._itens(), key=lambda item: str(item[0])):
+                    descricao = ', '.join(f"{nome}={valor_rotulo}"
+                                          for nome, valor_rotulo in rotulos.items())
+                    print(f"      {descricao:<41} {valor:>8}")
+
+    print("\nLatências (execuções | média | p50 | p95):")
+    for metrica in metricas:
+        if isinstance(metrica, Histograma):
+            for rotulos, total, media, p50, p95 in metrica.resumo():
+                descricao = metrica.nome + (_formatar_rotulos(rotulos) if rotulos else '')
+                print(f"  {descricao:<55} {total:>6} | {_segundos(media):>9} | "
+                      f"{_segundos(p50):>9} | {_segundos(p95):>9}")
+
+    print("\nMedidores, conexões, escritor e cache:")
+    medidores = [(metrica.nome, rotulos, valor) for metrica in metricas
+                 if isinstance(metrica, Medidor) for rotulos, valor in metrica._itens()]
+    coletadas = [(nome, rotulos, valor) for nome, _, _, rotulos, valor in REGISTRO.coletadas()]
+    for nome, rotulos, valor in medidores + coletadas:
+        descricao = nome + (_formatar_rotulos(rotulos) if rotulos else '')
+        valor = valor if float(valor).is_integer() else f"{valor:.3f}"
+        print(f"  {descricao:<70} {valor:>12}")
@@ -0,0 +1,171 @@
+"""
+Migrações de esquema do banco SQLite
+A versão aplicada fica gravada em PRAGMA user_version
+"""
+
+import re
+
+from boletim import reconstruir_boletim
+from busca import reconstruir_busca
+from estatisticas import reconstruir_estatisticas
+
+
+def tabela_existe(conexao, nome):
+    """Verifica se a tabela existe no banco"""
+    cursor = conexao.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (nome,))
+    return cursor.fetchone() is not None
+
+
+def _indice_unico_notas(conexao):
+    """Remove notas duplicadas e cria o índice único (aluno_id, disciplina)"""
+    # Mantém apenas a nota mais recente (maior id) de cada aluno/disciplina
+    conexao.execute("""
+        DELETE FROM notas
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM notas GROUP BY aluno_id, disciplina
+        )
+    """)
+    conexao.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_notas_aluno_disciplina
+        ON notas (aluno_id, disciplina)
+    """)
+
+
+def _indice_nome_alunos(conexao):
+    """Índice para ordenação/paginação por (nome, id) (o id vem implícito no índice)"""
+    conexao.execute("CREATE INDEX IF NOT EXISTS idx_alunos_nome ON alunos (nome)")
+
+
+def _indice_disciplina_notas(conexao):
+    """Índice (disciplina, nota): lista disciplinas e acha mínimo/máximo sem varrer notas"""
+    conexao.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notas_disciplina_nota
+        ON notas (disciplina, nota)
+    """)
+
+
+def _boletim_materializado(conexao):
+    """Cria a tabela boletim com seus gatilhos e a preenche com as notas atuais"""
+    reconstruir_boletim(conexao)
+
+
+def _estatisticas_incrementais(conexao):
+    """Cria os agregados de notas/alunos mantidos por gatilhos"""
+    reconstruir_estatisticas(conexao)
+
+
+def _indice_busca_alunos(conexao):
+    """Cria o índice FTS5 trigram de nome/matrícula (sem FTS5, a busca segue com LIKE)"""
+    reconstruir_busca(conexao)
+
+
+REFERENCIA_ALUNOS = re.compile(r"REFERENCES\s+\"?alunos\"?\s*\(\s*\"?id\"?\s*\)(?!\s*ON\s+DELETE)",
+                               re.IGNORECASE)
+
+
+def _notas_em_cascata(conexao):
+    """
+    Recria notas com a chave estrangeira aluno_id em ON DELETE CASCADE
+    (o SQLite não altera restrições; a tabela é copiada com as mesmas colunas).
+    Roda com foreign_keys desligado: as conexões só ligam depois das migrações.
+    """
+    sql_tabela = conexao.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'notas'").fetchone()[0]
+    if not REFERENCIA_ALUNOS.search(sql_tabela):
+        return  # já em cascata (ex.: banco do sistema_escolar_completo) ou sem a referência
+
+    # Notas de alunos que não existem mais violariam a restrição; os gatilhos
+    # de boletim e estatísticas ainda estão ativos e acompanham a remoção
+    conexao.execute("DELETE FROM notas WHERE aluno_id NOT IN (SELECT id FROM alunos)")
+
+    # Índices e gatilhos somem com a tabela: guardados para recriar
+    dependentes = [sql for (sql,) in conexao.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'notas' AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL ORDER BY type, name")]
+    sequencia = conexao.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'notas'").fetchone()
+
+    temporaria = 'notas_nova'
+    nova = REFERENCIA_ALUNOS.sub(lambda m: m.group(0) + " ON DELETE CASCADE", sql_tabela)
+    nova = re.sub(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\"?notas\"?",
+                  f"CREATE TABLE {temporaria}", nova, flags=re.IGNORECASE)
+    conexao.execute(nova)
+    conexao.execute(f"INSERT INTO {temporaria} SELECT * FROM notas")
+    conexao.execute("DROP TABLE notas")
+    # Sem o modo legado, o RENAME revalida gatilhos de outras tabelas que citam notas
+    conexao.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        conexao.execute(f"ALTER TABLE {temporaria} RENAME TO notas")
+    finally:
+        conexao.execute("PRAGMA legacy_alter_table = OFF")
+    for sql in dependentes:
+        conexao.execute(sql)
+    if sequencia:
+        # Mantém o AUTOINCREMENT sem reaproveitar ids de notas já removidas
+        conexao.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'notas'",
+                        sequencia)
+
+
+def _gravacao_em_wal(conexao):
+    """Banco em WAL: as leituras não bloqueiam o escritor (o modo fica gravado no arquivo)"""
+    modo = conexao.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    if modo != 'wal':
+        # Ex.: banco em memória ou sistema de arquivos sem memória compartilhada
+        print(f"Aviso: banco continua no modo de journal '{modo}' (WAL indisponível).")
+
+
+# O SQLite não troca o modo de journal dentro de uma transação
+FORA_DE_TRANSACAO = {_gravacao_em_wal}
+
+
+# Lista ordenada de (tabelas necessárias, função de migração).
+# A migração N eleva o user_version para N.
+MIGRACOES = [
+    (('notas',), _indice_unico_notas),
+    (('alunos',), _indice_nome_alunos),
+    (('notas',), _indice_disciplina_notas),
+    (('alunos', 'notas'), _boletim_materializado),
+    (('alunos', 'notas'), _estatisticas_incrementais),
+    (('alunos',), _indice_busca_alunos),
+    (('alunos', 'notas'), _notas_em_cascata),
+    ((), _gravacao_em_wal),
+]
+
+
+def versao_atual(conexao):
+    """Retorna a versão de esquema gravada no banco"""
+    return conexao.execute("PRAGMA user_version").fetchone()[0]
+
+
+def aplicar_migracoes(conexao):
+    """Aplica as migrações pendentes; retorna True se o esquema está atualizado"""
+    if versao_atual(conexao) >= len(MIGRACOES):
+        return True
+
+    conexao.execute("BEGIN IMMEDIATE")
+    try:
+        # Relê a versão dentro da transação (outra conexão pode ter migrado)
+        versao = versao_atual(conexao)
+        for numero, (tabelas, migracao) in enumerate(MIGRACOES[versao:], start=versao + 1):
+            # Banco ainda sem as tabelas: tenta de novo depois que forem criadas
+            if not all(tabela_existe(conexao, tabela) for tabela in tabelas):
+                break
+            if migracao in FORA_DE_TRANSACAO:
+                conexao.commit()
+                migracao(conexao)
+                conexao.execute("BEGIN IMMEDIATE")
+                if versao_atual(conexao) >= numero:
+                    # Outra conexão migrou enquanto a transação estava fechada
+                    versao = versao_atual(conexao)
+                    break
+            else:
+                migracao(conexao)
+            conexao.execute(f"PRAGMA user_version = {numero}")
+            versao = numero
+        conexao.commit()
+    except Exception:
+        conexao.rollback()
+        raise
+
+    return versao >= len(MIGRACOES)
@@ -0,0 +1,113 @@
+"""
+Montagem do boletim em formato pivot (uma coluna por disciplina)
+As colunas vêm do conjunto real de disciplinas, não de uma lista fixa.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from itertools import groupby
+
+# Disciplinas oferecidas pela escola (sempre exibidas, mesmo sem notas)
+DISCIPLINAS = [
+    "Matemática", "Português", "História", "Geografia",
+    "Ciências", "Inglês", "Artes", "Educação Física"
+]
+
+# Colunas fixas do boletim, antes das disciplinas
+COLUNAS_ALUNO = ('id', 'nome', 'matricula')
+
+# Lista as disciplinas distintas saltando pelo índice (disciplina, nota),
+# sem percorrer todas as notas
+SQL_DISCIPLINAS_COM_NOTAS = """
+    WITH RECURSIVE d(disciplina) AS (
+        SELECT MIN(disciplina) FROM notas
+        UNION ALL
+        SELECT (SELECT MIN(disciplina) FROM notas WHERE disciplina > d.disciplina)
+        FROM d WHERE d.disciplina IS NOT NULL
+    )
+    SELECT disciplina FROM d WHERE disciplina IS NOT NULL
+"""
+
+
+def chave_disciplina(disciplina):
+    """Nome de coluna da disciplina: 'Educação Física' -> 'educacao_fisica'"""
+    sem_acentos = unicodedata.normalize('NFKD', disciplina).encode('ascii', 'ignore').decode()
+    return re.sub(r'\W+', '_', sem_acentos.lower()).strip('_') or 'disciplina'
+
+
+@lru_cache(maxsize=64)
+def colunas_disciplinas(disciplinas):
+    """Chaves únicas (na mesma ordem) para a tupla de disciplinas"""
+    usadas = set(COLUNAS_ALUNO)
+    chaves = []
+    for disciplina in disciplinas:
+        chave = base = chave_disciplina(disciplina)
+        sufixo = 2
+        while chave in usadas:
+            chave = f"{base}_{sufixo}"
+            sufixo += 1
+        usadas.add(chave)
+        chaves.append(chave)
+    return tuple(chaves)
+
+
+def listar_disciplinas(conexao, padrao=()):
+    """Disciplinas padrão seguidas das demais que já possuem notas"""
+    com_notas = [linha[0] for linha in conexao.execute(SQL_DISCIPLINAS_COM_NOTAS)]
+    conhecidas = set(padrao)
+    return tuple(padrao) + tuple(d for d in com_notas if d not in conhecidas)
+
+
+def _literal(texto):
+    return "'" + texto.replace("'", "''") + "'"
+
+
+@lru_cache(maxsize=64)
+def montar_sql_pivot(disciplinas, sql_alunos):
+    """Gera (e guarda em cache) o SELECT pivot para as disciplinas informadas"""
+    colunas = ",\n".join(
+        f'    MAX(CASE WHEN n.disciplina = {_literal(disciplina)} THEN n.nota END) AS "{chave}"'
+        for disciplina, chave in zip(disciplinas, colunas_disciplinas(disciplinas)))
+    return (
+        "SELECT a.id, a.nome, a.matricula" + (",\n" + colunas if colunas else "") + "\n"
+        f"FROM ({sql_alunos}) a\n"
+        "LEFT JOIN notas n ON a.id = n.aluno_id\n"
+        "GROUP BY a.id, a.nome, a.matricula\n"
+        "ORDER BY a.nome, a.id"
+    )
+
+
+def pivot_sql(conexao, disciplinas, sql_alunos, parametros=()):
+    """Pivot calculado pelo SQLite com o SELECT gerado para as disciplinas"""
+    cursor = conexao.execute(montar_sql_pivot(tuple(disciplinas), sql_alunos), parametros)
+    colunas = [desc[0] for desc in cursor.description]
+    for linha in cursor:
+        yield dict(zip(colunas, linha))
+
+
+def pivot_python(conexao, disciplinas, sql_alunos, parametros=()):
+    """Pivot montado em Python com uma única passada ordenada pelas notas"""
+    disciplinas = tuple(disciplinas)
+    chaves = dict(zip(disciplinas, colunas_disciplinas(disciplinas)))
+    vazio = dict.fromkeys(chaves.values())
+    cursor = conexao.execute(f"""
+        SELECT a.id, a.nome, a.matricula, n.disciplina, n.nota
+        FROM ({sql_alunos}) a
+        LEFT JOIN notas n ON a.id = n.aluno_id
+        ORDER BY a.nome, a.id
+    """, parametros)
+    for (aluno_id, nome, matricula), notas in groupby(cursor, key=lambda linha: linha[:3]):
+        aluno = {'id': aluno_id, 'nome': nome, 'matricula': matricula}
+        aluno.update(vazio)
+        for *_, disciplina, nota in notas:
+            chave = chaves.get(disciplina)
+            if chave is not None:
+                aluno[chave] = nota
+        yield aluno
+
+
+MOTORES = {
+    'sql': pivot_sql,
+    'python': pivot_python,
+}
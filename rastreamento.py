@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Rastreamento de SQL e log de consultas lentas
+As conexões do pool e do escritor são criadas com ConexaoRastreada: cada
+execute é cronometrado (incluindo a leitura das linhas) e agregado por
+instrução normalizada e função de origem. Execuções acima do limite vão para
+um log rotativo.
+Uso: python rastreamento.py [consultas_lentas.log] [quantidade]
+"""
+
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Configuração (variáveis de ambiente ou configurar())
+ATIVO = os.environ.get('SISTEMA_NOTAS_RASTREAMENTO', '1') != '0'
+LIMITE_LENTA_MS = float(os.environ.get('SISTEMA_NOTAS_LIMITE_LENTA_MS', 100))
+ARQUIVO_LOG_LENTAS = os.environ.get('SISTEMA_NOTAS_LOG_LENTAS', 'consultas_lentas.log')
+
+# Rotação do log de lentas
+TAMANHO_MAXIMO_LOG = 1_000_000
+ARQUIVOS_LOG = 5
+
+# Funções guardadas da pilha de quem fez a consulta
+PROFUNDIDADE_PILHA = 3
+
+# Instruções distintas mantidas no agregado (as demais entram em OUTRAS)
+MAXIMO_INSTRUCOES = 2000
+OUTRAS = '(outras instruções)'
+
+SEPARADOR_LOG = ' | '
+
+# Módulos de infraestrutura ignorados ao identificar a função de origem
+MODULOS_INFRAESTRUTURA = {
+    __name__, 'conexao', 'escritor', 'threading', 'concurrent.futures.thread',
+    'sqlite3', 'sqlite3.dbapi2', 'contextlib',
+}
+
+_local = threading.local()
+_trava = threading.Lock()
+_agregado = {}
+_log_lentas = None
+_coletores = []
+
+
+def configurar(ativo=None, limite_ms=None, arquivo_log=None):
+    """Altera a configuração; `ativo` vale para as conexões criadas depois"""
+    global ATIVO, LIMITE_LENTA_MS, ARQUIVO_LOG_LENTAS, _log_lentas
+    if ativo is not None:
+        ATIVO = ativo
+    if limite_ms is not None:
+        LIMITE_LENTA_MS = limite_ms
+    if arquivo_log is not None and arquivo_log != ARQUIVO_LOG_LENTAS:
+        ARQUIVO_LOG_LENTAS = arquivo_log
+        with _trava:
+            if _log_lentas is not None:
+                for handler in _log_lentas.handlers[:]:
+                    _log_lentas.removeHandler(handler)
+                    handler.close()
+            _log_lentas = None
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(sql):
+    """Texto da instrução sem literais e com espaços simplificados"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", '?', sql)
+    sql = re.sub(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", 'IN (?, ...)', sql, flags=re.IGNORECASE)
+    return ' '.join(sql.split())
+
+
+def pilha_chamadas(pular=1):
+    """Funções (modulo.funcao) que levaram à chamada, da mais próxima para a mais externa"""
+    if not ATIVO:
+        return ()
+    pilha = []
+    quadro = sys._getframe(pular)
+    while quadro is not None and len(pilha) < PROFUNDIDADE_PILHA:
+        modulo = quadro.f_globals.get('__name__', '?')
+        if modulo not in MODULOS_INFRAESTRUTURA:
+            pilha.append(f"{modulo}.{quadro.f_code.co_name}")
+        quadro = quadro.f_back
+    externa = getattr(_local, 'origem_externa', ())
+    return tuple(pilha + list(externa))[:PROFUNDIDADE_PILHA]
+
+
+@contextmanager
+def coletar_instrucoes():
+    """Junta o texto original (sem normalizar) e a pilha de cada instrução executada no bloco"""
+    coletadas = {}
+    _coletores.append(coletadas)
+    try:
+        yield coletadas
+    finally:
+        _coletores.remove(coletadas)
+
+
+@contextmanager
+def origem_externa(pilha):
+    """Atribui as consultas desta thread a `pilha` (ex.: comando enviado ao escritor)"""
+    anterior = getattr(_local, 'origem_externa', ())
+    _local.origem_externa = pilha or ()
+    try:
+        yield
+    finally:
+        _local.origem_externa = anterior
+
+
+class Registro:
+    """Uma execução em andamento (tempo e linhas acumulam até o cursor esgotar)"""
+
+    __slots__ = ('sql', 'duracao', 'linhas', 'instrucoes', 'pilha')
+
+    def __init__(self, sql, pilha):
+        self.sql = sql
+        self.duracao = 0.0
+        self.linhas = 0
+        self.instrucoes = 0
+        self.pilha = pilha
+
+
+def _registrar(registro):
+    normalizado = normalizar_sql(registro.sql)
+    # Sem função de origem: instrução da própria infraestrutura (ex.: COMMIT do escritor)
+    origem = registro.pilha[0] if registro.pilha else f"({threading.current_thread().name})"
+    _acumular(normalizado, origem, registro.duracao, registro.linhas, registro.instrucoes)
+
+    duracao_ms = registro.duracao * 1000
+    if duracao_ms >= LIMITE_LENTA_MS:
+        # Só o texto normalizado: os parâmetros podem conter CPFs
+        _logger_lentas().warning(SEPARADOR_LOG.join((
+            f"{duracao_ms:.1f} ms", f"{registro.linhas} linhas", f"{registro.instrucoes} instruções",
+            ' < '.join(registro.pilha) or origem, normalizado)))
+
+
+def _acumular(sql, origem, duracao, linhas, instrucoes):
+    with _trava:
+        chave = (sql, origem)
+        dados = _agregado.get(chave)
+        if dados is None:
+            if len(_agregado) >= MAXIMO_INSTRUCOES:
+                chave = (OUTRAS, '?')
+                dados = _agregado.get(chave)
+            if dados is None:
+                dados = _agregado[chave] = {'execucoes': 0, 'total_s': 0.0, 'maximo_s': 0.0,
+                                            'linhas': 0, 'instrucoes': 0}
+        dados['execucoes'] += 1
+        dados['total_s'] += duracao
+        dados['maximo_s'] = max(dados['maximo_s'], duracao)
+        dados['linhas'] += linhas
+        dados['instrucoes'] += instrucoes
+
+
+def _logger_lentas():
+    global _log_lentas
+    with _trava:
+        if _log_lentas is None:
+            _log_lentas = logging.getLogger('sistema_notas.consultas_lentas')
+            _log_lentas.propagate = False
+            if not _log_lentas.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    ARQUIVO_LOG_LENTAS, maxBytes=TAMANHO_MAXIMO_LOG, backupCount=ARQUIVOS_LOG,
+                    encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter('%(asctime)s | %(message)s'))
+                _log_lentas.addHandler(handler)
+        return _log_lentas
+
+
+class CursorRastreado(sqlite3.Cursor):
+    """Cursor que cronometra execute e a leitura das linhas até o cursor esgotar"""
+
+    _registro = None
+
+    def _iniciar(self, sql):
+        self._finalizar()
+        registro = self._registro = Registro(sql, pilha_chamadas(3))
+        _local.registro = registro
+        for coletadas in _coletores:
+            coletadas.setdefault(sql, registro.pilha)
+        return registro
+
+    def _finalizar(self):
+        registro = self._registro
+        if registro is not None:
+            self._registro = None
+            _registrar(registro)
+
+    def execute(self, sql, parametros=()):
+        registro = self._iniciar(sql)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            registro.duracao += time.perf_counter() - inicio
+            _local.registro = None
+            if self.description is None:
+                # Sem linhas a ler (INSERT/UPDATE/DELETE/PRAGMA): registra já
+                registro.linhas = max(self.rowcount, 0)
+                self._finalizar()
+
+    def executemany(self, sql, parametros):
+        registro = self._iniciar(sql)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            registro.duracao += time.perf_counter() - inicio
+            registro.linhas = max(self.rowcount, 0)
+            _local.registro = None
+            self._finalizar()
+
+    def _ler(self, leitura, *args):
+        registro = self._registro
+        if registro is None:
+            return leitura(*args)
+        inicio = time.perf_counter()
+        try:
+            resultado = leitura(*args)
+        finally:
+            registro.duracao += time.perf_counter() - inicio
+        return resultado
+
+    def fetchone(self):
+        linha = self._ler(super().fetchone)
+        if linha is None:
+            self._finalizar()
+        elif self._registro is not None:
+            self._registro.linhas += 1
+        return linha
+
+    def fetchmany(self, *args):
+        linhas = self._ler(super().fetchmany, *args)
+        if self._registro is not None:
+            self._registro.linhas += len(linhas)
+            if not linhas:
+                self._finalizar()
+        return linhas
+
+    def fetchall(self):
+        linhas = self._ler(super().fetchall)
+        if self._registro is not None:
+            self._registro.linhas += len(linhas)
+            self._finalizar()
+        return linhas
+
+    def __next__(self):
+        try:
+            linha = self._ler(super().__next__)
+        except StopIteration:
+            self._finalizar()
+            raise
+        if self._registro is not None:
+            self._registro.linhas += 1
+        return linha
+
+    def close(self):
+        self._finalizar()
+        super().close()
+
+    def __del__(self):
+        # Cursor abandonado antes de esgotar (ex.: fetchone de uma linha só)
+        try:
+            self._finalizar()
+        except Exception:
+            pass
+
+
+class ConexaoRastreada(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de execute()) são rastreados"""
+
+    def cursor(self, factory=CursorRastreado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+
+def _contar_instrucao(instrucao):
+    # Chamado pelo SQLite a cada instrução iniciada: a própria, o BEGIN
+    # implícito, cada linha de executemany e cada gatilho disparado
+    registro = getattr(_local, 'registro', None)
+    if registro is not None:
+        registro.instrucoes += 1
+
+
+def abrir_conexao(caminho, **opcoes):
+    """sqlite3.connect com rastreamento quando ATIVO"""
+    if not ATIVO:
+        return sqlite3.connect(caminho, **opcoes)
+    conexao = sqlite3.connect(caminho, factory=ConexaoRastreada, **opcoes)
+    conexao.set_trace_callback(_contar_instrucao)
+    return conexao
+
+
+@contextmanager
+def sem_contagem_instrucoes(conexao):
+    """
+    Suspende a contagem de instruções na conexão. Para operações em massa que
+    disparam gatilhos em cada linha: o SQLite chama a contagem com o texto
+    expandido de cada instrução do gatilho, o que domina o tempo da operação.
+    """
+    conexao.set_trace_callback(None)
+    try:
+        yield
+    finally:
+        if isinstance(getattr(conexao, '_conexao', conexao), ConexaoRastreada):
+            conexao.set_trace_callback(_contar_instrucao)
+
+
+def relatorio(quantidade=10, ordenar_por='total_s'):
+    """Top-N instruções (por tempo total, máximo ou execuções) com médias"""
+    with _trava:
+        itens = [{'sql': sql, 'origem': origem, **dados}
+                 for (sql, origem), dados in _agregado.items()]
+    for item in itens:
+        item['media_ms'] = item['total_s'] / item['execucoes'] * 1000
+    itens.sort(key=lambda item: item[ordenar_por], reverse=True)
+    return itens[:quantidade]
+
+
+def zerar():
+    """Descarta o agregado (ex.: entre rodadas de benchmark)"""
+    with _trava:
+        _agregado.clear()
+
+
+def imprimir_relatorio(quantidade=10, ordenar_por='total_s'):
+    itens = relatorio(quantidade, ordenar_por)
+    if not itens:
+        print("Nenhuma consulta registrada.")
+        return
+    print(f"{'Total (ms)':>11} {'Execuções':>10} {'Média (ms)':>11} {'Máx (ms)':>9} "
+          f"{'Linhas':>9}  Origem / instrução")
+    for item in itens:
+        print(f"{item['total_s'] * 1000:11.1f} {item['execucoes']:10d} {item['media_ms']:11.2f} "
+              f"{item['maximo_s'] * 1000:9.1f} {item['linhas']:9d}  {item['origem']}")
+        print(f"{'':>55}{item['sql'][:120]}")
+
+
+def ler_log_lentas(caminho=None):
+    """Gera (duracao_ms, linhas, instrucoes, pilha, sql) das entradas do log e dos rotacionados"""
+    caminho = caminho or ARQUIVO_LOG_LENTAS
+    arquivos = [f"{caminho}.{numero}" for numero in range(ARQUIVOS_LOG, 0, -1)] + [caminho]
+    for arquivo in arquivos:
+        if not os.path.exists(arquivo):
+            continue
+        with open(arquivo, encoding='utf-8') as entrada:
+            for linha in entrada:
+                partes = linha.rstrip('\n').split(SEPARADOR_LOG, 5)
+                if len(partes) != 6:
+                    continue
+                _, duracao, linhas, instrucoes, pilha, sql = partes
+                try:
+                    yield (float(duracao.split()[0]), int(linhas.split()[0]),
+                           int(instrucoes.split()[0]), pilha, sql)
+                except ValueError:
+                    continue
+
+
+def main():
+    caminho = sys.argv[1] if len(sys.argv) > 1 else None
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    for duracao_ms, linhas, instrucoes, pilha, sql in ler_log_lentas(caminho):
+        _acumular(sql, pilha.split(' < ')[0], duracao_ms / 1000, linhas, instrucoes)
+
+    print(f"🐢 Consultas lentas em {caminho or ARQUIVO_LOG_LENTAS} (top {quantidade} por tempo total)")
+    imprimir_relatorio(quantidade)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,17 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sqlite3
+import re
+
+from busca import buscar_alunos
+from conexao import conectar
+from arquivo import arquivar_alunos, compactar
+from backend import excluir_aluno, excluir_alunos_em_lote, previa_remocao
+from repositorio import listar_alunos, notas_do_aluno
 
 def conectar_db():
     """Conecta ao banco de dados SQLite"""
-    try:
-        return sqlite3.connect('sistema_nota.db')
-    except Exception as e:
-        print(f"Erro ao conectar ao banco: {e}")
-        return None
-
-def listar_alunos():
-    """Lista todos os alunos cadastrados"""
-    conn = conectar_db()
-    if not conn:
-        return []
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, nome, matricula, cpf FROM alunos ORDER BY nome')
-        alunos = cursor.fetchall()
-        return alunos
-    except Exception as e:
-        print(f"Erro ao listar alunos: {e}")
-        return []
-    finally:
-        conn.close()
+    return conectar()
 
 def mostrar_alunos():
     """Mostra a lista de alunos de forma organizada"""
@@ -56,6 +41,8 @@ def remover_aluno_por_id(aluno_id):
         # Verifica se o aluno existe
         cursor.execute("SELECT nome, matricula, cpf FROM alunos WHERE id = ?", (aluno_id,))
         aluno = cursor.fetchone()
+        # Devolve a conexão antes de esperar a confirmação do usuário
+        conn.close()
         
         if not aluno:
             print(f"❌ Aluno com ID {aluno_id} não encontrado.")
@@ -64,8 +51,7 @@ def remover_aluno_por_id(aluno_id):
         nome, matricula, cpf = aluno
         
         # Verifica se o aluno tem notas
-        cursor.execute("SELECT COUNT(*) FROM notas WHERE aluno_id = ?", (aluno_id,))
-        total_notas = cursor.fetchone()[0]
+        total_notas = len(notas_do_aluno(aluno_id))
         
         print(f"\n📋 INFORMAÇÕES DO ALUNO:")
         print(f"Nome: {nome}")
@@ -79,15 +65,8 @@ def remover_aluno_por_id(aluno_id):
         # Confirma remoção
         confirmacao = input(f"\n❌ Confirma a remoção do aluno {nome}? (s/n): ").lower()
         if confirmacao in ['s', 'sim', 'y', 'yes']:
-            # Remove notas primeiro (devido à foreign key)
-            cursor.execute("DELETE FROM notas WHERE aluno_id = ?", (aluno_id,))
-            notas_removidas = cursor.rowcount
-            
-            # Remove o aluno
-            cursor.execute("DELETE FROM alunos WHERE id = ?", (aluno_id,))
-            aluno_removido = cursor.rowcount
-            
-            conn.commit()
+            # Remove as notas e o aluno em uma só transação
+            aluno_removido, notas_removidas = excluir_aluno(aluno_id)
             
             if aluno_removido > 0:
                 print(f"✅ Aluno {nome} removido com sucesso!")
@@ -103,7 +82,6 @@ def remover_aluno_por_id(aluno_id):
             
     except Exception as e:
         print(f"❌ Erro ao remover aluno: {e}")
-        conn.rollback()
         return False
     finally:
         conn.close()
@@ -115,11 +93,9 @@ def remover_aluno_por_nome(nome_busca):
         return False
     
     try:
-        cursor = conn.cursor()
-        
-        # Busca alunos com nome similar
-        cursor.execute("SELECT id, nome, matricula, cpf FROM alunos WHERE nome LIKE ?", (f"%{nome_busca}%",))
-        alunos = cursor.fetchall()
+        # Busca alunos pelo índice de nome/matrícula, mais relevantes primeiro
+        alunos = buscar_alunos(conn, nome_busca)
+        conn.close()
         
         if not alunos:
             print(f"❌ Nenhum aluno encontrado com o nome '{nome_busca}'.")
@@ -164,6 +140,7 @@ def remover_aluno_por_cpf(cpf):
         # Busca aluno por CPF
         cursor.execute("SELECT id, nome, matricula FROM alunos WHERE cpf = ?", (cpf,))
         aluno = cursor.fetchone()
+        conn.close()
         
         if not aluno:
             print(f"❌ Nenhum aluno encontrado com o CPF '{cpf}'.")
@@ -178,6 +155,126 @@ def remover_aluno_por_cpf(cpf):
     finally:
         conn.close()
 
+def ler_lista(texto):
+    """Itens separados por vírgula, espaço ou ;; '@arquivo' lê um item por linha"""
+    texto = texto.strip()
+    if texto.startswith('@'):
+        with open(texto[1:], encoding='utf-8') as arquivo:
+            return [linha.strip() for linha in arquivo if linha.strip()]
+    return [item for item in re.split(r'[\s,;]+', texto) if item]
+
+def mostrar_previa(total_alunos, total_notas, exemplos, acao):
+    """Totais e alguns dos alunos afetados por uma operação em lote"""
+    print(f"\n📋 {total_alunos} aluno(s) e {total_notas} nota(s) serão {acao}.")
+    print(f"{'ID':<8} {'Nome':<20} {'Matrícula':<12}")
+    print("-"*42)
+    for aluno_id, nome, matricula in exemplos:
+        print(f"{aluno_id:<8} {nome:<20} {matricula:<12}")
+    if total_alunos > len(exemplos):
+        print(f"... e mais {total_alunos - len(exemplos)} aluno(s).")
+
+def remover_alunos_em_lote(ids=(), matriculas=(), cpfs=(), filtro=None):
+    """Mostra quantos alunos e notas serão removidos e remove todos de uma vez"""
+    try:
+        total_alunos, total_notas, exemplos = previa_remocao(ids, matriculas, cpfs, filtro)
+        
+        if total_alunos == 0:
+            print("❌ Nenhum aluno encontrado com os critérios informados.")
+            return False
+        
+        mostrar_previa(total_alunos, total_notas, exemplos, "removidos")
+        
+        confirmacao = input(f"\n❌ Confirma a remoção de {total_alunos} aluno(s)? (s/n): ").lower()
+        if confirmacao not in ['s', 'sim', 'y', 'yes']:
+            print("❌ Operação cancelada.")
+            return False
+        
+        def progresso(removidos, total):
+            print(f"\r🗑️ {removidos}/{total} aluno(s) removido(s)", end='', flush=True)
+        
+        alunos_removidos, notas_removidas = excluir_alunos_em_lote(
+            ids, matriculas, cpfs, filtro, ao_progredir=progresso)
+        print()
+        print(f"✅ {alunos_removidos} aluno(s) removido(s) com sucesso!")
+        if notas_removidas > 0:
+            print(f"📝 {notas_removidas} nota(s) também foram removida(s).")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Erro ao remover alunos: {e}")
+        return False
+
+def arquivar_ano_letivo(ano, ids=(), matriculas=(), cpfs=(), filtro=None):
+    """Move os alunos escolhidos e as notas para o arquivo do ano letivo"""
+    try:
+        total_alunos, total_notas, exemplos = previa_remocao(ids, matriculas, cpfs, filtro)
+        
+        if total_alunos == 0:
+            print("❌ Nenhum aluno encontrado com os critérios informados.")
+            return False
+        
+        mostrar_previa(total_alunos, total_notas, exemplos, f"arquivados em {ano}")
+        
+        confirmacao = input(f"\n📦 Confirma o arquivamento de {total_alunos} aluno(s)? (s/n): ").lower()
+        if confirmacao not in ['s', 'sim', 'y', 'yes']:
+            print("❌ Operação cancelada.")
+            return False
+        
+        def progresso(arquivados, total):
+            print(f"\r📦 {arquivados}/{total} aluno(s) arquivado(s)", end='', flush=True)
+        
+        alunos_arquivados, notas_arquivadas = arquivar_alunos(
+            ano, ids, matriculas, cpfs, filtro, ao_progredir=progresso)
+        print()
+        print(f"✅ {alunos_arquivados} aluno(s) e {notas_arquivadas} nota(s) arquivados em {ano}.")
+        
+        confirmacao = input("Compactar o banco agora? (s/n): ").lower()
+        if confirmacao in ['s', 'sim', 'y', 'yes']:
+            antes, depois = compactar()
+            print(f"🗜️ Banco: {antes / 1024 / 1024:.1f} MB → {depois / 1024 / 1024:.1f} MB")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Erro ao arquivar alunos: {e}")
+        return False
+
+def escolher_alunos():
+    """Critério dos alunos de uma operação em lote (argumentos de previa_remocao), ou None"""
+    print("\n1. Por IDs")
+    print("2. Por matrículas")
+    print("3. Por CPFs")
+    print("4. Por início da matrícula (ex.: MAT2023)")
+    opcao = input("Escolha uma opção: ").strip()
+    
+    if opcao in ("1", "2", "3"):
+        entrada = input("Digite os itens separados por vírgula (ou @arquivo, um por linha): ")
+        try:
+            itens = ler_lista(entrada)
+        except OSError as e:
+            print(f"❌ Erro ao ler o arquivo: {e}")
+            return None
+        if not itens:
+            print("❌ Nenhum item informado.")
+            return None
+        if opcao == "1":
+            try:
+                return {'ids': [int(item) for item in itens]}
+            except ValueError:
+                print("❌ ID inválido.")
+                return None
+        if opcao == "2":
+            return {'matriculas': itens}
+        return {'cpfs': itens}
+    elif opcao == "4":
+        prefixo = input("Digite o início da matrícula: ").strip()
+        if not prefixo:
+            print("❌ Prefixo não pode estar vazio.")
+            return None
+        # Faixa de texto em vez de LIKE: usa o índice único de matrícula
+        return {'filtro': ("matricula >= ? AND matricula < ?", [prefixo, prefixo + '\U0010ffff'])}
+    print("❌ Opção inválida.")
+    return None
+
 def menu_remocao():
     """Menu para remoção de alunos"""
     while True:
@@ -188,6 +285,8 @@ def menu_remocao():
         print("2. 🔍 Remover por ID")
         print("3. 🔍 Remover por nome")
         print("4. 🔍 Remover por CPF")
+        print("5. 🗑️ Remover vários alunos")
+        print("6. 📦 Arquivar alunos de um ano letivo")
         print("0. 🚪 Voltar")
         print("="*50)
         
@@ -213,6 +312,19 @@ def menu_remocao():
                 remover_aluno_por_cpf(cpf)
             else:
                 print("❌ CPF não pode estar vazio.")
+        elif opcao == "5":
+            criterio = escolher_alunos()
+            if criterio:
+                remover_alunos_em_lote(**criterio)
+        elif opcao == "6":
+            try:
+                ano = int(input("Digite o ano letivo: "))
+            except ValueError:
+                print("❌ Ano inválido.")
+                continue
+            criterio = escolher_alunos()
+            if criterio:
+                arquivar_ano_letivo(ano, **criterio)
         elif opcao == "0":
             print("👋 Voltando ao menu principal...")
             break
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Réplica de relatórios: cópia somente leitura do banco, atualizada de tempos em tempos
+Os relatórios pesados (estatísticas, boletim, notas detalhadas, exportação)
+podem ler da cópia em vez do banco das gravações. A cópia é gravada em um
+arquivo temporário e trocada inteira (rename), então as conexões de leitura
+abrem o arquivo como imutável, com mmap e cache grande, sem travas.
+Configuração (variáveis de ambiente ou configurar()):
+  SISTEMA_NOTAS_REPLICA=1               liga o modo réplica
+  SISTEMA_NOTAS_REPLICA_INTERVALO=300   segundos entre atualizações
+  SISTEMA_NOTAS_REPLICA_RELATORIOS=...  relatórios roteados (padrão: todos)
+Uso: python replica.py [banco]   (atualiza a réplica uma vez)
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import metricas
+from conexao import banco_atual, conectar, obter_pool
+from rastreamento import abrir_conexao
+
+# Relatórios que podem ser roteados para a réplica
+RELATORIOS = ('estatisticas', 'boletim', 'notas_detalhadas', 'exportacao')
+
+ATIVA = os.environ.get('SISTEMA_NOTAS_REPLICA', '0') == '1'
+INTERVALO_ATUALIZACAO = int(os.environ.get('SISTEMA_NOTAS_REPLICA_INTERVALO', '300'))
+RELATORIOS_NA_REPLICA = set(
+    filter(None, os.environ.get('SISTEMA_NOTAS_REPLICA_RELATORIOS', ','.join(RELATORIOS)).split(',')))
+
+# Réplica mais velha que isso não é usada (relatório volta para o banco principal)
+FATOR_IDADE_MAXIMA = 2
+
+# Cópia por backup(): páginas por passo e pausa entre passos (a trava de leitura
+# é solta entre os passos e quem grava não fica esperando a cópia inteira)
+PAGINAS_POR_PASSO = 1024
+PAUSA_ENTRE_PASSOS = 0.001
+
+# PRAGMAs das conexões da réplica: leitura pelo mmap e cache maior que o do banco principal
+PRAGMAS_REPLICA = {
+    'mmap_size': 1 << 30,
+    'cache_size': -65536,
+    'temp_store': 'MEMORY',
+    'query_only': 'ON',
+}
+
+_trava = threading.Lock()
+_atualizacoes = {}  # caminho -> thread que atualiza a réplica
+_estados = {}  # caminho -> contadores das atualizações
+
+
+def configurar(ativa=None, intervalo=None, relatorios=None):
+    """Altera a configuração em tempo de execução"""
+    global ATIVA, INTERVALO_ATUALIZACAO, RELATORIOS_NA_REPLICA
+    if ativa is not None:
+        ATIVA = ativa
+    if intervalo is not None:
+        INTERVALO_ATUALIZACAO = intervalo
+    if relatorios is not None:
+        RELATORIOS_NA_REPLICA = set(relatorios)
+
+
+def caminho_replica(caminho=None):
+    """Arquivo da réplica ao lado do banco: sistema_nota.db -> sistema_nota.relatorios.db"""
+    base, extensao = os.path.splitext(caminho or banco_atual())
+    return f"{base}.relatorios{extensao or '.db'}"
+
+
+def _estado(caminho):
+    return _estados.setdefault(caminho, {
+        'atualizacoes': 0,
+        'falhas': 0,
+        'duracao_ultima': 0.0,
+    })
+
+
+def _copiar_por_backup(origem, temporario):
+    """Cópia em passos de PAGINAS_POR_PASSO páginas (bancos em modo rollback)"""
+    destino = sqlite3.connect(temporario)
+    try:
+        origem.backup(destino, pages=PAGINAS_POR_PASSO,
+                      progress=lambda status, restantes, total: time.sleep(PAUSA_ENTRE_PASSOS))
+        destino.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        destino.close()
+
+
+def atualizar_replica(caminho=None):
+    """
+    Copia o banco para a réplica e troca o arquivo. Em WAL usa VACUUM INTO (uma
+    única leitura consistente, que não bloqueia as gravações nem recomeça);
+    em modo rollback, backup() em passos. Retorna a duração em segundos.
+    """
+    caminho = caminho or banco_atual()
+    replica = caminho_replica(caminho)
+    temporario = replica + '.tmp'
+    inicio = time.perf_counter()
+    origem = abrir_conexao(caminho, isolation_level=None)
+    try:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        modo = origem.execute("PRAGMA journal_mode").fetchone()[0]
+        if modo == 'wal':
+            origem.execute("VACUUM INTO ?", (temporario,))
+        else:
+            _copiar_por_backup(origem, temporario)
+        pool = obter_pool(replica, somente_leitura=True, pragmas=PRAGMAS_REPLICA)
+        # Fecha as conexões livres antes da troca (no Windows um arquivo aberto não é substituído)
+        pool.renovar()
+        os.replace(temporario, replica)
+    except Exception:
+        with _trava:
+            _estado(caminho)['falhas'] += 1
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        origem.close()
+
+    # Conexões abertas na cópia anterior são descartadas ao voltar ao pool
+    pool.renovar()
+    duracao = time.perf_counter() - inicio
+    with _trava:
+        estado = _estado(caminho)
+        estado['atualizacoes'] += 1
+        estado['duracao_ultima'] = duracao
+    return duracao
+
+
+def idade_replica(caminho=None):
+    """Segundos desde a última atualização da réplica (None se não existe)"""
+    replica = caminho_replica(caminho)
+    if not os.path.exists(replica):
+        return None
+    return max(0.0, time.time() - os.path.getmtime(replica))
+
+
+def relatorio_na_replica(relatorio, caminho=None):
+    """O relatório deve ler da réplica (modo ativo, relatório roteado e réplica recente)?"""
+    if not ATIVA or relatorio not in RELATORIOS_NA_REPLICA:
+        return False
+    idade = idade_replica(caminho)
+    return idade is not None and idade <= INTERVALO_ATUALIZACAO * FATOR_IDADE_MAXIMA
+
+
+def conectar_relatorio(relatorio, caminho=None):
+    """Conexão para um relatório: da réplica quando roteado para ela, senão do banco principal"""
+    if relatorio_na_replica(relatorio, caminho):
+        try:
+            return obter_pool(caminho_replica(caminho), somente_leitura=True,
+                              pragmas=PRAGMAS_REPLICA).obter()
+        except Exception as e:
+            print(f"Erro ao abrir a réplica de relatórios (usando o banco principal): {e}")
+    return conectar(caminho)
+
+
+def iniciar_atualizacao(caminho=None, intervalo=None):
+    """
+    Atualiza a réplica agora e a cada `intervalo` segundos (só com o modo réplica
+    ativo); uma thread por banco, então cada escola tem a sua.
+    """
+    # Resolvido aqui: a escola do contexto não passa para a thread
+    caminho = caminho or banco_atual()
+    if not ATIVA:
+        return False
+
+    def atualizar():
+        while True:
+            try:
+                atualizar_replica(caminho)
+            except Exception as e:
+                print(f"Erro ao atualizar a réplica de relatórios: {e}")
+            time.sleep(intervalo or INTERVALO_ATUALIZACAO)
+
+    with _trava:
+        if caminho in _atualizacoes:
+            return False
+        _atualizacoes[caminho] = threading.Thread(target=atualizar, name="replica-relatorios",
+                                                  daemon=True)
+    _atualizacoes[caminho].start()
+    return True
+
+
+METRICAS_REPLICA = (
+    ('sistema_notas_replica_atualizacoes_total', 'counter', 'Atualizações da réplica de relatórios',
+     'atualizacoes'),
+    ('sistema_notas_replica_falhas_total', 'counter', 'Atualizações da réplica com erro', 'falhas'),
+    ('sistema_notas_replica_atualizacao_segundos', 'gauge', 'Duração da última atualização',
+     'duracao_ultima'),
+    ('sistema_notas_replica_idade_segundos', 'gauge', 'Idade da réplica', 'idade'),
+)
+
+
+@metricas.REGISTRO.registrar_coletor
+def _metricas_replica():
+    with _trava:
+        estados = [(caminho, dict(estado)) for caminho, estado in _estados.items()]
+    for caminho, dados in estados:
+        dados['idade'] = idade_replica(caminho) or 0.0
+        yield from metricas.amostras_de(dados, METRICAS_REPLICA, {'banco': caminho})
+
+
+def main():
+    caminho = sys.argv[1] if len(sys.argv) > 1 else None
+    try:
+        duracao = atualizar_replica(caminho)
+    except Exception as e:
+        print(f"❌ Erro ao atualizar a réplica: {e}")
+        sys.exit(1)
+    replica = caminho_replica(caminho)
+    print(f"✅ Réplica {replica} atualizada em {duracao:.2f}s "
+          f"({os.path.getsize(replica) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Repositório de leitura de alunos e notas com cache em memória
+As leituras passam pelo cache (read-through); as gravações invalidam as
+chaves afetadas. Há um cache por arquivo de banco, como no pool de conexões.
+"""
+
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+import metricas
+from conexao import banco_atual, conectar, em_cada_escola
+
+# Segundos que uma entrada vale sem invalidação explícita
+# (cobre gravações feitas por outros processos; None = sem expiração)
+VALIDADE_CACHE = 30
+
+CHAVE_ALUNOS = ('alunos',)
+
+
+def chave_notas(aluno_id):
+    return ('notas', aluno_id)
+
+
+class Repositorio:
+    """Cache de leituras de um banco, com contadores de acertos e falhas"""
+
+    def __init__(self, caminho, validade=VALIDADE_CACHE):
+        self.caminho = caminho
+        self.validade = validade
+        self._trava = threading.Lock()
+        self._entradas = {}
+        # Versões por chave e por grupo ('alunos', 'notas'): uma leitura que
+        # termina depois de uma invalidação não grava o resultado antigo
+        self._versoes = defaultdict(int)
+        self._zerar_contadores()
+
+    def _zerar_contadores(self):
+        self.contadores = {'acertos': 0, 'falhas': 0, 'invalidacoes': 0, 'leituras_descartadas': 0}
+
+    def _versao(self, chave):
+        return self._versoes[chave], self._versoes[chave[0]]
+
+    def ler(self, chave, consulta):
+        """Valor da chave no cache; na falta, executa consulta(conexao) e guarda o resultado"""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada and (self.validade is None
+                            or time.monotonic() - entrada[0] < self.validade):
+                self.contadores['acertos'] += 1
+                return list(entrada[1])
+            self.contadores['falhas'] += 1
+            versao = self._versao(chave)
+
+        conexao = conectar(self.caminho)
+        if not conexao:
+            raise RuntimeError("Não foi possível conectar ao banco de dados.")
+        try:
+            valor = consulta(conexao)
+        finally:
+            conexao.close()
+
+        with self._trava:
+            if self._versao(chave) == versao:
+                self._entradas[chave] = (time.monotonic(), valor)
+            else:
+                self.contadores['leituras_descartadas'] += 1
+        return list(valor)
+
+    def invalidar(self, chave):
+        """Descarta uma chave; chave de um só elemento (ex.: ('notas',)) descarta o grupo"""
+        with self._trava:
+            self.contadores['invalidacoes'] += 1
+            self._versoes[chave] += 1
+            if len(chave) == 1:
+                for existente in [c for c in self._entradas if c[0] == chave[0]]:
+                    del self._entradas[existente]
+            else:
+                self._entradas.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            for grupo in {chave[0] for chave in self._entradas}:
+                self._versoes[grupo] += 1
+            self._entradas.clear()
+
+    def metricas(self):
+        """Contadores do cache, com leituras no banco e taxa de acerto"""
+        with self._trava:
+            dados = dict(self.contadores)
+            dados['entradas'] = len(self._entradas)
+        consultas = dados['acertos'] + dados['falhas']
+        dados['leituras_banco'] = dados['falhas']
+        dados['taxa_acerto'] = dados['acertos'] / consultas if consultas else 0.0
+        return dados
+
+
+_repositorios = {}
+_repositorios_lock = threading.Lock()
+
+
+def obter_repositorio(caminho=None):
+    """Retorna o repositório do banco informado, criando-o na primeira chamada"""
+    caminho = caminho or banco_atual()
+    with _repositorios_lock:
+        repositorio = _repositorios.get(caminho)
+        if repositorio is None:
+            repositorio = _repositorios[caminho] = Repositorio(caminho)
+        return repositorio
+
+
+def listar_alunos(caminho=None):
+    """Lista todos os alunos cadastrados: (id, nome, matricula, cpf) por nome"""
+    try:
+        return obter_repositorio(caminho).ler(CHAVE_ALUNOS, lambda conexao: conexao.execute(
+            "SELECT id, nome, matricula, cpf FROM alunos ORDER BY nome").fetchall())
+    except Exception as e:
+        print(f"Erro ao listar alunos: {e}")
+        return []
+
+
+def listar_alunos_rede(escolas=None):
+    """
+    Alunos de todas as escolas por nome: (escola, id, nome, matricula, cpf).
+    Cada escola lê a sua lista (pelo próprio cache) e as listas, já ordenadas,
+    são intercaladas.
+    """
+    listas = [[(escola, *aluno) for aluno in alunos]
+              for escola, alunos in em_cada_escola(listar_alunos, escolas=escolas)]
+    return list(heapq.merge(*listas, key=lambda aluno: (aluno[2], aluno[0])))
+
+
+def notas_do_aluno(aluno_id, caminho=None):
+    """Notas do aluno: (disciplina, nota) por disciplina"""
+    try:
+        return obter_repositorio(caminho).ler(chave_notas(aluno_id), lambda conexao: conexao.execute(
+            "SELECT disciplina, nota FROM notas WHERE aluno_id = ? ORDER BY disciplina",
+            (aluno_id,)).fetchall())
+    except Exception as e:
+        print(f"Erro ao buscar notas: {e}")
+        return []
+
+
+def invalidar_alunos(caminho=None):
+    """Chamar após cadastrar ou alterar alunos"""
+    obter_repositorio(caminho).invalidar(CHAVE_ALUNOS)
+
+
+def invalidar_notas(aluno_id=None, caminho=None):
+    """Chamar após gravar notas; sem aluno_id descarta as notas de todos"""
+    obter_repositorio(caminho).invalidar(chave_notas(aluno_id) if aluno_id is not None else ('notas',))
+
+
+def invalidar_aluno(aluno_id, caminho=None):
+    """Chamar após remover um aluno (lista de alunos e notas dele)"""
+    invalidar_alunos(caminho)
+    invalidar_notas(aluno_id, caminho)
+
+
+def metricas_cache(caminho=None):
+    """Acertos, falhas (leituras no banco), invalidações e taxa de acerto"""
+    return obter_repositorio(caminho).metricas()
+
+
+METRICAS_CACHE = (
+    ('sistema_notas_cache_acertos_total', 'counter', 'Leituras atendidas pelo cache', 'acertos'),
+    ('sistema_notas_cache_falhas_total', 'counter', 'Leituras que foram ao banco', 'falhas'),
+    ('sistema_notas_cache_invalidacoes_total', 'counter', 'Invalidações do cache', 'invalidacoes'),
+    ('sistema_notas_cache_entradas', 'gauge', 'Entradas no cache', 'entradas'),
+)
+
+
+@metricas.REGISTRO.registrar_coletor
+def _metricas_cache():
+    with _repositorios_lock:
+        repositorios = list(_repositorios.items())
+    for caminho, repositorio in repositorios:
+        yield from metricas.amostras_de(repositorio.metricas(), METRICAS_CACHE, {'banco': caminho})
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Serviço HTTP/JSON de consulta às notas (somente leitura)
+Cada requisição roda em uma thread própria com uma conexão emprestada do pool;
+as listagens em streaming leem em páginas e devolvem a conexão entre elas.
+Uso: python servidor.py [porta] [banco.db]
+Com rede de escolas, ?escola=<id> em qualquer rota escolhe o banco da escola.
+
+GET /alunos                        todos os alunos por nome (streaming)
+GET /alunos?busca=termo&limite=50  alunos por relevância (nome ou matrícula)
+GET /boletim/<matricula>           notas de um aluno, uma chave por disciplina
+GET /pivot?nome=&limite=&after_nome=&after_id=
+                                   boletim de todos os alunos (streaming)
+GET /estatisticas                  agregados das notas por disciplina
+GET /metrics                       métricas operacionais (formato texto do Prometheus)
+"""
+
+import json
+import os
+import sys
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import metricas
+from backend import ler_boletim_alunos
+from busca import buscar_alunos
+from conexao import FORMATO_ID_ESCOLA, caminho_escola, conectar, usar_escola
+from estatisticas import ler_estatisticas
+from pivot import COLUNAS_ALUNO
+
+PORTA_PADRAO = 8000
+
+# Resultados da busca quando o cliente não informa `limite`
+LIMITE_BUSCA = 50
+
+# Linhas serializadas por bloco (chunk) nas respostas em streaming; também as
+# linhas lidas por página (a conexão volta ao pool entre as páginas)
+LINHAS_POR_BLOCO = 500
+
+# Segundos que uma leitura ou escrita no socket do cliente pode ficar parada
+TEMPO_LIMITE_CLIENTE = 30
+
+
+class ErroRequisicao(Exception):
+    """Erro a ser devolvido ao cliente com o status HTTP informado"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _inteiro(parametros, nome, padrao=None):
+    valor = parametros.get(nome)
+    if valor is None or valor == '':
+        return padrao
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Parâmetro '{nome}' deve ser inteiro")
+    if numero < 1:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Parâmetro '{nome}' deve ser positivo")
+    return numero
+
+
+def _media(linha):
+    notas = [valor for chave, valor in linha.items()
+             if chave not in COLUNAS_ALUNO and valor is not None]
+    return sum(notas) / len(notas) if notas else None
+
+
+def _pagina_alunos(conexao, after, tamanho):
+    if after is None:
+        cursor = conexao.execute(
+            "SELECT id, nome, matricula FROM alunos ORDER BY nome, id LIMIT ?", (tamanho,))
+    else:
+        cursor = conexao.execute(
+            "SELECT id, nome, matricula FROM alunos WHERE (nome, id) > (?, ?) "
+            "ORDER BY nome, id LIMIT ?", (*after, tamanho))
+    return [{'id': aluno_id, 'nome': nome, 'matricula': matricula}
+            for aluno_id, nome, matricula in cursor]
+
+
+class ManipuladorConsultas(BaseHTTPRequestHandler):
+    """Atende as rotas GET; as respostas grandes saem em blocos (chunked)"""
+
+    # HTTP/1.1: conexões persistentes e Transfer-Encoding: chunked
+    protocol_version = 'HTTP/1.1'
+    server_version = 'SistemaNotas/1.0'
+    # Cabeçalho e corpo saem em escritas separadas; com Nagle cada resposta
+    # esperaria o ACK atrasado do cliente (~40 ms)
+    disable_nagle_algorithm = True
+    # Cliente parado não segura a thread para sempre
+    timeout = TEMPO_LIMITE_CLIENTE
+
+    ROTAS = {
+        'alunos': '_alunos',
+        'boletim': '_boletim',
+        'pivot': '_pivot',
+        'estatisticas': '_estatisticas',
+    }
+    # Rotas atendidas sem emprestar conexão do pool
+    ROTAS_SEM_BANCO = {
+        'metrics': '_metricas',
+    }
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        partes = [unquote(parte) for parte in url.path.split('/') if parte]
+        parametros = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        self._streaming = False
+        self._status = None
+
+        conhecida = partes and (partes[0] in self.ROTAS or partes[0] in self.ROTAS_SEM_BANCO)
+        rota = partes[0] if conhecida else 'desconhecida'
+        inicio = time.perf_counter()
+        metricas.REQUISICOES_EM_ANDAMENTO.incrementar()
+        try:
+            self._atender(partes, parametros)
+        finally:
+            metricas.REQUISICOES_EM_ANDAMENTO.decrementar()
+            metricas.DURACAO_HTTP.observar(time.perf_counter() - inicio, rota=rota)
+            metricas.REQUISICOES_HTTP.incrementar(rota=rota, status=self._status or 0)
+
+    def send_response(self, code, message=None):
+        self._status = int(code)
+        super().send_response(code, message)
+
+    def _atender(self, partes, parametros):
+        if partes and partes[0] in self.ROTAS_SEM_BANCO:
+            getattr(self, self.ROTAS_SEM_BANCO[partes[0]])(partes[1:], parametros)
+            return
+
+        metodo = self.ROTAS.get(partes[0]) if partes else None
+        if metodo is None:
+            self._enviar_erro(HTTPStatus.NOT_FOUND, "Rota desconhecida")
+            return
+
+        escola_id = parametros.get('escola') or None
+        if escola_id is not None and not (FORMATO_ID_ESCOLA.fullmatch(escola_id)
+                                          and os.path.exists(caminho_escola(escola_id))):
+            self._enviar_erro(HTTPStatus.NOT_FOUND, "Escola não encontrada")
+            return
+        self._escola = escola_id
+        conexao = self._conectar()
+        if not conexao:
+            self._enviar_erro(HTTPStatus.SERVICE_UNAVAILABLE, "Banco de dados indisponível")
+            return
+        try:
+            getattr(self, metodo)(conexao, partes[1:], parametros)
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            # Cliente desconectou (ou parou de ler além do tempo limite) no meio da resposta
+            self.close_connection = True
+        except ErroRequisicao as e:
+            self._enviar_erro(e.status, str(e))
+        except Exception as e:
+            print(f"Erro ao atender {self.path}: {e}")
+            self._enviar_erro(HTTPStatus.INTERNAL_SERVER_ERROR, "Erro interno")
+        finally:
+            conexao.close()
+
+    def _conectar(self):
+        with usar_escola(self._escola):
+            return conectar(self.server.caminho_banco)
+
+    def _paginas(self, ler_pagina, after=None, limite=None):
+        """
+        Linhas lidas em páginas pelo cursor (nome, id), cada uma com uma conexão
+        emprestada só durante a leitura: cliente lento não segura o pool nem o WAL.
+        ler_pagina(conexao, after, tamanho) devolve a lista de linhas da página.
+        """
+        restante = limite
+        while restante is None or restante > 0:
+            tamanho = LINHAS_POR_BLOCO if restante is None else min(LINHAS_POR_BLOCO, restante)
+            conexao = self._conectar()
+            if not conexao:
+                raise ErroRequisicao(HTTPStatus.SERVICE_UNAVAILABLE, "Banco de dados indisponível")
+            try:
+                pagina = ler_pagina(conexao, after, tamanho)
+            finally:
+                conexao.close()
+            yield from pagina
+            if len(pagina) < tamanho:
+                return
+            after = (pagina[-1]['nome'], pagina[-1]['id'])
+            if restante is not None:
+                restante -= len(pagina)
+
+    # Rotas
+
+    def _alunos(self, conexao, argumentos, parametros):
+        termo = parametros.get('busca', '').strip()
+        if termo:
+            limite = _inteiro(parametros, 'limite', LIMITE_BUSCA)
+            self._enviar_json([{'id': aluno_id, 'nome': nome, 'matricula': matricula}
+                               for aluno_id, nome, matricula, _ in
+                               buscar_alunos(conexao, termo, limite)])
+        else:
+            # As páginas emprestam a própria conexão: esta volta ao pool já
+            conexao.close()
+            self._enviar_streaming(self._paginas(_pagina_alunos))
+
+    def _boletim(self, conexao, argumentos, parametros):
+        if len(argumentos) != 1:
+            raise ErroRequisicao(HTTPStatus.NOT_FOUND, "Use /boletim/<matricula>")
+        linhas = list(ler_boletim_alunos(conexao, matricula=argumentos[0]))
+        if not linhas:
+            raise ErroRequisicao(HTTPStatus.NOT_FOUND, "Matrícula não encontrada")
+        self._enviar_json({**linhas[0], 'media': _media(linhas[0])})
+
+    def _pivot(self, conexao, argumentos, parametros):
+        after = None
+        if parametros.get('after_nome') is not None:
+            after = (parametros['after_nome'], _inteiro(parametros, 'after_id', 0))
+        nome = parametros.get('nome', '').strip()
+        limite = _inteiro(parametros, 'limite')
+        conexao.close()
+        self._enviar_streaming(self._paginas(
+            lambda conexao, after, tamanho: list(ler_boletim_alunos(conexao, nome, after, tamanho)),
+            after, limite))
+
+    def _estatisticas(self, conexao, argumentos, parametros):
+        self._enviar_json(ler_estatisticas(conexao))
+
+    def _metricas(self, argumentos, parametros):
+        self._enviar_texto(metricas.texto_prometheus(), 'text/plain; version=0.0.4; charset=utf-8')
+
+    # Respostas
+
+    def _enviar_json(self, dados, status=HTTPStatus.OK):
+        self._enviar_texto(json.dumps(dados, ensure_ascii=False),
+                           'application/json; charset=utf-8', status)
+
+    def _enviar_texto(self, texto, tipo, status=HTTPStatus.OK):
+        corpo = texto.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _enviar_erro(self, status, mensagem):
+        if self._streaming:
+            # Cabeçalhos já enviados: encerra sem o bloco final (resposta incompleta)
+            self.close_connection = True
+            return
+        self._enviar_json({'erro': mensagem}, status)
+
+    def _escrever_bloco(self, texto):
+        dados = texto.encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(dados), dados))
+
+    def _enviar_streaming(self, linhas):
+        """Lista JSON enviada em blocos conforme as linhas saem do cursor"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self._streaming = True
+
+        bloco = ['[']
+        separador = ''
+        for linha in linhas:
+            bloco.append(separador + json.dumps(linha, ensure_ascii=False))
+            separador = ','
+            if len(bloco) >= LINHAS_POR_BLOCO:
+                self._escrever_bloco(''.join(bloco))
+                bloco = []
+        bloco.append(']')
+        self._escrever_bloco(''.join(bloco))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, formato, *args):
+        if self.server.registrar_acessos:
+            super().log_message(formato, *args)
+
+
+class ServidorConsultas(ThreadingHTTPServer):
+    """Servidor com uma thread por requisição; o pool limita as conexões ao banco"""
+
+    request_queue_size = 128
+
+    def __init__(self, endereco, caminho_banco=None, registrar_acessos=True):
+        self.caminho_banco = caminho_banco
+        self.registrar_acessos = registrar_acessos
+        super().__init__(endereco, ManipuladorConsultas)
+
+
+def criar_servidor(porta=PORTA_PADRAO, caminho_banco=None, host='127.0.0.1',
+                   registrar_acessos=True):
+    """Cria o servidor (porta 0 = porta livre escolhida pelo sistema)"""
+    return ServidorConsultas((host, porta), caminho_banco, registrar_acessos)
+
+
+def main():
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else PORTA_PADRAO
+    caminho_banco = sys.argv[2] if len(sys.argv) > 2 else None
+
+    servidor = criar_servidor(porta, caminho_banco)
+    print(f"🌐 Servindo consultas em http://{servidor.server_address[0]}:{servidor.server_port}/")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado.")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
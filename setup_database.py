@@ -3,14 +3,23 @@ from mysql.connector import Error
 import sqlite3
 import os
 
+from conexao import banco_atual
+from migracoes import aplicar_migracoes
+
 def criar_banco_sqlite():
-    """Cria o banco de dados SQLite como alternativa"""
+    """Cria o banco de dados SQLite como alternativa (o da escola, com SISTEMA_NOTAS_ESCOLA)"""
     try:
-        # Remove arquivo anterior se existir
-        if os.path.exists('sistema_nota.db'):
-            os.remove('sistema_nota.db')
+        caminho = banco_atual()
+        # Remove o arquivo anterior e o WAL/índice dele: um -wal antigo seria
+        # aplicado ao banco novo na primeira abertura
+        for arquivo in (caminho, caminho + '-wal', caminho + '-shm'):
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+        # Pasta da escola: só é criada aqui (conectar não cria escolas novas)
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
         
-        conexao = sqlite3.connect('sistema_nota.db')
+        conexao = sqlite3.connect(caminho)
         cursor = conexao.cursor()
         
         # Cria a tabela de funcionários
@@ -54,9 +63,12 @@ def criar_banco_sqlite():
         """)
         
         conexao.commit()
+        
+        # Índices e demais migrações de esquema
+        aplicar_migracoes(conexao)
         conexao.close()
         
-        print("✅ Banco de dados SQLite criado com sucesso!")
+        print(f"✅ Banco de dados SQLite criado com sucesso! ({caminho})")
         print("✅ Funcionário de teste criado!")
         print("   CPF: 12345678900")
         print("   Senha: admin123")
@@ -165,59 +177,16 @@ def criar_banco_dados():
         print("❌ Falha ao configurar banco de dados")
 
 def atualizar_conexao_sqlite():
-    """Atualiza o arquivo conexao.py para usar SQLite"""
-    try:
-        with open('conexao.py', 'w', encoding='utf-8') as f:
-            f.write('''import sqlite3
-
-def conectar():
-    """Função para conectar ao banco de dados SQLite"""
-    try:
-        conexao = sqlite3.connect('sistema_nota.db')
-        return conexao
-    except Exception as e:
-        print(f"Erro ao conectar ao SQLite: {e}")
-        return None
-
-def login_funcionario():
-    """Função para autenticar funcionário"""
-    conexao = None
-    cursor = None
+    """Confere se o conexao.py já usa SQLite (o pool de conexões não é sobrescrito)"""
     try:
-        conexao = conectar()
-        if not conexao:
-            print("Erro: Não foi possível conectar ao banco de dados.")
-            return None
-            
-        cursor = conexao.cursor()
-
-        cpf = input("CPF: ")
-        senha = input("Senha: ")
-
-        cursor.execute("SELECT id, nome FROM funcionario WHERE cpf = ? AND senha = ?", (cpf, senha))
-        resultado = cursor.fetchone()
-
-        if resultado:
-            funcionario_id, nome = resultado
-            print(f"\\nBem-vindo(a), {nome}!")
-            return funcionario_id
+        with open('conexao.py', 'r', encoding='utf-8') as f:
+            conteudo = f.read()
+        if 'sqlite3' in conteudo:
+            print("✅ Arquivo conexao.py já configurado para SQLite!")
         else:
-            print("CPF ou senha incorretos.")
-            return None
-
-    except Exception as e:
-        print(f"Erro no login: {e}")
-        return None
-
-    finally:
-        if cursor:
-            cursor.close()
-        if conexao:
-            conexao.close()
-''')
-        print("✅ Arquivo conexao.py atualizado para SQLite!")
+            print("⚠️  conexao.py não usa SQLite. Verifique a configuração manualmente.")
     except Exception as e:
-        print(f"❌ Erro ao atualizar conexao.py: {e}")
+        print(f"❌ Erro ao verificar conexao.py: {e}")
 
 if __name__ == "__main__":
     criar_banco_dados()
@@ -2,18 +2,29 @@ import sqlite3
 from datetime import datetime
 import os
 
+from conexao import banco_atual, conectar as conectar_pool
+from migracoes import aplicar_migracoes
+from estatisticas import ler_estatisticas
+import metricas
+import replica
+import repositorio
+from backend import excluir_aluno, gravar_notas
+from escritor import gravar
+
+# Banco de dados usado por esta versão do sistema (na pasta da escola, se houver escola)
+ARQUIVO_BANCO = 'escola.db'
+
 def limpar_tela():
     """Limpa a tela do terminal"""
     os.system('cls' if os.name == 'nt' else 'clear')
 
+def caminho_banco():
+    """Banco desta versão do sistema para a escola atual"""
+    return banco_atual(ARQUIVO_BANCO)
+
 def conectar():
     """Conecta ao banco de dados SQLite"""
-    try:
-        conexao = sqlite3.connect('escola.db')
-        return conexao
-    except Exception as e:
-        print(f"Erro ao conectar ao banco de dados: {e}")
-        return None
+    return conectar_pool(caminho_banco())
 
 def conectar_db():
     """Alias para conectar() - mantém compatibilidade"""
@@ -21,6 +32,9 @@ def conectar_db():
 
 def criar_tabelas():
     """Cria as tabelas necessárias se não existirem"""
+    pasta = os.path.dirname(caminho_banco())
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
     conexao = conectar()
     if not conexao:
         return
@@ -56,6 +70,9 @@ def criar_tabelas():
         """)
         
         conexao.commit()
+        
+        # Índices e demais migrações de esquema
+        aplicar_migracoes(conexao)
         print("✅ Tabelas criadas/verificadas com sucesso!")
         
     except Exception as e:
@@ -66,19 +83,7 @@ def criar_tabelas():
 
 def listar_alunos():
     """Retorna lista de todos os alunos"""
-    conexao = conectar()
-    if not conexao:
-        return []
-    
-    cursor = conexao.cursor()
-    try:
-        cursor.execute("SELECT id, nome, matricula, cpf FROM alunos ORDER BY nome")
-        return cursor.fetchall()
-    except Exception as e:
-        print(f"Erro ao listar alunos: {e}")
-        return []
-    finally:
-        conexao.close()
+    return repositorio.listar_alunos(caminho_banco())
 
 def mostrar_alunos():
     """Exibe lista formatada de alunos"""
@@ -150,73 +155,48 @@ def cadastrar_novo_aluno():
         print("❌ CPF inválido. Digite um CPF válido.")
         return
     
-    conexao = conectar()
-    if not conexao:
-        return
-    
-    cursor = conexao.cursor()
-    
     try:
-        cursor.execute("""
-            INSERT INTO alunos (nome, matricula, cpf)
-            VALUES (?, ?, ?)
-        """, (nome, matricula, cpf))
+        with metricas.DURACAO_CADASTRO.cronometrar():
+            gravar("""
+                INSERT INTO alunos (nome, matricula, cpf)
+                VALUES (?, ?, ?)
+            """, (nome, matricula, cpf), caminho=caminho_banco())
+        metricas.ALUNOS_CADASTRADOS.incrementar(modo='individual')
         
-        conexao.commit()
+        repositorio.invalidar_alunos(caminho_banco())
         print("✅ Aluno cadastrado com sucesso!")
         
     except sqlite3.IntegrityError:
+        metricas.FALHAS.incrementar(operacao='cadastrar_aluno')
         print("❌ Erro: Matrícula ou CPF já cadastrado.")
     except Exception as e:
+        metricas.FALHAS.incrementar(operacao='cadastrar_aluno')
         print(f"❌ Erro ao cadastrar aluno: {e}")
-        conexao.rollback()
-    finally:
-        conexao.close()
 
 def atribuir_nota(aluno_id, disciplina, nota, funcionario_id):
     """Atribui ou atualiza nota de um aluno"""
-    conexao = conectar()
-    if not conexao:
-        print("Erro: Não foi possível conectar ao banco de dados.")
-        return False
-    
-    cursor = conexao.cursor()
-
     try:
-        # Verifica se já existe nota para essa disciplina
-        cursor.execute("""
-            SELECT id FROM notas
-            WHERE aluno_id = ? AND disciplina = ?
-        """, (aluno_id, disciplina))
-        resultado = cursor.fetchone()
-
-        if resultado:
-            # Atualiza a nota existente
-            cursor.execute("""
-                UPDATE notas SET nota = ?, funcionario_id = ?, data_atribuicao = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (nota, funcionario_id, resultado[0]))
-            print("📝 Nota atualizada com sucesso!")
-        else:
-            # Insere nova nota
-            cursor.execute("""
+        # Insere a nota ou atualiza a existente no mesmo comando
+        with metricas.DURACAO_GRAVACAO_NOTA.cronometrar():
+            gravar_notas([(aluno_id, disciplina, nota, funcionario_id)], """
                 INSERT INTO notas (aluno_id, disciplina, nota, funcionario_id)
                 VALUES (?, ?, ?, ?)
-            """, (aluno_id, disciplina, nota, funcionario_id))
-            print("✅ Nova nota adicionada com sucesso!")
+                ON CONFLICT (aluno_id, disciplina)
+                DO UPDATE SET nota = excluded.nota,
+                              funcionario_id = excluded.funcionario_id,
+                              data_atribuicao = CURRENT_TIMESTAMP
+            """, caminho=caminho_banco())
+        metricas.NOTAS_GRAVADAS.incrementar(modo='individual')
+        print("📝 Nota registrada com sucesso!")
 
-        conexao.commit()
+        repositorio.invalidar_notas(aluno_id, caminho_banco())
         return True
 
     except Exception as e:
+        metricas.FALHAS.incrementar(operacao='gravar_nota')
         print("Erro ao atribuir nota:", e)
-        conexao.rollback()
         return False
 
-    finally:
-        cursor.close()
-        conexao.close()
-
 def adicionar_nota():
     """Interface para adicionar nota"""
     print("\n📝 ADICIONAR NOTA")
@@ -365,7 +345,7 @@ def ver_notas_detalhadas():
     print("\n📋 NOTAS DETALHADAS")
     print("="*60)
     
-    conexao = conectar()
+    conexao = replica.conectar_relatorio('notas_detalhadas', caminho_banco())
     if not conexao:
         return
     
@@ -379,14 +359,9 @@ def ver_notas_detalhadas():
             ORDER BY a.nome, n.disciplina
         """)
         
-        resultados = cursor.fetchall()
-        
-        if not resultados:
-            print("❌ Nenhum dado encontrado.")
-            return
-        
+        # Percorre o cursor sem carregar a escola inteira na memória
         aluno_atual = None
-        for resultado in resultados:
+        for resultado in cursor:
             if resultado[0] != aluno_atual:
                 if aluno_atual:
                     print("-" * 60)
@@ -400,6 +375,9 @@ def ver_notas_detalhadas():
                 print(f"{resultado[2]:<15} {resultado[3]:<8.1f} {data}")
             else:
                 print("Nenhuma nota cadastrada")
+        
+        if aluno_atual is None:
+            print("❌ Nenhum dado encontrado.")
                 
     except Exception as e:
         print(f"❌ Erro ao buscar notas detalhadas: {e}")
@@ -415,35 +393,18 @@ def estatisticas():
     if not conexao:
         return
     
-    cursor = conexao.cursor()
-    
     try:
-        # Total de alunos
-        cursor.execute("SELECT COUNT(*) FROM alunos")
-        total_alunos = cursor.fetchone()[0]
-        
-        # Total de notas
-        cursor.execute("SELECT COUNT(*) FROM notas")
-        total_notas = cursor.fetchone()[0]
-        
-        # Média geral
-        cursor.execute("SELECT AVG(nota) FROM notas")
-        media_geral = cursor.fetchone()[0]
+        # Agregados mantidos pelos gatilhos: leitura de poucas linhas
+        dados = ler_estatisticas(conexao)
+        geral = dados['geral']
         
-        # Melhor nota
-        cursor.execute("SELECT MAX(nota) FROM notas")
-        melhor_nota = cursor.fetchone()[0]
-        
-        # Pior nota
-        cursor.execute("SELECT MIN(nota) FROM notas")
-        pior_nota = cursor.fetchone()[0]
-        
-        print(f"👥 Total de alunos: {total_alunos}")
-        print(f"📝 Total de notas: {total_notas}")
-        if media_geral:
-            print(f"📊 Média geral: {media_geral:.2f}")
-            print(f"🏆 Melhor nota: {melhor_nota}")
-            print(f"📉 Pior nota: {pior_nota}")
+        print(f"👥 Total de alunos: {dados['total_alunos']}")
+        print(f"📝 Total de notas: {dados['total_notas']}")
+        if geral:
+            print(f"📊 Média geral: {geral['media']:.2f}")
+            print(f"📐 Desvio padrão: {geral['desvio_padrao']:.2f}")
+            print(f"🏆 Melhor nota: {geral['maximo']}")
+            print(f"📉 Pior nota: {geral['minimo']}")
         else:
             print("📊 Nenhuma nota cadastrada ainda.")
             
@@ -486,14 +447,8 @@ def remover_aluno():
     print(f"CPF: {aluno_encontrado[3]}")
     
     # Verifica se o aluno tem notas
-    conn = conectar_db()
-    if not conn:
-        return
-    
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM notas WHERE aluno_id = ?", (aluno_id,))
-        total_notas = cursor.fetchone()[0]
+        total_notas = len(repositorio.notas_do_aluno(aluno_id, caminho_banco()))
         
         if total_notas > 0:
             print(f"⚠️ ATENÇÃO: Este aluno possui {total_notas} nota(s) cadastrada(s).")
@@ -502,15 +457,8 @@ def remover_aluno():
         # Confirma remoção
         confirmacao = input(f"\n❌ Confirma a remoção do aluno {aluno_encontrado[1]}? (s/n): ").lower()
         if confirmacao in ['s', 'sim', 'y', 'yes']:
-            # Remove notas primeiro (devido à foreign key)
-            cursor.execute("DELETE FROM notas WHERE aluno_id = ?", (aluno_id,))
-            notas_removidas = cursor.rowcount
-            
-            # Remove o aluno
-            cursor.execute("DELETE FROM alunos WHERE id = ?", (aluno_id,))
-            aluno_removido = cursor.rowcount
-            
-            conn.commit()
+            # Remove as notas e o aluno em uma só transação
+            aluno_removido, notas_removidas = excluir_aluno(aluno_id, caminho_banco())
             
             if aluno_removido > 0:
                 print(f"✅ Aluno removido com sucesso!")
@@ -523,9 +471,6 @@ def remover_aluno():
             
     except Exception as e:
         print(f"❌ Erro ao remover aluno: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
     
     input("\nPressione ENTER para continuar...")
 
@@ -581,6 +526,7 @@ def main():
     
     # Cria as tabelas se não existirem
     criar_tabelas()
+    replica.iniciar_atualizacao(caminho_banco())
     
     # Inicia o menu principal
     menu_principal(1)  # ID do funcionário 1
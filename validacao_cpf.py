@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Validação de CPFs em lote com NumPy
+Os CPFs viram uma matriz de dígitos (uma linha por CPF) e os dois dígitos
+verificadores são calculados para todas as linhas de uma vez.
+Uso: python validacao_cpf.py auditar [banco.db]
+"""
+
+import sys
+
+import numpy as np
+
+# CPFs processados por vez (limita a memória das matrizes intermediárias)
+TAMANHO_BLOCO = 100_000
+
+MOTIVO_TAMANHO = "CPF deve ter 11 dígitos"
+MOTIVO_REPETIDOS = "todos os dígitos iguais"
+MOTIVO_DIGITO1 = "primeiro dígito verificador inválido"
+MOTIVO_DIGITO2 = "segundo dígito verificador inválido"
+
+# Pesos dos dígitos verificadores: 10..2 sobre os 9 primeiros, 11..2 sobre os 10 primeiros
+PESOS_DIGITO1 = np.arange(10, 1, -1)
+PESOS_DIGITO2 = np.arange(11, 1, -1)
+
+_CODIGO_ZERO = ord('0')
+
+
+def _texto(cpfs):
+    """Array de strings; números inteiros voltam a ter os zeros à esquerda"""
+    cpfs = np.asarray(cpfs)
+    if cpfs.dtype.kind in 'iu':
+        return np.char.zfill(cpfs.astype(str), 11)
+    if cpfs.dtype.kind == 'O':
+        cpfs = np.where(cpfs == None, '', cpfs)  # noqa: E711 (comparação elemento a elemento)
+    return cpfs.astype(str)
+
+
+def _matriz_digitos(cpfs):
+    """
+    Matriz (n, 11) com os dígitos de cada CPF (pontuação e espaços descartados)
+    e a quantidade de dígitos encontrados em cada um.
+    """
+    # Cada caractere de uma string NumPy ('<U') ocupa um inteiro de 32 bits
+    largura = max(cpfs.dtype.itemsize // 4, 1)
+    codigos = np.ascontiguousarray(cpfs).view(np.uint32).reshape(len(cpfs), largura)
+    if largura < 11:
+        codigos = np.pad(codigos, ((0, 0), (0, 11 - largura)))
+    eh_digito = (codigos >= _CODIGO_ZERO) & (codigos <= _CODIGO_ZERO + 9)
+    quantidade = eh_digito.sum(axis=1)
+
+    # Leva os dígitos para o início da linha mantendo a ordem
+    ordem = np.argsort(~eh_digito, axis=1, kind='stable')[:, :11]
+    digitos = np.take_along_axis(codigos, ordem, axis=1).astype(np.int64) - _CODIGO_ZERO
+    digitos[~np.take_along_axis(eh_digito, ordem, axis=1)] = 0
+    return digitos, quantidade
+
+
+def _digito_verificador(digitos, pesos):
+    resto = (digitos @ pesos) % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+
+def _validar_bloco(cpfs):
+    digitos, quantidade = _matriz_digitos(cpfs)
+
+    tamanho_ok = quantidade == 11
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+    digito1_ok = digitos[:, 9] == _digito_verificador(digitos[:, :9], PESOS_DIGITO1)
+    digito2_ok = digitos[:, 10] == _digito_verificador(digitos[:, :10], PESOS_DIGITO2)
+
+    validos = tamanho_ok & ~repetidos & digito1_ok & digito2_ok
+    # O primeiro motivo que se aplica, na mesma ordem da validação individual
+    motivos = np.select(
+        [~tamanho_ok, repetidos, ~digito1_ok, ~digito2_ok],
+        [MOTIVO_TAMANHO, MOTIVO_REPETIDOS, MOTIVO_DIGITO1, MOTIVO_DIGITO2],
+        default='').astype(object)
+    normalizados = np.where(tamanho_ok, _juntar_digitos(digitos), '')
+    return validos, motivos, normalizados
+
+
+def _juntar_digitos(digitos):
+    """Matriz (n, 11) de dígitos -> array de strings de 11 caracteres"""
+    codigos = np.ascontiguousarray(digitos + _CODIGO_ZERO, dtype=np.uint32)
+    return codigos.view('<U11').reshape(len(digitos))
+
+
+def validar_cpfs(cpfs, normalizar=False):
+    """
+    Valida uma sequência de CPFs (com ou sem pontuação, strings ou inteiros).
+    Retorna (validos, motivos): máscara booleana e, para cada CPF, o motivo da
+    rejeição ('' quando válido). Com normalizar=True retorna também os CPFs só
+    com dígitos ('' quando não há 11 dígitos).
+    """
+    cpfs = _texto(cpfs)
+    if cpfs.ndim != 1:
+        cpfs = cpfs.reshape(-1)
+
+    partes = [_validar_bloco(cpfs[inicio:inicio + TAMANHO_BLOCO])
+              for inicio in range(0, len(cpfs), TAMANHO_BLOCO)]
+    if not partes:
+        partes = [(np.zeros(0, dtype=bool), np.zeros(0, dtype=object), np.zeros(0, dtype='<U11'))]
+    validos, motivos, normalizados = (np.concatenate(coluna) for coluna in zip(*partes))
+    if normalizar:
+        return validos, motivos, normalizados
+    return validos, motivos
+
+
+def auditar_cpfs(conexao, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera (id, nome, cpf, motivo) de cada aluno cadastrado com CPF inválido"""
+    cursor = conexao.execute("SELECT id, nome, cpf FROM alunos ORDER BY id")
+    while True:
+        linhas = cursor.fetchmany(tamanho_bloco)
+        if not linhas:
+            return
+        validos, motivos = validar_cpfs([linha[2] for linha in linhas])
+        for indice in np.flatnonzero(~validos):
+            yield (*linhas[indice], motivos[indice])
+
+
+def main():
+    from conexao import conectar
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'auditar':
+        print("Uso: python validacao_cpf.py auditar [banco.db]")
+        sys.exit(1)
+
+    conexao = conectar(sys.argv[2] if len(sys.argv) > 2 else None)
+    if not conexao:
+        sys.exit(1)
+
+    try:
+        invalidos = 0
+        for aluno_id, nome, cpf, motivo in auditar_cpfs(conexao):
+            invalidos += 1
+            print(f"{aluno_id:<6} {nome:<30} {cpf:<16} {motivo}")
+        if invalidos:
+            print(f"❌ {invalidos} aluno(s) com CPF inválido.")
+            sys.exit(2)
+        print("✅ Todos os CPFs cadastrados são válidos.")
+    finally:
+        conexao.close()
+
+
+if __name__ == "__main__":
+    main()
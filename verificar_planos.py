@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Verificação dos planos de consulta (EXPLAIN QUERY PLAN) do SQL do sistema
+Junta as instruções escritas no código (literais SQL dos módulos) e as
+executadas pelas operações principais (rastreamento) e confere o plano de cada
+uma em um banco com o esquema e as migrações aplicadas. Falha quando uma
+instrução varre (SCAN) notas ou alunos sem estar na lista de varreduras
+permitidas.
+Uso: python verificar_planos.py [-v]
+"""
+
+import ast
+import builtins
+import contextlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from collections import defaultdict
+
+import rastreamento
+
+# Tabelas que não podem ser varridas por inteiro nos caminhos quentes
+TABELAS_VIGIADAS = ('alunos', 'notas')
+
+# Varreduras intencionais: (expressão sobre o SQL normalizado, motivo)
+VARREDURAS_PERMITIDAS = [
+    (r"^SELECT (?:\w+, )*\w+ FROM alunos ORDER BY nome(?:, id)?(?: LIMIT \?)?$",
+     "listagem completa de alunos (percorre o índice por nome; no servidor, a primeira página)"),
+    (r"^(?:INSERT OR REPLACE INTO contadores \(nome, valor\) )?SELECT (?:\?, )?COUNT\(\*\) FROM alunos$",
+     "contagem total de alunos"),
+    (r"\bFROM alunos ORDER BY nome, id LIMIT \? OFFSET \?",
+     "paginação por deslocamento (lista virtual): percorre o índice por nome até o deslocamento"),
+    (r"^SELECT COUNT\(\*\) FROM notas$",
+     "resumo dos arquivos por ano letivo (arquivo.resumo_arquivos, fora do banco ativo)"),
+    (r"^SELECT a\.matricula, a\.nome, n\.disciplina, n\.nota(?:, n\.data_atribuicao)? "
+     r"FROM alunos a CROSS JOIN notas n ON n\.aluno_id = a\.id ORDER BY",
+     "exportação completa das notas (percorre alunos pelo índice de matrícula)"),
+    (r"^SELECT id FROM alunos$", "importação de notas: carrega os ids existentes uma vez por lote"),
+    (r"^SELECT cpf FROM alunos$", "importação de alunos: carrega os CPFs existentes uma vez por lote"),
+    (r"^SELECT id, nome, cpf FROM alunos ORDER BY id$", "auditoria de CPFs (validacao_cpf)"),
+    (r"^SELECT a\.nome, a\.matricula, n\.disciplina, n\.nota, n\.data_atribuicao "
+     r"FROM alunos a LEFT JOIN notas n",
+     "notas detalhadas de todos os alunos (sistema_escolar_completo)"),
+    (r"^DELETE FROM notas WHERE id NOT IN \( SELECT MAX\(id\) FROM notas GROUP BY",
+     "migração 1: remove notas duplicadas uma única vez"),
+    (r"^DELETE FROM notas WHERE aluno_id NOT IN \(SELECT id FROM alunos\)$",
+     "migração 7: remove notas de alunos inexistentes uma única vez"),
+]
+
+# Colunas que sistema_escolar_completo.criar_tabelas cria a mais no próprio banco
+COLUNAS_EXTRAS = (('alunos', 'data_cadastro'), ('notas', 'data_atribuicao'))
+
+# Módulos cujo SQL literal não é do sistema (medições e esta verificação)
+MODULOS_IGNORADOS = {'benchmark.py', 'verificar_planos.py', 'setup_database.py'}
+
+INICIO_SQL = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+
+def _texto_constante(no):
+    """Texto de um literal ou de literais concatenados com +; None se houver partes dinâmicas"""
+    if isinstance(no, ast.Constant) and isinstance(no.value, str):
+        return no.value
+    if isinstance(no, ast.BinOp) and isinstance(no.op, ast.Add):
+        esquerda, direita = _texto_constante(no.left), _texto_constante(no.right)
+        if esquerda is not None and direita is not None:
+            return esquerda + direita
+    return None
+
+
+def instrucoes_do_codigo(diretorio=DIRETORIO):
+    """
+    {sql: [arquivo:linha, ...]} dos literais SQL (DML) dos módulos do sistema.
+    SQL montado em tempo de execução (f-strings, %) fica para instrucoes_executadas().
+    """
+    instrucoes = defaultdict(list)
+    for arquivo in sorted(os.listdir(diretorio)):
+        if not arquivo.endswith('.py') or arquivo in MODULOS_IGNORADOS:
+            continue
+        with open(os.path.join(diretorio, arquivo), encoding='utf-8') as fonte:
+            arvore = ast.parse(fonte.read(), arquivo)
+
+        partes = set()
+        for no in ast.walk(arvore):
+            if isinstance(no, (ast.JoinedStr, ast.BinOp)):
+                # Pedaços de SQL montado: só o texto completo interessa
+                partes.update(id(filho) for filho in ast.iter_child_nodes(no))
+        for no in ast.walk(arvore):
+            if id(no) in partes or not isinstance(no, (ast.Constant, ast.BinOp)):
+                continue
+            texto = _texto_constante(no)
+            if texto is not None and INICIO_SQL.match(texto):
+                instrucoes[texto].append(f"{arquivo}:{no.lineno}")
+    return instrucoes
+
+
+def _operacoes_quentes(conexao):
+    """Chamadas das operações principais (leituras e gravações) sobre o banco padrão"""
+    import backend
+    import cadastro
+    import exportar
+    import remover_aluno
+    import repositorio
+    from busca import buscar_alunos
+    from estatisticas import ler_estatisticas
+
+    return (
+        lambda: backend.consultar_alunos(''),
+        lambda: backend.consultar_alunos('Silva'),
+        lambda: backend.consultar_pagina_alunos('', ('Ana', 1), 10),
+        lambda: backend.consultar_janela_alunos(5, 10),
+        lambda: backend.contar_alunos(),
+        lambda: repositorio.listar_alunos(),
+        lambda: repositorio.notas_do_aluno(1),
+        lambda: list(backend.ler_boletim_alunos(conexao, matricula='MAT0001')),
+        lambda: buscar_alunos(conexao, 'Silva', 10),
+        lambda: buscar_alunos(conexao, 'MAT00', 10),
+        lambda: ler_estatisticas(conexao),
+        lambda: backend.atribuir_nota(1, backend.DISCIPLINAS[0], 7.5, 1),
+        lambda: cadastro.cadastrar_aluno("Aluno Verificação", "98765432100", "Rua Teste"),
+        lambda: remover_aluno.remover_aluno_por_cpf('00000000002'),
+        lambda: remover_aluno.remover_aluno_por_id(3),
+        lambda: exportar.exportar('notas.csv'),
+        lambda: exportar.exportar('notas.jsonl', disciplinas=['Artes'],
+                                  faixa_matricula=('MAT0010', 'MAT0020')),
+        lambda: exportar.exportar('boletim.csv.gz', 'boletim', faixa_matricula=('MAT0010', None)),
+        lambda: remover_aluno.remover_alunos_em_lote(ids=[4, 5], matriculas=['MAT0006'],
+                                                     cpfs=['000.000.000-07']),
+        lambda: remover_aluno.remover_alunos_em_lote(
+            filtro=("matricula >= ? AND matricula < ?", ['MAT001', 'MAT002'])),
+    )
+
+
+def instrucoes_executadas():
+    """{sql: [pilha, ...]} executadas pelas operações principais em um banco sintético"""
+    import escritor
+    from benchmark import criar_banco_teste
+    from conexao import CAMINHO_BANCO, conectar, fechar_pools
+
+    rastreamento.configurar(ativo=True)
+    diretorio_original = os.getcwd()
+    entrada_original = builtins.input
+    instrucoes = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        # Os módulos abrem o banco padrão relativo ao diretório atual
+        os.chdir(pasta)
+        builtins.input = lambda *args: 's'  # confirmações da remoção
+        try:
+            criar_banco_teste(CAMINHO_BANCO, 400)[0].close()
+            conexao = conectar()
+            with rastreamento.coletar_instrucoes() as coletadas, \
+                    contextlib.redirect_stdout(io.StringIO()):
+                for operacao in _operacoes_quentes(conexao):
+                    operacao()
+                escritor.encerrar_escritores()
+            conexao.close()
+            for sql, pilha in coletadas.items():
+                if INICIO_SQL.match(sql):
+                    # Sem as funções desta verificação que chamaram a operação
+                    pilha = [f for f in pilha if not f.startswith(('__main__.', __name__ + '.'))]
+                    instrucoes[sql] = [' < '.join(pilha)]
+        finally:
+            escritor.encerrar_escritores()
+            fechar_pools()
+            builtins.input = entrada_original
+            os.chdir(diretorio_original)
+    return instrucoes
+
+
+def criar_banco_planos(caminho):
+    """Banco sintético pequeno com o esquema completo (migrações e colunas extras)"""
+    from benchmark import criar_banco_teste
+
+    conexao, _ = criar_banco_teste(caminho, 400)
+    for tabela, coluna in COLUNAS_EXTRAS:
+        conexao.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} TIMESTAMP")
+    return conexao
+
+
+def _quantidade_parametros(sql):
+    return LITERAL_TEXTO.sub('', sql).count('?')
+
+
+def plano(conexao, sql):
+    """Linhas de detalhe do EXPLAIN QUERY PLAN (parâmetros valem NULL)"""
+    parametros = (None,) * _quantidade_parametros(sql)
+    return [linha[3] for linha in conexao.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)]
+
+
+def _apelidos(sql):
+    """Nomes pelos quais cada tabela vigiada aparece no plano (nome e apelidos)"""
+    nomes = {tabela: tabela for tabela in TABELAS_VIGIADAS}
+    padrao = r"\b(%s)\s+(?:AS\s+)?([A-Za-z_]\w*)" % '|'.join(TABELAS_VIGIADAS)
+    reservadas = {'WHERE', 'JOIN', 'LEFT', 'INNER', 'ON', 'ORDER', 'GROUP', 'LIMIT', 'SET',
+                  'VALUES', 'USING', 'WHEN', 'BEGIN', 'AS', 'UNION', 'INDEXED', 'NOT'}
+    for tabela, apelido in re.findall(padrao, sql, re.IGNORECASE):
+        if apelido.upper() not in reservadas:
+            nomes[apelido] = tabela.lower()
+    return nomes
+
+
+def varreduras(detalhes, sql):
+    """Tabelas vigiadas varridas por inteiro no plano (SCAN sem busca por índice)"""
+    nomes = _apelidos(sql)
+    encontradas = []
+    for detalhe in detalhes:
+        partes = detalhe.split()
+        if len(partes) >= 2 and partes[0] == 'SCAN' and partes[1] in nomes:
+            encontradas.append(nomes[partes[1]])
+    return encontradas
+
+
+def varredura_permitida(sql, usadas=None):
+    """Motivo da permissão, ou None; as expressões usadas são anotadas em `usadas`"""
+    normalizado = rastreamento.normalizar_sql(sql)
+    for expressao, motivo in VARREDURAS_PERMITIDAS:
+        if re.search(expressao, normalizado, re.IGNORECASE):
+            if usadas is not None:
+                usadas.add(expressao)
+            return motivo
+    return None
+
+
+def verificar_planos(verbose=False):
+    """
+    Confere os planos; retorna a lista de (sql, locais, detalhes) das instruções
+    com varreduras não permitidas ou que nem preparam no esquema atual.
+    """
+    instrucoes = defaultdict(list)
+    for origem in (instrucoes_do_codigo(), instrucoes_executadas()):
+        for sql, locais in origem.items():
+            instrucoes[sql].extend(locais)
+
+    problemas = []
+    usadas = set()
+    with tempfile.TemporaryDirectory() as pasta:
+        conexao = criar_banco_planos(os.path.join(pasta, 'planos.db'))
+        try:
+            for sql, locais in sorted(instrucoes.items(), key=lambda item: item[1][0]):
+                normalizado = rastreamento.normalizar_sql(sql)
+                try:
+                    detalhes = plano(conexao, sql)
+                except sqlite3.Error as e:
+                    # Coluna ou tabela que o esquema não tem mais: a instrução quebrou
+                    problemas.append((normalizado, locais, [f"não prepara: {e}"]))
+                    continue
+                varridas = varreduras(detalhes, sql)
+                motivo = varredura_permitida(sql, usadas) if varridas else None
+                if varridas and not motivo:
+                    problemas.append((normalizado, locais, detalhes))
+                if verbose:
+                    situacao = '❌' if varridas and not motivo else '✅'
+                    print(f"{situacao} {normalizado[:100]}")
+                    print(f"    em {', '.join(locais[:3])}")
+                    for detalhe in detalhes:
+                        print(f"    {detalhe}")
+                    if motivo:
+                        print(f"    varredura permitida: {motivo}")
+        finally:
+            conexao.close()
+
+    for expressao, motivo in VARREDURAS_PERMITIDAS:
+        if expressao not in usadas:
+            print(f"⚠️  Varredura permitida sem uso (remover?): {motivo}")
+    print(f"\n🔎 {len(instrucoes)} instruções verificadas.")
+    return problemas
+
+
+def main():
+    problemas = verificar_planos('-v' in sys.argv[1:])
+    if not problemas:
+        print("✅ Nenhuma varredura inesperada em alunos ou notas.")
+        return
+    for normalizado, locais, detalhes in problemas:
+        print(f"\n❌ {normalizado}")
+        print(f"   em {', '.join(locais[:5])}")
+        for detalhe in detalhes:
+            print(f"   {detalhe}")
+    print(f"\n❌ {len(problemas)} instrução(ões) varrendo alunos ou notas sem índice "
+          f"ou incompatíveis com o esquema.")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()